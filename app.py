@@ -3,9 +3,9 @@ import streamlit as st
 from src import st_utils
 
 if "perfs" not in st.session_state:
-    perfs = st_utils.load_data()
-    st.session_state["perfs"] = perfs
-    st.session_state["df"] = perfs.table()
+    st_utils.init_session()
+else:
+    st_utils.sync_session()
 
 
 st.title("Performances of All Time")
@@ -13,10 +13,10 @@ st.write("This app allows you to track your performances over time.")
 df = st.session_state["df"]
 
 st.sidebar.header("Filters")
-df = st_utils.filter_location(df)
-df = st_utils.filter_distance(df)
+df = st_utils.filter_races(df)
 if st.sidebar.button("Reset filters"):
     df = st.session_state["df"]
+st_utils.show_save_status()
 
 st.sidebar.subheader("Display performances")
 st.write("Here are your best performances:")
@@ -27,9 +27,9 @@ if "perfs" in st.session_state:
     )
 
 st.data_editor(
-    df,
+    st_utils.format_table(df),
     column_config={
-        "rank": st.column_config.ProgressColumn(
+        "Ratio": st.column_config.ProgressColumn(
             "Ratio",
             help="The ratio of the rank and the number of participants.",
             min_value=0,
@@ -47,6 +47,9 @@ st.data_editor(
 )
 
 
+with st.expander("📈 Progression"):
+    st_utils.show_progression_chart()
+
 # Bouton pour afficher le formulaire
 if "show_form" not in st.session_state:
     st.session_state["show_form"] = False
@@ -57,3 +60,6 @@ if st.button("➕ Ajouter une course"):
 if st.session_state["show_form"]:
     with st.form(key="add_course_form"):
         st_utils.add_new_race()
+
+with st.expander("✏️ Edit races"):
+    st_utils.edit_races()
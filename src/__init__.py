@@ -0,0 +1,50 @@
+"""
+Chron-Track: running performances and IAAF scores.
+
+The public names are imported on first access (PEP 562), so `import src` is
+free and e.g. `src.Time` only loads pydantic, not numpy, pandas or streamlit.
+"""
+
+import importlib
+from typing import Any
+
+# public name -> module defining it
+_LAZY_NAMES = {
+    "Time": "time_an_pace",
+    "Pace": "time_an_pace",
+    "parse_time": "time_an_pace",
+    "Event": "iaaf",
+    "Gender": "iaaf",
+    "IAAFCalculator": "iaaf",
+    "MainPerf": "perfs_tracker",
+    "SubPerf": "perfs_tracker",
+    "PerfsRaces": "perfs_tracker",
+    "PerfStore": "store",
+    "PerfsApi": "api",
+    "RaceHistory": "analytics",
+    "ClubRankings": "leaderboard",
+    "ProgressionCharts": "charts",
+    "FacetIndex": "facets",
+    "RaceTable": "race_table",
+    "PacingProfile": "pacing",
+    "RaceSimilarity": "similarity",
+    "RacePredictor": "predictor",
+    "ScoringEngine": "scoring",
+    "import_csv": "importer",
+    "read_track": "tracks",
+}
+
+__all__ = list(_LAZY_NAMES)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_NAMES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f".{_LAZY_NAMES[name]}", __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,112 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from .columns import RaceColumns
+from .perfs_tracker import MainPerf, PerfsRaces
+
+
+class RaceHistory:
+    def __init__(self, perfs: PerfsRaces) -> None:
+        """
+        Date-sorted array view of the main performances, on which the rolling
+        statistics are computed.
+
+        Use `RaceHistory.of(perfs)` to share one history per version of the
+        performances.
+
+        Args:
+            perfs (PerfsRaces): The performances.
+        """
+        columns = RaceColumns.from_perfs(perfs)
+        order = np.argsort(columns.date, kind="stable")
+        mains = [perf for perf in perfs if isinstance(perf, MainPerf)]
+        self.perfs: list[MainPerf] = [mains[i] for i in order]
+        self.date: np.ndarray = columns.date[order]
+        self.distance: np.ndarray = columns.distance[order]
+        self.seconds: np.ndarray = columns.seconds[order]
+        self.iaaf_score: np.ndarray = columns.iaaf_score[order]
+        self._rolling: dict[int, np.ndarray] = {}
+
+    @classmethod
+    def of(cls, perfs: PerfsRaces) -> "RaceHistory":
+        """Returns the history of perfs, built once per version of perfs."""
+        return perfs.get_derived("race_history", lambda: cls(perfs))
+
+    def __len__(self) -> int:
+        return len(self.date)
+
+    def rolling_best_score(self, window_days: int = 365) -> np.ndarray:
+        """
+        Best IAAF score over the trailing window ending at each race.
+
+        The maximum is maintained with a monotonic deque of race indices whose
+        scores decrease from front to back, so the whole history is processed in
+        O(N).
+
+        Args:
+            window_days (int, optional): Length of the window. Defaults to 365.
+
+        Returns:
+            np.ndarray: For each race (in date order), the best score of the races
+                run in the `window_days` days up to it, NaN if none was scored.
+        """
+        if window_days in self._rolling:
+            return self._rolling[window_days]
+
+        window = np.timedelta64(window_days, "D")
+        best = np.full(len(self), np.nan)
+        candidates: deque[int] = deque()
+        for i in range(len(self)):
+            score = self.iaaf_score[i]
+            if not np.isnan(score):
+                while candidates and self.iaaf_score[candidates[-1]] <= score:
+                    candidates.pop()
+                candidates.append(i)
+            while candidates and self.date[candidates[0]] <= self.date[i] - window:
+                candidates.popleft()
+            if candidates:
+                best[i] = self.iaaf_score[candidates[0]]
+
+        self._rolling[window_days] = best
+        return best
+
+    def season_bests(self) -> pd.DataFrame:
+        """
+        Best time on each distance for each season (calendar year).
+
+        Returns:
+            pd.DataFrame: One row per (season, distance) with the columns "Season",
+                "Distance (km)", "Seconds", "Date" and "IAAF score".
+        """
+        df = pd.DataFrame(
+            {
+                "Season": self.date.astype("datetime64[Y]").astype(int) + 1970,
+                "Distance (km)": self.distance,
+                "Seconds": self.seconds,
+                "Date": self.date,
+                "IAAF score": self.iaaf_score,
+            }
+        )
+        best = df.groupby(["Season", "Distance (km)"])["Seconds"].idxmin()
+        return df.loc[best.to_numpy()].reset_index(drop=True)
+
+    def progression(self, distance: float) -> pd.DataFrame:
+        """
+        Progression curve on a distance: the races which improved the personal
+        best, in date order.
+
+        Args:
+            distance (float): The distance in kilometers.
+
+        Returns:
+            pd.DataFrame: The columns "Date" and "Seconds" of each new best.
+        """
+        mask = self.distance == distance
+        dates, seconds = self.date[mask], self.seconds[mask]
+        if not len(seconds):
+            return pd.DataFrame({"Date": dates, "Seconds": seconds})
+        previous_best = np.minimum.accumulate(np.concatenate(([np.inf], seconds)))
+        improved = seconds < previous_best[:-1]
+        return pd.DataFrame({"Date": dates[improved], "Seconds": seconds[improved]})
@@ -0,0 +1,457 @@
+"""
+HTTP JSON API over the shared store: races, personal bests, leaderboards and
+IAAF scoring, served with asyncio from the standard library only.
+
+The responses of the data endpoints are cached per version of the store and
+carry an ETag, so a client sending it back in If-None-Match gets a bodyless
+304 until the races change.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from .iaaf import Event, Gender
+from .leaderboard import ClubRankings, Leaderboard
+from .scoring import ScoringEngine, parse_performance
+from .store import PerfStore
+
+CACHE_SIZE = 256
+MAX_BODY = 1 << 20
+MAX_BATCH = 10_000
+REASONS = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+}
+
+
+class ApiError(ValueError):
+    """Raised by a handler to answer with an HTTP error status."""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class ApiResponse:
+    status: int
+    body: bytes = b""
+    etag: Optional[str] = None
+
+    def encode(self, keep_alive: bool) -> bytes:
+        """The response as sent on the wire."""
+        head = [
+            f"HTTP/1.1 {self.status} {REASONS.get(self.status, '')}",
+            f"Content-Length: {len(self.body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if self.body:
+            head.append("Content-Type: application/json")
+        if self.etag is not None:
+            head.append(f"ETag: {self.etag}")
+        return ("\r\n".join(head) + "\r\n\r\n").encode() + self.body
+
+
+def _json(data: Any) -> bytes:
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def _error(status: int, message: str) -> ApiResponse:
+    return ApiResponse(status, _json({"error": message}))
+
+
+def _revalidated(response: ApiResponse, headers: dict[str, str]) -> ApiResponse:
+    """A 304 when the client already has response (If-None-Match)."""
+    if response.etag is not None and headers.get("if-none-match") == response.etag:
+        return ApiResponse(304, etag=response.etag)
+    return response
+
+
+def _param(query: dict[str, list[str]], name: str) -> Optional[str]:
+    values = query.get(name)
+    return values[-1] if values else None
+
+
+def _float_param(query: dict[str, list[str]], name: str) -> Optional[float]:
+    value = _param(query, name)
+    try:
+        return None if value is None else float(value)
+    except ValueError:
+        raise ApiError(400, f"Invalid {name}: {value}")
+
+
+def _entries(board: Leaderboard, limit: int) -> list[dict[str, Any]]:
+    return [
+        {
+            "rank": board.rank(board.key(entry)),
+            "athlete": entry.athlete,
+            "distance": entry.distance,
+            "seconds": entry.seconds,
+            "iaaf_score": entry.iaaf_score,
+            "date": str(entry.date.date()),
+            "name_event": entry.name_event,
+        }
+        for entry in board.top(limit)
+    ]
+
+
+class PerfsApi:
+    def __init__(
+        self,
+        store: PerfStore,
+        rankings: Optional[ClubRankings] = None,
+        engine: Optional[ScoringEngine] = None,
+    ) -> None:
+        """
+        The API of a store. Routes:
+
+        - GET /version: the version of the store.
+        - GET /races[?distance=]: the races, as written in the JSON file.
+        - GET /pbs: the personal bests.
+        - GET /leaderboards?gender=[&distance=][&season=][&limit=]: the
+          leaderboard by time of a distance, or by IAAF score without distance.
+        - GET /score?gender=&event=&performance=: the score of a result.
+        - POST /score: scores a batch {"gender": ..., "results": [{"event": ...,
+          "performance": ..., "gender": ...}, ...]} (the gender of a result
+          defaults to the one of the batch) to {"scores": [...]}, null for the
+          results which cannot be scored.
+
+        Args:
+            store (PerfStore): The shared store.
+            rankings (Optional[ClubRankings]): The leaderboards, updated by the
+                changes of the store (e.g. `rankings.add_athlete(store.perfs)`).
+                Without them /leaderboards answers 404.
+            engine (Optional[ScoringEngine]): The scoring engine. Defaults to
+                the one of `rankings`' tables, or of the tables in "data".
+        """
+        self.store = store
+        self.rankings = rankings
+        if engine is None:
+            engine = ScoringEngine(rankings.iaaf if rankings is not None else None)
+        self.engine = engine
+        # target -> (version, response), read on the event loop and written by
+        # the worker threads
+        self._cache: OrderedDict[str, tuple[int, ApiResponse]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._routes: dict[str, Callable[[dict[str, list[str]]], Any]] = {
+            "/version": lambda query: {"version": self.store.version},
+            "/races": self._races,
+            "/pbs": self._pbs,
+            "/leaderboards": self._leaderboards,
+        }
+
+    def _races(self, query: dict[str, list[str]]) -> Any:
+        distance = _float_param(query, "distance")
+        with self.store.read() as perfs:
+            records = perfs.to_records()
+        if distance is not None:
+            records = [record for record in records if record["distance"] == distance]
+        return {"races": records}
+
+    def _pbs(self, query: dict[str, list[str]]) -> Any:
+        with self.store.read() as perfs:
+            pbs = perfs.get_all_personal_best()
+            return {
+                "pbs": [
+                    {
+                        "distance": distance,
+                        "time": str(perf.time),
+                        "seconds": perf.time.get_seconds(),
+                        "date": str(perf.date.date()),
+                        "name_event": perf.name_event,
+                        "iaaf_score": perf.iaaf_score,
+                    }
+                    for distance, perf in pbs.items()
+                ]
+            }
+
+    def _leaderboards(self, query: dict[str, list[str]]) -> Any:
+        if self.rankings is None:
+            raise ApiError(404, "No leaderboards")
+        try:
+            gender = Gender(_param(query, "gender"))
+            season = _param(query, "season")
+            season_year = int(season) if season is not None else None
+            limit = int(_param(query, "limit") or 10)
+        except ValueError as e:
+            raise ApiError(400, str(e))
+        distance = _float_param(query, "distance")
+        # the boards are updated by the writes of the store, under its lock
+        with self.store.read():
+            board = (
+                self.rankings.score_leaderboard(gender, season_year)
+                if distance is None
+                else self.rankings.leaderboard(distance, gender, season_year)
+            )
+            return {"entries": _entries(board, limit)}
+
+    def _score(self, query: dict[str, list[str]]) -> Any:
+        try:
+            gender = Gender(_param(query, "gender"))
+            event = Event(_param(query, "event"))
+            performance = parse_performance(event, _param(query, "performance") or "")
+            return {"score": self.engine.score_one(gender, event, performance)}
+        except ValueError as e:
+            raise ApiError(400, str(e))
+
+    def _score_batch(self, body: bytes) -> ApiResponse:
+        try:
+            batch = json.loads(body)
+            results = batch["results"]
+        except (ValueError, KeyError, TypeError) as e:
+            raise ApiError(400, f"Invalid batch: {e!r}")
+        if not isinstance(results, list):
+            raise ApiError(400, "Invalid batch: results must be a list")
+        if len(results) > MAX_BATCH:
+            raise ApiError(413, f"More than {MAX_BATCH} results")
+        try:
+            genders = [
+                Gender(result.get("gender", batch.get("gender"))) for result in results
+            ]
+            events = [Event(result["event"]) for result in results]
+            performances = [str(result["performance"]) for result in results]
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise ApiError(400, f"Invalid result: {e!r}")
+        scores = self.engine.score_results(genders, events, performances)
+        return ApiResponse(
+            200,
+            _json({"scores": [None if np.isnan(s) else int(s) for s in scores]}),
+        )
+
+    def cached(self, target: str) -> bool:
+        """Whether a GET of target is answered from the cache."""
+        return self._lookup(target) is not None
+
+    def _lookup(self, target: str) -> Optional[ApiResponse]:
+        """
+        The cached response to a GET of target, None if it is missing or out of
+        date. Nothing waits for the store's lock, so it runs on the event loop.
+        """
+        with self._cache_lock:
+            entry = self._cache.get(target)
+            if entry is None or entry[0] != self.store.version:
+                return None
+            self._cache.move_to_end(target)
+            return entry[1]
+
+    def handle(
+        self,
+        method: str,
+        target: str,
+        headers: Optional[dict[str, str]] = None,
+        body: bytes = b"",
+    ) -> ApiResponse:
+        """
+        Answers a request.
+
+        Args:
+            method (str): The HTTP method.
+            target (str): The path and query string, e.g. "/races?distance=10".
+            headers (Optional[dict[str, str]]): The headers, by lowercase name.
+            body (bytes, optional): The body of a POST.
+
+        Returns:
+            ApiResponse: The response.
+        """
+        headers = headers or {}
+        url = urlsplit(target)
+        try:
+            if url.path == "/score":
+                if method == "POST":
+                    return self._score_batch(body)
+                if method == "GET":
+                    return ApiResponse(200, _json(self._score(parse_qs(url.query))))
+                return _error(405, f"{method} not allowed on {url.path}")
+            route = self._routes.get(url.path)
+            if route is None:
+                return _error(404, f"No route {url.path}")
+            if method != "GET":
+                return _error(405, f"{method} not allowed on {url.path}")
+            response = self._get(target, lambda: route(parse_qs(url.query)))
+        except ApiError as e:
+            return _error(e.status, str(e))
+        return _revalidated(response, headers)
+
+    def _get(self, target: str, build: Callable[[], Any]) -> ApiResponse:
+        """The response to a GET, built once per version of the store."""
+        # read before building: a change made meanwhile makes the entry outdated
+        version = self.store.version
+        response = self._lookup(target)
+        if response is not None:
+            return response
+        body = _json(build())
+        response = ApiResponse(
+            200, body, etag=f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+        )
+        with self._cache_lock:
+            self._cache[target] = (version, response)
+            self._cache.move_to_end(target)
+            if len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return response
+
+    async def _serve_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers: dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = (
+                    version == "HTTP/1.1"
+                    and headers.get("connection", "").lower() != "close"
+                )
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY:
+                    writer.write(_error(413, "Body too large").encode(False))
+                    break
+                body = await reader.readexactly(length) if length else b""
+                cached = self._lookup(target) if method == "GET" else None
+                if cached is not None:
+                    response = _revalidated(cached, headers)
+                else:
+                    # building a response may wait for the store's write lock
+                    response = await asyncio.to_thread(
+                        self.handle, method, target, headers, body
+                    )
+                writer.write(response.encode(keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8000) -> asyncio.Server:
+        """
+        Starts serving on host:port (0 for any free port).
+
+        Returns:
+            asyncio.Server: The server, e.g. to read its port from `sockets` or to
+                `close` it.
+        """
+        return await asyncio.start_server(self._serve_connection, host, port)
+
+
+@dataclass
+class LoadTestResult:
+    requests: int
+    seconds: float
+    latencies: list[float] = field(repr=False)  # seconds, one per request
+    statuses: dict[int, int]
+
+    @property
+    def requests_per_second(self) -> float:
+        return self.requests / self.seconds
+
+    def percentile(self, q: float) -> float:
+        """A percentile of the latencies, in milliseconds."""
+        return float(np.percentile(self.latencies, q)) * 1000
+
+    def report(self) -> str:
+        statuses = ", ".join(f"{n} x {status}" for status, n in self.statuses.items())
+        return (
+            f"{self.requests} requests in {self.seconds:.2f} s: "
+            f"{self.requests_per_second:.0f} requests/s, "
+            f"p50 {self.percentile(50):.2f} ms, p99 {self.percentile(99):.2f} ms "
+            f"({statuses})"
+        )
+
+
+async def _request(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    request: bytes,
+) -> tuple[int, dict[str, str], bytes]:
+    writer.write(request)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers: dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers, body
+
+
+async def load_test(
+    host: str,
+    port: int,
+    target: str = "/races",
+    requests: int = 10_000,
+    connections: int = 16,
+    revalidate: bool = True,
+) -> LoadTestResult:
+    """
+    Sends GET requests over keep-alive connections and times each of them.
+
+    Args:
+        host (str): The host of the API.
+        port (int): Its port.
+        target (str, optional): The path and query string requested.
+        requests (int, optional): The total number of requests.
+        connections (int, optional): The number of concurrent connections.
+        revalidate (bool, optional): Send back the ETag of the first response in
+            If-None-Match, as a caching client would, and get 304 answers.
+
+    Returns:
+        LoadTestResult: The latencies and statuses of the requests.
+    """
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    remaining = [requests]
+
+    async def client() -> None:
+        reader, writer = await asyncio.open_connection(host, port)
+        etag: Optional[str] = None
+        try:
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                head = f"GET {target} HTTP/1.1\r\nHost: {host}\r\n"
+                if etag is not None:
+                    head += f"If-None-Match: {etag}\r\n"
+                start = time.perf_counter()
+                status, headers, _ = await _request(
+                    reader, writer, (head + "\r\n").encode()
+                )
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+                if revalidate:
+                    etag = headers.get("etag", etag)
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(connections)))
+    return LoadTestResult(
+        requests=len(latencies),
+        seconds=time.perf_counter() - start,
+        latencies=latencies,
+        statuses=dict(sorted(statuses.items())),
+    )
@@ -0,0 +1,203 @@
+from collections import OrderedDict
+from datetime import date
+from typing import Hashable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .analytics import RaceHistory
+from .pacing import RaggedSplits
+from .perfs_tracker import MainPerf, PerfsRaces
+
+MAX_POINTS = 500
+CACHE_SIZE = 32
+PERIODS = ("race", "week", "month", "season")
+# metric -> column of the series, and whether lower is better
+METRICS = {"time": ("Seconds", True), "iaaf_score": ("IAAF score", False)}
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling of a series: keeps its first and
+    last points and, in each of n_out - 2 buckets of the points between, the
+    one forming the largest triangle with the point kept in the previous bucket
+    and the mean of the next bucket. Peaks and drops survive, unlike with a
+    mean or a stride.
+
+    Args:
+        x (np.ndarray): The abscissas, sorted.
+        y (np.ndarray): The values, without NaN.
+        n_out (int): The number of points to keep.
+
+    Returns:
+        np.ndarray: The indices of the kept points, increasing. All of them if
+            the series has no more than n_out points.
+    """
+    n = len(x)
+    if n <= n_out:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1][:n_out], dtype=np.int64)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_x = x[stop : edges[bucket + 2]].mean()
+            next_y = y[stop : edges[bucket + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        a = kept[bucket]
+        areas = np.abs(
+            (x[a] - next_x) * (y[start:stop] - y[a])
+            - (x[a] - x[start:stop]) * (next_y - y[a])
+        )
+        kept[bucket + 1] = start + int(np.argmax(areas))
+    return kept
+
+
+def period_start(dates: np.ndarray, period: str) -> np.ndarray:
+    """
+    First day of the week (Monday), month or season (calendar year) of each
+    date, or the dates themselves for "race".
+    """
+    days = dates.astype("datetime64[D]")
+    if period == "race":
+        return days
+    if period == "week":
+        # 1970-01-01 was a Thursday
+        return days - (days.astype(np.int64) + 3) % 7
+    if period == "month":
+        return days.astype("datetime64[M]").astype("datetime64[D]")
+    if period == "season":
+        return days.astype("datetime64[Y]").astype("datetime64[D]")
+    raise ValueError(f"Unknown period {period}, expected one of {PERIODS}")
+
+
+class ProgressionCharts:
+    def __init__(self, perfs: PerfsRaces) -> None:
+        """
+        Data of the progression charts: time or IAAF score series per distance,
+        each point a race or the best of a week, month or season, downsampled
+        with `lttb` to what a chart can draw.
+
+        The series are cached by distance, metric, period and zoom (date range
+        and number of points), the last `CACHE_SIZE` ones. Use
+        `ProgressionCharts.of(perfs)` to share the cache per version of the
+        performances.
+
+        Args:
+            perfs (PerfsRaces): The performances.
+        """
+        self.history = RaceHistory.of(perfs)
+        self._cache: OrderedDict[Hashable, pd.DataFrame] = OrderedDict()
+
+    @classmethod
+    def of(cls, perfs: PerfsRaces) -> "ProgressionCharts":
+        """Returns the charts of perfs, built once per version of perfs."""
+        return perfs.get_derived("progression_charts", lambda: cls(perfs))
+
+    def metrics(self) -> list[str]:
+        """
+        The metrics of `METRICS` with something to chart: the IAAF score only if
+        a race is scored, which needs the gender of the performances.
+        """
+        scored = not np.isnan(self.history.iaaf_score).all()
+        return [metric for metric in METRICS if metric != "iaaf_score" or scored]
+
+    def series(
+        self,
+        distance: Optional[float],
+        metric: str = "time",
+        period: str = "race",
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        max_points: int = MAX_POINTS,
+    ) -> pd.DataFrame:
+        """
+        A series to chart.
+
+        Args:
+            distance (Optional[float]): The distance in kilometers, None for all
+                the races (only with the IAAF score).
+            metric (str, optional): "time" or "iaaf_score".
+            period (str, optional): "race" for every race, or "week", "month" or
+                "season" for the best of each period.
+            start (Optional[date]): First day shown, None from the first race.
+            end (Optional[date]): Last day shown, None up to the last race.
+            max_points (int, optional): Maximum number of points returned.
+
+        Returns:
+            pd.DataFrame: The columns "Date" (the race, or the first day of the
+                period) and "Seconds" or "IAAF score", in date order. The races
+                without IAAF score are left out.
+        """
+        key = (distance, metric, period, start, end, max_points)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+        series = self._series(distance, metric, period, start, end, max_points)
+        self._cache[key] = series
+        if len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return series
+
+    def _series(
+        self,
+        distance: Optional[float],
+        metric: str,
+        period: str,
+        start: Optional[date],
+        end: Optional[date],
+        max_points: int,
+    ) -> pd.DataFrame:
+        if metric not in METRICS:
+            raise ValueError(
+                f"Unknown metric {metric}, expected one of {list(METRICS)}"
+            )
+        column, lower_is_better = METRICS[metric]
+        if distance is None and metric == "time":
+            raise ValueError("Times of different distances cannot be charted together")
+
+        history = self.history
+        values = history.seconds if metric == "time" else history.iaaf_score
+        mask = ~np.isnan(values.astype(np.float64))
+        if distance is not None:
+            mask &= history.distance == distance
+        if start is not None:
+            mask &= history.date >= np.datetime64(start, "D")
+        if end is not None:
+            mask &= history.date <= np.datetime64(end, "D")
+        dates, values = period_start(history.date[mask], period), values[mask]
+
+        if period != "race" and len(dates):
+            # the history is sorted by date, so each period is a run of races
+            dates, first = np.unique(dates, return_index=True)
+            best = np.minimum if lower_is_better else np.maximum
+            values = best.reduceat(values, first)
+
+        kept = lttb(dates.astype(np.int64), values, max_points)
+        return pd.DataFrame({"Date": dates[kept], column: values[kept]})
+
+
+def split_paces(perf: MainPerf, max_points: int = MAX_POINTS) -> pd.DataFrame:
+    """
+    Pace along a race from its base splits (e.g. the GPS splits of a track),
+    downsampled with `lttb`.
+
+    Args:
+        perf (MainPerf): The race.
+        max_points (int, optional): Maximum number of points returned.
+
+    Returns:
+        pd.DataFrame: The columns "Distance (km)" at the end of each split and
+            "Pace (s/km)" of the split.
+    """
+    splits = RaggedSplits.from_perfs([perf])
+    pace = splits.seconds / (splits.end - splits.begin)
+    kept = lttb(splits.end, pace, max_points)
+    return pd.DataFrame({"Distance (km)": splits.end[kept], "Pace (s/km)": pace[kept]})
@@ -0,0 +1,495 @@
+"""
+Command line entry point: `chrontrack <command>`.
+
+Only the standard library is imported here; each command imports what it needs,
+so e.g. `chrontrack score` never loads pandas or streamlit.
+"""
+
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional, TextIO
+
+if TYPE_CHECKING:
+    from .api import PerfsApi
+    from .perfs_tracker import PerfsRaces
+
+DEFAULT_DATA_FILE = Path("data/perfs.json")
+DEFAULT_IAAF_DIR = Path("data")
+GENDERS = ("male", "female")
+
+
+def _write_lines(lines: Iterable[str], out: TextIO) -> None:
+    for line in lines:
+        out.write(line + "\n")
+
+
+def _iter_lines(stream: TextIO) -> Iterator[str]:
+    for line in stream:
+        if line.strip() and not line.startswith("#"):
+            yield line.strip()
+
+
+def _iter_input(source: str) -> Iterator[str]:
+    if source == "-":
+        yield from _iter_lines(sys.stdin)
+        return
+    with open(source) as stream:
+        yield from _iter_lines(stream)
+
+
+def cmd_score(args: argparse.Namespace, out: TextIO) -> int:
+    from .iaaf import Event, Gender, IAAFCalculator
+    from .scoring import ScoringEngine, parse_performance
+
+    engine = ScoringEngine(IAAFCalculator(args.iaaf_dir))
+    gender = Gender(args.gender)
+
+    def score(event_str: str, performance: str) -> int:
+        event = Event(event_str)
+        return engine.score_one(gender, event, parse_performance(event, performance))
+
+    if args.input is None:
+        if args.event is None or args.performance is None:
+            raise ValueError("Give an event and a performance, or --input")
+        out.write(f"{score(args.event, args.performance)}\n")
+        return 0
+
+    # stream "event,performance" lines to "event,performance,score" lines
+    def lines() -> Iterator[str]:
+        for line in _iter_input(args.input):
+            event, performance = (part.strip() for part in line.split(",", 1))
+            yield f"{event},{performance},{score(event, performance)}"
+
+    _write_lines(lines(), out)
+    return 0
+
+
+def _load_perfs(args: argparse.Namespace) -> "PerfsRaces":
+    from .iaaf import Gender
+    from .perfs_tracker import PerfsRaces
+
+    perfs = PerfsRaces.load_cached(args.data) if args.data.exists() else PerfsRaces()
+    perfs.gender = Gender(args.gender) if args.gender else None
+    return perfs
+
+
+def cmd_pbs(args: argparse.Namespace, out: TextIO) -> int:
+    from contextlib import redirect_stdout
+
+    with redirect_stdout(sys.stderr):
+        perfs = _load_perfs(args)
+        if perfs.gender is not None:
+            perfs.compute_iaaf_scores()
+    out.write("distance_km,time,date,event,iaaf_score\n")
+    _write_lines(
+        (
+            f"{distance},{perf.time},{perf.date.date()},{perf.name_event},"
+            f"{'' if perf.iaaf_score is None else perf.iaaf_score}"
+            for distance, perf in perfs.get_all_personal_best().items()
+        ),
+        out,
+    )
+    return 0
+
+
+def cmd_import(args: argparse.Namespace, out: TextIO) -> int:
+    from contextlib import redirect_stdout
+
+    from .iaaf import Gender
+    from .importer import import_csv
+    from .replication import Replica
+    from .store import PerfStore
+
+    column_map = dict(item.split("=", 1) for item in args.column or [])
+    with redirect_stdout(sys.stderr):
+        store = PerfStore(args.data)
+    try:
+        perfs = store.perfs
+        perfs.gender = Gender(args.gender) if args.gender else None
+        perfs.athlete = perfs.athlete or args.athlete
+        result = import_csv(args.csv, column_map=column_map).of_athlete(perfs.athlete)
+        for row, reason in zip(result.rejected["row"], result.rejected["reason"]):
+            sys.stderr.write(f"rejected row {row}: {reason}\n")
+        if args.dry_run:
+            added = result.add_to(perfs, upsert=args.upsert)
+        else:
+            # through the store of the node, which logs the races for its peers
+            Replica(args.data.parent, store)
+            _, added = store.batch(lambda perfs: result.add_to(perfs, args.upsert))
+    finally:
+        store.writer.close()
+    out.write(
+        f"{added} races imported, {len(result) - added} already recorded, "
+        f"{len(result.rejected)} rejected\n"
+    )
+    return 0 if added or not len(result.rejected) else 1
+
+
+def cmd_convert(args: argparse.Namespace, out: TextIO) -> int:
+    import numpy as np
+
+    from .iaaf import EVENT_DISTANCES, Event, Gender
+    from .predictor import get_predictor
+    from .time_an_pace import Time, format_pace, parse_time
+
+    event = Event(args.event)
+    seconds = parse_time(args.time).get_seconds()
+    targets = [Event(target) for target in args.to] or list(EVENT_DISTANCES)
+    if args.riegel:
+        if event not in EVENT_DISTANCES:
+            raise ValueError(f"Riegel's formula needs a flat running event: {event}")
+        predicted = get_predictor(Gender(args.gender)).predict_riegel(
+            np.array([EVENT_DISTANCES[event]]),
+            np.array([seconds]),
+            np.array([EVENT_DISTANCES.get(target, np.nan) for target in targets]),
+        )[0]
+    else:
+        predicted = get_predictor(Gender(args.gender)).predict(
+            [event], np.array([seconds]), targets
+        )[0]
+
+    out.write("event,time,pace_min_km\n")
+    for target, target_seconds in zip(targets, predicted):
+        if np.isnan(target_seconds):
+            out.write(f"{target.value},,\n")
+            continue
+        distance = EVENT_DISTANCES.get(target)
+        pace = format_pace(target_seconds / distance) if distance else ""
+        time_str = Time.from_total_seconds(round(target_seconds))
+        out.write(f"{target.value},{time_str},{pace}\n")
+    return 0
+
+
+def cmd_iaaf_table(args: argparse.Namespace, out: TextIO) -> int:
+    from .iaaf import TABLE_FILENAME, compile_coefficients, verify_coefficients
+
+    if not args.check:
+        compile_coefficients(args.iaaf_dir)
+        out.write(f"wrote {args.iaaf_dir / TABLE_FILENAME}\n")
+    compared = verify_coefficients(args.iaaf_dir)
+    out.write(f"{args.iaaf_dir / TABLE_FILENAME}: {compared} scores identical\n")
+    return 0
+
+
+def _synthetic_records(n: int) -> list[dict[str, object]]:
+    """Records of n 10 km races with 1 km splits, as written by save_to_json."""
+    records: list[dict[str, object]] = []
+    for i in range(n):
+        seconds = 2400 + i % 600
+        records.append(
+            {
+                "name_event": f"Race {i}",
+                "date": f"{2000 + i // 336}-{i // 28 % 12 + 1:02d}-{i % 28 + 1:02d}",
+                "distance": 10.0,
+                "time": f"{seconds // 60}min{seconds % 60}s",
+                "location": "Paris",
+                "sub_perfs": [
+                    {
+                        "time": f"{seconds // 600}min{seconds // 10 % 60}s",
+                        "distance": "1.0",
+                        "begin_distance": f"{k}.0",
+                        "end_distance": f"{k + 1}.0",
+                    }
+                    for k in range(10)
+                ],
+            }
+        )
+    return records
+
+
+def cmd_bench(args: argparse.Namespace, out: TextIO) -> int:
+    from contextlib import redirect_stdout
+
+    def timed(name: str, function: Callable[[], object]) -> None:
+        start = time.perf_counter()
+        with redirect_stdout(sys.stderr if args.verbose else io.StringIO()):
+            function()
+        out.write(f"{name}: {(time.perf_counter() - start) * 1000:.1f} ms\n")
+        out.flush()
+
+    from .iaaf import Gender, IAAFCalculator
+    from .perfs_tracker import PerfsRaces
+
+    timed("load IAAF tables", lambda: IAAFCalculator(args.iaaf_dir))
+    perfs = PerfsRaces(gender=Gender(args.gender))
+    if args.data.exists():
+        timed(f"load {args.data}", lambda: perfs.load_from_json(args.data))
+        timed("table()", perfs.table)
+        timed("personal bests", perfs.get_all_personal_best)
+        timed("IAAF scores", perfs.compute_iaaf_scores)
+        timed("IAAF scores, nothing changed", perfs.compute_iaaf_scores)
+
+    import tempfile
+
+    from .persistence import write_snapshot
+
+    # cold start on a large archive: validated vs trusted load of a snapshot
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = Path(tmp) / "perfs.json"
+        write_snapshot(archive, _synthetic_records(args.races))
+        for validate in (True, False):
+            timed(
+                f"load {args.races} races ({'validated' if validate else 'trusted'})",
+                lambda: PerfsRaces().load_from_json(archive, validate=validate),
+            )
+        timed("build the warm start cache", lambda: PerfsRaces.load_cached(archive))
+        timed(
+            f"warm start on {args.races} races",
+            lambda: PerfsRaces.load_cached(archive),
+        )
+
+        from .similarity import RaceSimilarity
+
+        with redirect_stdout(io.StringIO()):
+            archived = PerfsRaces.load_cached(archive)
+        similarity = RaceSimilarity(archived)
+        timed("index the pacing profiles", lambda: RaceSimilarity(archived))
+        timed("5 races paced alike", lambda: similarity.similar(similarity.races[0]))
+
+    import numpy as np
+    import pandas as pd
+
+    from .importer import parse_results
+
+    n = args.rows
+    rng = np.random.default_rng(0)
+    seconds = rng.integers(1800, 3600, n)
+    sheet = pd.DataFrame(
+        {
+            "name_event": "10km",
+            "date": "2024-04-07",
+            "distance": "10",
+            "time": [f"{s // 60}:{s % 60:02d}" for s in seconds],
+            "location": "Paris",
+        }
+    )
+    timed(f"parse {n} CSV rows", lambda: parse_results(sheet))
+    return 0
+
+
+def _make_api(args: argparse.Namespace) -> "PerfsApi":
+    from .api import PerfsApi
+    from .iaaf import Gender, IAAFCalculator
+    from .leaderboard import ClubRankings
+    from .store import PerfStore
+
+    store = PerfStore(args.data)
+    rankings = None
+    if args.gender:
+        store.perfs.athlete = store.perfs.athlete or args.athlete
+        store.perfs.gender = Gender(args.gender)
+        rankings = ClubRankings(IAAFCalculator(args.iaaf_dir))
+        rankings.add_athlete(store.perfs)
+    return PerfsApi(store, rankings)
+
+
+def cmd_serve(args: argparse.Namespace, out: TextIO) -> int:
+    import asyncio
+
+    async def serve() -> None:
+        server = await _make_api(args).serve(args.host, args.port)
+        out.write(f"serving on http://{args.host}:{args.port}\n")
+        out.flush()
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def cmd_loadtest(args: argparse.Namespace, out: TextIO) -> int:
+    import asyncio
+    from contextlib import redirect_stdout
+
+    from .api import load_test
+
+    async def run() -> None:
+        host, port, server = args.host, args.port, None
+        if port is None:
+            # no running API given: serve the data file on a free local port
+            with redirect_stdout(sys.stderr):
+                api = _make_api(args)
+            server = await api.serve("127.0.0.1", 0)
+            host, port = "127.0.0.1", server.sockets[0].getsockname()[1]
+        for target in args.target or ["/races", "/pbs"]:
+            for revalidate in (False, True):
+                result = await load_test(
+                    host,
+                    port,
+                    target,
+                    requests=args.requests,
+                    connections=args.connections,
+                    revalidate=revalidate,
+                )
+                mode = "If-None-Match" if revalidate else "full body"
+                out.write(f"GET {target} ({mode}): {result.report()}\n")
+                out.flush()
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(run())
+    return 0
+
+
+def cmd_sync(args: argparse.Namespace, out: TextIO) -> int:
+    from contextlib import redirect_stdout
+
+    from .replication import Replica
+
+    with redirect_stdout(sys.stderr):
+        replica = Replica(args.node)
+    try:
+        for peer in args.peers:
+            applied = replica.pull(peer)
+            out.write(f"{peer}: {applied} changes applied\n")
+        if args.compact:
+            dropped = replica.compact(args.peers)
+            out.write(f"{dropped} changes applied by all the peers dropped\n")
+    finally:
+        replica.store.writer.close()
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="chrontrack", description="Running performances without the web app."
+    )
+    parser.add_argument(
+        "--iaaf-dir",
+        type=Path,
+        default=DEFAULT_IAAF_DIR,
+        help="directory of the IAAF scoring tables",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    score = commands.add_parser("score", help="IAAF score of performances")
+    score.add_argument("-g", "--gender", choices=GENDERS, required=True)
+    score.add_argument("event", nargs="?", help='e.g. "10km", "HM", "LJ"')
+    score.add_argument(
+        "performance",
+        nargs="?",
+        help='a time ("40:12", "1h25min0s", "10.52"), a mark in meters or points',
+    )
+    score.add_argument(
+        "-i",
+        "--input",
+        help='file of "event,performance" lines to score, "-" for stdin',
+    )
+    score.set_defaults(run=cmd_score)
+
+    pbs = commands.add_parser("pbs", help="personal bests as CSV")
+    pbs.add_argument("-d", "--data", type=Path, default=DEFAULT_DATA_FILE)
+    pbs.add_argument("-g", "--gender", choices=GENDERS)
+    pbs.set_defaults(run=cmd_pbs)
+
+    import_ = commands.add_parser("import", help="import a CSV results sheet")
+    import_.add_argument("csv", type=Path)
+    import_.add_argument("-d", "--data", type=Path, default=DEFAULT_DATA_FILE)
+    import_.add_argument("-g", "--gender", choices=GENDERS)
+    import_.add_argument(
+        "-a", "--athlete", help="athlete of the races, the rows of others are rejected"
+    )
+    import_.add_argument(
+        "-c",
+        "--column",
+        action="append",
+        metavar="SHEET=NAME",
+        help='rename a sheet column, e.g. "Chrono=time"',
+    )
+    import_.add_argument(
+        "-u", "--upsert", action="store_true", help="replace the races already recorded"
+    )
+    import_.add_argument("-n", "--dry-run", action="store_true")
+    import_.set_defaults(run=cmd_import)
+
+    convert = commands.add_parser("convert", help="equivalent times on other events")
+    convert.add_argument("-g", "--gender", choices=GENDERS, required=True)
+    convert.add_argument("event")
+    convert.add_argument("time")
+    convert.add_argument("--to", nargs="*", default=[], help="target events")
+    convert.add_argument("--riegel", action="store_true", help="use Riegel's formula")
+    convert.set_defaults(run=cmd_convert)
+
+    iaaf_table = commands.add_parser(
+        "iaaf-table", help="compile the IAAF scoring formulas to a binary table"
+    )
+    iaaf_table.add_argument(
+        "--check", action="store_true", help="only verify the compiled table"
+    )
+    iaaf_table.set_defaults(run=cmd_iaaf_table)
+
+    bench = commands.add_parser("bench", help="time the main operations")
+    bench.add_argument("-d", "--data", type=Path, default=DEFAULT_DATA_FILE)
+    bench.add_argument("-g", "--gender", choices=GENDERS, default="male")
+    bench.add_argument("--rows", type=int, default=100_000)
+    bench.add_argument(
+        "--races", type=int, default=10_000, help="races of the synthetic archive"
+    )
+    bench.add_argument("-v", "--verbose", action="store_true")
+    bench.set_defaults(run=cmd_bench)
+
+    serve = commands.add_parser("serve", help="serve the races as an HTTP JSON API")
+    serve.add_argument("-d", "--data", type=Path, default=DEFAULT_DATA_FILE)
+    serve.add_argument(
+        "-g", "--gender", choices=GENDERS, help="rank the races on leaderboards"
+    )
+    serve.add_argument("--athlete", default="me", help="name on the leaderboards")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.set_defaults(run=cmd_serve)
+
+    loadtest = commands.add_parser(
+        "loadtest", help="requests per second and latency of the HTTP API"
+    )
+    loadtest.add_argument("-d", "--data", type=Path, default=DEFAULT_DATA_FILE)
+    loadtest.add_argument("-g", "--gender", choices=GENDERS)
+    loadtest.add_argument("--athlete", default="me")
+    loadtest.add_argument("--host", default="127.0.0.1")
+    loadtest.add_argument(
+        "--port", type=int, help="port of a running API, else one is started"
+    )
+    loadtest.add_argument(
+        "-t", "--target", action="append", help='path requested, e.g. "/pbs"'
+    )
+    loadtest.add_argument("-n", "--requests", type=int, default=10_000)
+    loadtest.add_argument("-c", "--connections", type=int, default=16)
+    loadtest.set_defaults(run=cmd_loadtest)
+
+    sync = commands.add_parser(
+        "sync", help="apply the changes made on other nodes to this one"
+    )
+    sync.add_argument("peers", type=Path, nargs="+", help="directories of the peers")
+    sync.add_argument(
+        "-n",
+        "--node",
+        type=Path,
+        default=DEFAULT_DATA_FILE.parent,
+        help="directory of this node",
+    )
+    sync.add_argument(
+        "--compact",
+        action="store_true",
+        help="drop from the log the changes applied by all the peers",
+    )
+    sync.set_defaults(run=cmd_sync)
+    return parser
+
+
+def main(argv: Optional[list[str]] = None, out: Optional[TextIO] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.run(args, out if out is not None else sys.stdout)
+    except (ValueError, FileNotFoundError) as e:
+        sys.stderr.write(f"chrontrack {args.command}: error: {e}\n")
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
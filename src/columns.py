@@ -0,0 +1,95 @@
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from .iaaf import IAAFCalculator, compute_points
+from .perfs_tracker import ROAD_EVENTS, MainPerf, PerfsRaces
+from .time_an_pace import format_pace
+
+
+def pace_seconds_per_km(seconds: np.ndarray, distance: np.ndarray) -> np.ndarray:
+    """Pace in seconds per kilometer."""
+    return seconds / distance
+
+
+def speed_kmh(seconds: np.ndarray, distance: np.ndarray) -> np.ndarray:
+    """Speed in kilometers per hour."""
+    return distance * 3600 / seconds
+
+
+@dataclass(frozen=True)
+class RaceColumns:
+    """
+    Numeric columns of the main performances, one row per MainPerf in the order
+    of `PerfsRaces.perfs`.
+    """
+
+    date: np.ndarray  # datetime64[D]
+    distance: np.ndarray  # float64, km
+    seconds: np.ndarray  # int64
+    pace: np.ndarray  # float64, s/km
+    speed: np.ndarray  # float64, km/h
+    iaaf_score: np.ndarray  # float64, NaN when no score
+
+    @classmethod
+    def from_perfs(
+        cls, perfs: PerfsRaces, iaaf: Optional[IAAFCalculator] = None
+    ) -> "RaceColumns":
+        """
+        Builds the columns in one pass over the races, then computes pace, speed
+        and IAAF score on the whole arrays.
+
+        Args:
+            perfs (PerfsRaces): The performances.
+            iaaf (Optional[IAAFCalculator]): The calculator to use for the scores.
+                Defaults to `perfs.iaaf`. The scores are NaN if there is neither
+                calculator nor gender.
+
+        Returns:
+            RaceColumns: The columns.
+        """
+        mains = [perf for perf in perfs if isinstance(perf, MainPerf)]
+        date = np.array([perf.date.date() for perf in mains], dtype="datetime64[D]")
+        distance = np.fromiter(
+            (perf.distance for perf in mains), dtype=np.float64, count=len(mains)
+        )
+        seconds = np.fromiter(
+            (perf.time.get_seconds() for perf in mains),
+            dtype=np.int64,
+            count=len(mains),
+        )
+
+        iaaf = iaaf if iaaf is not None else perfs.iaaf
+        if iaaf is None or perfs.gender is None:
+            iaaf_score = np.full(len(mains), np.nan)
+        else:
+            # one coefficient lookup per distinct distance
+            distances, inverse = np.unique(distance, return_inverse=True)
+            events = [ROAD_EVENTS.get(float(d)) for d in distances]
+            coeffs = iaaf.get_coeffs_array(perfs.gender, events)[inverse]
+            iaaf_score = compute_points(coeffs, seconds)
+
+        return cls(
+            date=date,
+            distance=distance,
+            seconds=seconds,
+            pace=pace_seconds_per_km(seconds, distance),
+            speed=speed_kmh(seconds, distance),
+            iaaf_score=iaaf_score,
+        )
+
+    def __len__(self) -> int:
+        return len(self.seconds)
+
+    def format_pace(self, rows: np.ndarray | slice) -> list[str]:
+        """
+        Formats the pace of the given rows only, e.g. the rows on screen.
+
+        Args:
+            rows (np.ndarray | slice): The rows to format.
+
+        Returns:
+            list[str]: The paces formatted as "mm'ss".
+        """
+        return [format_pace(pace) for pace in self.pace[rows]]
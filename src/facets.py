@@ -0,0 +1,189 @@
+from collections.abc import Collection, Hashable, Iterable, Sequence
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# facet -> column of `PerfsRaces.table()` it is read from
+FACET_COLUMNS = {
+    "location": "Location",
+    "distance": "Distance (km)",
+    "year": "Date",
+    "event": "Event",
+}
+
+# positions of the set bits of each byte value
+_BYTE_BITS = [
+    tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)
+]
+
+
+def bitset(positions: Iterable[int]) -> int:
+    """The int whose bits are set at the given positions."""
+    buffer = bytearray()
+    for position in positions:
+        byte = position >> 3
+        if byte >= len(buffer):
+            buffer.extend(bytes(byte + 1 - len(buffer)))
+        buffer[byte] |= 1 << (position & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def positions(bits: int) -> list[int]:
+    """Positions of the set bits of bits, in increasing order."""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    return [
+        i * 8 + bit for i, byte in enumerate(data) if byte for bit in _BYTE_BITS[byte]
+    ]
+
+
+def _facet_values(facet: str, column: "pd.Series") -> list[Optional[Hashable]]:
+    if facet == "year":
+        return column.dt.year.tolist()
+    # the missing values (e.g. the event of a distance which is not a road
+    # event) are in no bitset
+    return column.astype(object).where(column.notna(), None).tolist()
+
+
+def table_values(df: "pd.DataFrame") -> dict[str, Sequence[Optional[Hashable]]]:
+    """The value of each facet of the rows of `PerfsRaces.table()`."""
+    return {
+        facet: _facet_values(facet, df[column])
+        for facet, column in FACET_COLUMNS.items()
+    }
+
+
+def _sort(values: Iterable[Hashable]) -> list[Hashable]:
+    try:
+        return sorted(values)  # type: ignore[type-var]
+    except TypeError:
+        return sorted(values, key=str)
+
+
+class FacetIndex:
+    def __init__(self, facets: dict[str, Sequence[Optional[Hashable]]]) -> None:
+        """
+        Inverted index of the rows of a table by facet: for each facet and each
+        of its values, the bitset of the rows having this value (bit i for row
+        i), stored as a Python int.
+
+        Filtering on several facets is then an intersection of bitsets, and the
+        number of rows of an option a popcount, whatever the number of rows.
+
+        Args:
+            facets (dict[str, Sequence[Optional[Hashable]]]): The value of each
+                row for each facet, all of the same length. Rows whose value is
+                None are in no bitset of the facet.
+        """
+        lengths = {len(values) for values in facets.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"The facets have different lengths: {lengths}")
+        self.n_rows = lengths.pop() if lengths else 0
+        self.all = (1 << self.n_rows) - 1
+        self.bitsets: dict[str, dict[Hashable, int]] = {}
+        for facet, values in facets.items():
+            rows: dict[Hashable, list[int]] = {}
+            for i, value in enumerate(values):
+                if value is not None:
+                    rows.setdefault(value, []).append(i)
+            self.bitsets[facet] = {value: bitset(rows[value]) for value in _sort(rows)}
+
+    @classmethod
+    def from_table(cls, df: "pd.DataFrame") -> "FacetIndex":
+        """
+        Indexes the rows of `PerfsRaces.table()` by location, distance, year and
+        road event.
+        """
+        return cls(table_values(df))
+
+    def insert(self, row: int, values: dict[str, Optional[Hashable]]) -> None:
+        """
+        Inserts a row at a position, shifting the following rows by one.
+
+        Args:
+            row (int): The position of the new row.
+            values (dict[str, Optional[Hashable]]): The value of the row for each
+                facet. A missing or None value puts the row in no bitset.
+        """
+        if not 0 <= row <= self.n_rows:
+            raise IndexError(f"Row {row} out of {self.n_rows} rows")
+        low = (1 << row) - 1
+        for facet, bitsets in self.bitsets.items():
+            for value, bits in bitsets.items():
+                bitsets[value] = bits & low | (bits & ~low) << 1
+            value = values.get(facet)
+            if value is None:
+                continue
+            if value in bitsets:
+                bitsets[value] |= 1 << row
+            else:
+                bitsets[value] = 1 << row
+                self.bitsets[facet] = {v: bitsets[v] for v in _sort(bitsets)}
+        self.n_rows += 1
+        self.all = (1 << self.n_rows) - 1
+
+    def delete(self, row: int) -> None:
+        """
+        Deletes the row at a position, shifting the following rows by one. The
+        values left without rows are removed from the options.
+        """
+        if not 0 <= row < self.n_rows:
+            raise IndexError(f"Row {row} out of {self.n_rows} rows")
+        low = (1 << row) - 1
+        for facet, bitsets in self.bitsets.items():
+            shifted = {
+                value: bits & low | bits >> (row + 1) << row
+                for value, bits in bitsets.items()
+            }
+            self.bitsets[facet] = {
+                value: bits for value, bits in shifted.items() if bits
+            }
+        self.n_rows -= 1
+        self.all = (1 << self.n_rows) - 1
+
+    def options(self, facet: str) -> list[Hashable]:
+        """The values of a facet, sorted."""
+        return list(self.bitsets[facet])
+
+    def select(self, **selection: Optional[Hashable | Collection[Hashable]]) -> int:
+        """
+        Rows matching a selection, e.g. `select(location="Paris", year=[2023,
+        2024])`: a row matches when for each facet its value is selected. None
+        selects every row.
+
+        Returns:
+            int: The bitset of the matching rows.
+        """
+        mask = self.all
+        for facet, selected in selection.items():
+            if selected is None:
+                continue
+            values = (
+                selected
+                if isinstance(selected, Collection) and not isinstance(selected, str)
+                else [selected]
+            )
+            union = 0
+            for value in values:
+                union |= self.bitsets[facet].get(value, 0)
+            mask &= union
+        return mask
+
+    def counts(
+        self, facet: str, **selection: Optional[Hashable | Collection[Hashable]]
+    ) -> dict[Hashable, int]:
+        """
+        Number of rows of each value of a facet, among the rows matching the
+        selection of the other facets (the selection of the facet itself is
+        ignored, so that its other options keep their counts).
+        """
+        selection.pop(facet, None)
+        mask = self.select(**selection)
+        return {
+            value: (bits & mask).bit_count()
+            for value, bits in self.bitsets[facet].items()
+        }
+
+    def rows(self, **selection: Optional[Hashable | Collection[Hashable]]) -> list[int]:
+        """Positions of the rows matching the selection, in increasing order."""
+        return positions(self.select(**selection))
@@ -1,11 +1,25 @@
-import json
+import hashlib
+import math
+import mmap
+import struct
+import sys
+from array import array
 from enum import Enum
+from functools import cache, cached_property
 from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Sequence, TypeVar
 
 from pydantic import RootModel
+from typing_extensions import Self
 
+from .persistence import atomic_write_bytes
 from .time_an_pace import Time
 
+if TYPE_CHECKING:
+    # numpy is imported by the vectorized functions only, scoring a single time
+    # does not need it
+    import numpy as np
+
 
 class Gender(str, Enum):
     male = "male"
@@ -74,6 +88,132 @@ class Event(str, Enum):
     eDecathlon = "Decathlon"
 
 
+FIELD_EVENTS: frozenset[Event] = frozenset(
+    Event(e) for e in ("HJ", "PV", "LJ", "TJ", "SP", "DT", "HT", "JT")
+)
+COMBINED_EVENTS: frozenset[Event] = frozenset(
+    Event(e) for e in ("Heptathlon", "Decathlon")
+)
+TIMED_EVENTS: tuple[Event, ...] = tuple(
+    e for e in Event if e not in FIELD_EVENTS and e not in COMBINED_EVENTS
+)
+
+# distance in km of the flat running events
+EVENT_DISTANCES: dict[Event, float] = {
+    Event("100m"): 0.1,
+    Event("200m"): 0.2,
+    Event("300m"): 0.3,
+    Event("400m"): 0.4,
+    Event("500m"): 0.5,
+    Event("600m"): 0.6,
+    Event("800m"): 0.8,
+    Event("1000m"): 1,
+    Event("1500m"): 1.5,
+    Event("Mile"): 1.609344,
+    Event("2000m"): 2,
+    Event("3000m"): 3,
+    Event("2 Miles"): 3.218688,
+    Event("5000m"): 5,
+    Event("10,000m"): 10,
+    Event("5km"): 5,
+    Event("10km"): 10,
+    Event("15km"): 15,
+    Event("10 Miles"): 16.09344,
+    Event("20km"): 20,
+    Event("HM"): 21.0975,
+    Event("25km"): 25,
+    Event("30km"): 30,
+    Event("Marathon"): 42.195,
+    Event("100km"): 100,
+}
+
+MAX_SCORE = 1400
+
+JSON_FILENAME = "iaaf_scoring_formulas.json"
+TABLE_FILENAME = "iaaf_coefficients.bin"
+
+EnumT = TypeVar("EnumT", bound=Enum)
+# (modification time in ns, size) of a file, None when it does not exist
+FileStamp = Optional[tuple[int, int]]
+# a performance, or an array of performances
+NumberT = TypeVar("NumberT", float, "np.ndarray")
+
+
+def iaaf_polynomial(
+    coeffs: Sequence[NumberT],
+    performance: NumberT,
+    lower_is_better: bool = True,
+) -> tuple[NumberT, "bool | np.ndarray"]:
+    """
+    IAAF scoring formula a*x^2 + b*x + c, unrounded, of a performance or
+    elementwise of an array of performances.
+
+    Past the vertex of the parabola the formula would increase again, so the
+    performances past it (slower times, or shorter marks of the field and
+    combined events) score 0.
+
+    Args:
+        coeffs (Sequence[NumberT]): The coefficients (a, b, c), floats or
+            arrays of the coefficients of each performance.
+        performance (NumberT): The performance, in seconds for timed events, or
+            an array of performances.
+        lower_is_better (bool, optional): Whether the performance is a time.
+
+    Returns:
+        tuple[NumberT, bool | np.ndarray]: The points, and whether the
+            performance is past the vertex and scores 0.
+    """
+    a, b, c = coeffs
+    points = a * performance**2 + b * performance + c
+    vertex = -b / (2 * a)
+    if lower_is_better:
+        return points, performance >= vertex
+    return points, performance <= vertex
+
+
+def score_performance(
+    coeffs: Sequence[float], performance: float, lower_is_better: bool = True
+) -> int:
+    """
+    IAAF score of a performance (see `iaaf_polynomial`), rounded and capped to
+    [0, 1400].
+
+    Args:
+        coeffs (Sequence[float]): The coefficients (a, b, c) of the event.
+        performance (float): The performance, in seconds for timed events.
+        lower_is_better (bool, optional): Whether the performance is a time.
+
+    Returns:
+        int: The score.
+    """
+    points, past_vertex = iaaf_polynomial(coeffs, performance, lower_is_better)
+    if past_vertex:
+        return 0
+    return min(max(round(points), 0), MAX_SCORE)
+
+
+def compute_points(
+    coeffs: "np.ndarray", performances: "np.ndarray", lower_is_better: bool = True
+) -> "np.ndarray":
+    """
+    Vectorized IAAF score (see `iaaf_polynomial`).
+
+    Args:
+        coeffs (np.ndarray): Array of shape (n, 3) with the coefficients (a, b, c)
+            of each performance. Rows of NaN give a NaN score.
+        performances (np.ndarray): Array of shape (n,) with the performances.
+        lower_is_better (bool, optional): Whether the performances are times.
+
+    Returns:
+        np.ndarray: The scores as floats, rounded and clipped to [0, 1400], NaN where
+            the coefficients are unknown.
+    """
+    import numpy as np
+
+    points, past_vertex = iaaf_polynomial(list(coeffs.T), performances, lower_is_better)
+    return np.clip(np.round(np.where(past_vertex, 0, points)), 0, MAX_SCORE)
+
+
 class Coeff(RootModel[tuple[float, float, float]]):
     """Coefficients for IAAF scoring formula"""
 
@@ -90,16 +230,7 @@ class Coeff(RootModel[tuple[float, float, float]]):
             int: The IAAF score calculated based on the performance time. The score is
                 capped at 1400 and a minimum of 0.
         """
-        performance = time.get_seconds()
-        a, b, c = self.root
-        points = round(a * performance**2 + b * performance + c)
-        if points < 0:
-            return 0
-        if points > 1400:
-            # if calculate_performance(self, 1400) < performance:
-            #     return 0
-            return 1400
-        return points
+        return score_performance(self.root, time.get_seconds())
 
 
 class IaafModel(RootModel[dict[Gender, dict[Event, Coeff]]]):
@@ -135,25 +266,333 @@ class IaafModel(RootModel[dict[Gender, dict[Event, Coeff]]]):
         return self.root[gender][event]
 
 
+@cache
+def _enum_index(enum: type[EnumT], names: tuple[str, ...]) -> dict[EnumT, int]:
+    """Position of each member of enum in names, skipping unknown names."""
+    index = {}
+    for i, name in enumerate(names):
+        try:
+            index[enum(name)] = i
+        except ValueError:
+            pass
+    return index
+
+
+class CoefficientTable:
+    """
+    IAAF coefficients compiled in a (gender x event x 3) float64 array, NaN
+    where a gender has no scoring table for an event.
+
+    The binary file is made of a header, the names of the genders and events
+    separated by newlines and padded to 8 bytes, then the little-endian array.
+    It is memory-mapped when loaded, so nothing is parsed but the names.
+    """
+
+    MAGIC = b"IAAFTBL\0"
+    FORMAT_VERSION = 1
+    # magic, format version, number of genders, number of events, length of the
+    # names block, sha256 of the JSON file the table was compiled from
+    HEADER = struct.Struct("<8sIIII32s")
+
+    def __init__(
+        self,
+        genders: Sequence[str],
+        events: Sequence[str],
+        values: "memoryview[float] | array[float]",
+        source_hash: bytes = bytes(32),
+    ) -> None:
+        if len(values) != len(genders) * len(events) * 3:
+            raise ValueError(
+                f"Expected {len(genders) * len(events) * 3} coefficients, "
+                f"got {len(values)}"
+            )
+        self.genders = tuple(genders)
+        self.events = tuple(events)
+        self.values = values
+        self.source_hash = source_hash
+        self.gender_index = _enum_index(Gender, self.genders)
+        self.event_index = _enum_index(Event, self.events)
+
+    @classmethod
+    def from_model(cls, model: IaafModel, source_hash: bytes = bytes(32)) -> Self:
+        """
+        Compiles a parsed scoring model, with the genders and events in the order
+        of the enums.
+        """
+        values = array("d", [math.nan]) * (len(Gender) * len(Event) * 3)
+        for g, gender in enumerate(Gender):
+            for e, event in enumerate(Event):
+                coeff = model.root.get(gender, {}).get(event)
+                if coeff is not None:
+                    i = (g * len(Event) + e) * 3
+                    values[i : i + 3] = array("d", coeff.root)
+        return cls(
+            [gender.value for gender in Gender],
+            [event.value for event in Event],
+            values,
+            source_hash,
+        )
+
+    @classmethod
+    def load(cls, filepath: Path) -> Self:
+        """
+        Memory-maps a compiled table.
+
+        Raises:
+            ValueError: If the file is not a compiled table of this format.
+        """
+        with open(filepath, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(buffer) < cls.HEADER.size:
+            raise ValueError(f"{filepath} is not an IAAF coefficient table")
+        magic, version, n_genders, n_events, names_size, source_hash = (
+            cls.HEADER.unpack_from(buffer)
+        )
+        if magic != cls.MAGIC or version != cls.FORMAT_VERSION:
+            raise ValueError(
+                f"{filepath} is not an IAAF coefficient table of version "
+                f"{cls.FORMAT_VERSION}"
+            )
+        names = bytes(buffer[cls.HEADER.size : cls.HEADER.size + names_size])
+        genders, events = (
+            names.decode().split("\n")[:n_genders],
+            names.decode().split("\n")[n_genders : n_genders + n_events],
+        )
+        offset = cls.HEADER.size + _padded(names_size)
+        data = memoryview(buffer)[offset : offset + n_genders * n_events * 3 * 8]
+        values: "memoryview[float] | array[float]"
+        if sys.byteorder == "little":
+            values = data.cast("d")
+        else:
+            values = array("d", data.tobytes())
+            values.byteswap()
+        return cls(genders, events, values, source_hash)
+
+    def to_bytes(self) -> bytes:
+        names = "\n".join(self.genders + self.events).encode()
+        data = array("d", self.values)
+        if sys.byteorder != "little":
+            data.byteswap()
+        return b"".join(
+            [
+                self.HEADER.pack(
+                    self.MAGIC,
+                    self.FORMAT_VERSION,
+                    len(self.genders),
+                    len(self.events),
+                    len(names),
+                    self.source_hash,
+                ),
+                names.ljust(_padded(len(names)), b"\0"),
+                data.tobytes(),
+            ]
+        )
+
+    def save(self, filepath: Path) -> None:
+        """
+        Writes the table atomically, so the tables mapped by running processes
+        are left untouched.
+        """
+        atomic_write_bytes(filepath, self.to_bytes())
+
+    def get(self, gender: Gender, event: Event) -> Optional[tuple[float, float, float]]:
+        """
+        The coefficients (a, b, c) of an event, None if the table has none.
+        """
+        g = self.gender_index.get(gender)
+        e = self.event_index.get(event)
+        if g is None or e is None:
+            return None
+        i = (g * len(self.events) + e) * 3
+        a, b, c = self.values[i : i + 3]
+        if math.isnan(a):
+            return None
+        return a, b, c
+
+    def to_numpy(self) -> "np.ndarray":
+        """The table as a read-only array sharing the memory of the file."""
+        import numpy as np
+
+        # a plain view of the values, whether they are mapped or an array
+        buffer = memoryview(self.values)
+        return np.frombuffer(buffer, dtype=np.float64).reshape(
+            len(self.genders), len(self.events), 3
+        )
+
+
+def _padded(size: int) -> int:
+    return -(-size // 8) * 8
+
+
+def _read_model(filepath: Path) -> tuple[IaafModel, bytes]:
+    """Parses the JSON scoring formulas, with the sha256 of the file."""
+    content = filepath.read_bytes()
+    return IaafModel.model_validate_json(content), hashlib.sha256(content).digest()
+
+
+def compile_coefficients(data_path: Path = Path("data")) -> CoefficientTable:
+    """
+    Compiles the JSON scoring formulas of data_path into the binary table read
+    by `IAAFCalculator`, then checks it with `verify_coefficients`.
+
+    Args:
+        data_path (Path, optional): The directory of the scoring formulas.
+            Defaults to "data".
+
+    Returns:
+        CoefficientTable: The compiled table.
+    """
+    model, source_hash = _read_model(data_path / JSON_FILENAME)
+    table = CoefficientTable.from_model(model, source_hash)
+    table.save(data_path / TABLE_FILENAME)
+    verify_coefficients(data_path)
+    return table
+
+
+def verify_coefficients(data_path: Path = Path("data")) -> int:
+    """
+    Checks that the binary table of data_path is compiled from the current JSON
+    file and gives the same scores: every (gender, event) has the same
+    coefficients in both files, and the vectorized scores read from the mapped
+    array (see `CoefficientTable.to_numpy`) equal the scores computed from the
+    JSON coefficients, for the performances scoring every 50 points.
+
+    Args:
+        data_path (Path, optional): The directory of the scoring formulas.
+            Defaults to "data".
+
+    Returns:
+        int: The number of scores compared.
+
+    Raises:
+        ValueError: If the table differs from the JSON file.
+    """
+    import numpy as np
+
+    model, source_hash = _read_model(data_path / JSON_FILENAME)
+    table = CoefficientTable.load(data_path / TABLE_FILENAME)
+    if table.source_hash != source_hash:
+        raise ValueError(
+            f"{data_path / TABLE_FILENAME} was not compiled from the current "
+            f"{JSON_FILENAME}"
+        )
+    values = table.to_numpy()
+    points = np.arange(0, MAX_SCORE + 1, 50)
+    compared = 0
+    for gender in Gender:
+        for event in Event:
+            coeff = model.root.get(gender, {}).get(event)
+            expected = None if coeff is None else coeff.root
+            coeffs = table.get(gender, event)
+            if coeffs != expected:
+                raise ValueError(
+                    f"{gender.value} {event.value}: {coeffs} != {expected}"
+                )
+            if expected is None:
+                continue
+            # both roots of a*x^2 + b*x + c = points, for timed and field events
+            a, b, c = expected
+            with np.errstate(invalid="ignore"):
+                root = np.sqrt(b**2 - 4 * a * (c - points))
+            performances = np.concatenate(
+                [(-b - root) / (2 * a), (-b + root) / (2 * a)]
+            )
+            performances = performances[~np.isnan(performances)]
+            lower_is_better = event in TIMED_EVENTS
+            row = values[table.gender_index[gender], table.event_index[event]]
+            table_scores = compute_points(
+                np.tile(row, (len(performances), 1)), performances, lower_is_better
+            )
+            json_scores = [
+                score_performance(expected, performance, lower_is_better)
+                for performance in performances.tolist()
+            ]
+            differ = np.flatnonzero(table_scores != json_scores)
+            if len(differ):
+                raise ValueError(
+                    f"{gender.value} {event.value}: scores differ at "
+                    f"{performances[differ[0]]}"
+                )
+            compared += len(performances)
+    return compared
+
+
 class IAAFCalculator:
     def __init__(self, data_path: Path = Path("data")) -> None:
         """
         Initializes the IAAF scoring formulas.
 
+        The coefficients are memory-mapped from the compiled table
+        "iaaf_coefficients.bin" (see `compile_coefficients`), or compiled in memory
+        from "iaaf_scoring_formulas.json" if there is no table. A table which was
+        not compiled from the current JSON file (or cannot be read) is compiled
+        again and rewritten.
+
         Args:
             data_path (Path, optional): The path to the directory containing the IAAF
-                scoring formulas JSON file. Defaults to "data".
+                scoring formulas. Defaults to "data".
 
         Raises:
-            FileNotFoundError: If the IAAF scoring formulas JSON file does not exist at
-                the specified path.
+            FileNotFoundError: If neither the IAAF scoring formulas JSON file nor the
+                compiled table exists at the specified path.
         """
-        self.filepath = data_path / "iaaf_scoring_formulas.json"
-        if not self.filepath.exists():
+        self.filepath = data_path / JSON_FILENAME
+        self.table_path = data_path / TABLE_FILENAME
+        if self.filepath.exists():
+            self.table = self._compile_if_stale()
+        elif self.table_path.exists():
+            self.table = CoefficientTable.load(self.table_path)
+        else:
             raise FileNotFoundError(
                 f"IAAF scoring formulas not found at {self.filepath}"
             )
-        self.model = IaafModel.model_validate(json.loads(open(self.filepath).read()))
+
+    def _compile_if_stale(self) -> CoefficientTable:
+        """
+        The compiled table if it was compiled from the JSON file, else the JSON
+        file compiled in memory, then saved over the stale table.
+        """
+        source_hash = hashlib.sha256(self.filepath.read_bytes()).digest()
+        if not self.table_path.exists():
+            return CoefficientTable.from_model(self.model, source_hash)
+        try:
+            table = CoefficientTable.load(self.table_path)
+            if table.source_hash == source_hash:
+                return table
+        except ValueError as e:
+            print(e)
+        print(f"Compiling {self.table_path} again from {self.filepath}")
+        table = CoefficientTable.from_model(self.model, source_hash)
+        try:
+            table.save(self.table_path)
+        except OSError as e:
+            print(f"Failed to save {self.table_path}: {e}")
+        return table
+
+    @cached_property
+    def model(self) -> IaafModel:
+        """The scoring formulas parsed from the JSON file, on first access."""
+        return _read_model(self.filepath)[0]
+
+    def get_coeffs(self, gender: Gender, event: Event) -> tuple[float, float, float]:
+        """
+        Retrieve the coefficients for a given gender and event.
+
+        Raises:
+            ValueError: If the specified gender or event is not found.
+        """
+        coeffs = self.table.get(gender, event)
+        if coeffs is None:
+            if gender not in self.table.gender_index:
+                raise ValueError(
+                    f"{gender=} not found. Genders available: {self.table.genders}"
+                )
+            raise ValueError(f"{event=} not found in model[{gender}].")
+        return coeffs
+
+    def has_event(self, gender: Gender, event: Event) -> bool:
+        """Whether there is a scoring table of event for gender."""
+        return self.table.get(gender, event) is not None
 
     def get_iaaf_score(self, gender: Gender, event: Event, time: Time) -> int:
         """
@@ -167,5 +606,87 @@ class IAAFCalculator:
         Returns:
             int: The calculated IAAF score.
         """
-        coeffs = self.model.get_coeffs(gender, event)
-        return coeffs.get_iaaf_score(time)
+        return score_performance(self.get_coeffs(gender, event), time.get_seconds())
+
+    def get_coeffs_array(
+        self, gender: Gender, events: Sequence[Optional[Event]]
+    ) -> "np.ndarray":
+        """
+        Gather the coefficients of several events in an array.
+
+        Args:
+            gender (Gender): The gender of the athlete.
+            events (Sequence[Optional[Event]]): The events. None, or an event without
+                coefficients for this gender, gives a row of NaN.
+
+        Returns:
+            np.ndarray: Array of shape (len(events), 3).
+        """
+        import numpy as np
+
+        coeffs = np.full((len(events), 3), np.nan)
+        g = self.table.gender_index.get(gender)
+        if g is None:
+            return coeffs
+        rows = np.array(
+            [self.table.event_index.get(event, -1) for event in events], dtype=int
+        )
+        known = rows >= 0
+        coeffs[known] = self.table.to_numpy()[g, rows[known]]
+        return coeffs
+
+    def get_iaaf_scores(
+        self,
+        gender: Gender,
+        events: Sequence[Optional[Event]],
+        seconds: "np.ndarray",
+    ) -> "np.ndarray":
+        """
+        Calculate the IAAF scores of many performances in one vectorized pass.
+
+        Args:
+            gender (Gender): The gender of the athlete.
+            events (Sequence[Optional[Event]]): The event of each performance.
+            seconds (np.ndarray): The time of each performance, in seconds.
+
+        Returns:
+            np.ndarray: The scores as floats, NaN where the event is unknown.
+        """
+        return compute_points(self.get_coeffs_array(gender, events), seconds)
+
+
+# resolved data path -> (stamps of its JSON file and table, calculator)
+_calculators: dict[Path, tuple[tuple[FileStamp, FileStamp], IAAFCalculator]] = {}
+
+
+def _file_stamp(filepath: Path) -> FileStamp:
+    try:
+        stat = filepath.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_calculator(data_path: Path = Path("data")) -> IAAFCalculator:
+    """
+    Returns the calculator of a data directory, built once until its scoring
+    formulas or compiled table change on disk, so that the JSON file is not read
+    and hashed again for every calculator.
+
+    Args:
+        data_path (Path, optional): The directory of the scoring formulas.
+            Defaults to "data".
+
+    Returns:
+        IAAFCalculator: The calculator.
+    """
+    key = data_path.resolve()
+    stamps = _file_stamp(key / JSON_FILENAME), _file_stamp(key / TABLE_FILENAME)
+    cached = _calculators.get(key)
+    if cached is not None and cached[0] == stamps:
+        return cached[1]
+    calculator = IAAFCalculator(data_path)
+    # the table may have been compiled again by the calculator
+    stamps = _file_stamp(key / JSON_FILENAME), _file_stamp(key / TABLE_FILENAME)
+    _calculators[key] = stamps, calculator
+    return calculator
@@ -0,0 +1,261 @@
+import gc
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import IO, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from .perfs_tracker import ROAD_EVENTS, MainPerf, PerfsRaces
+from .time_an_pace import COLON_TIME, UNIT_TIME
+
+REQUIRED_COLUMNS = ("name_event", "date", "distance", "time", "location")
+OPTIONAL_COLUMNS = (
+    "rank",
+    "num_participants",
+    "url_results",
+    "url_strava",
+    "athlete",
+)
+
+
+def _parse_distinct_times(times: pd.Series) -> np.ndarray:
+    parts = times.str.extract(COLON_TIME)
+    use_units = parts.isna().all(axis=1)
+    if use_units.any():
+        parts.loc[use_units] = times[use_units].str.extract(UNIT_TIME)
+    parts = parts.apply(pd.to_numeric, errors="coerce")
+    # a string matching no part at all is not a time
+    no_match = parts.isna().all(axis=1)
+    hours, minutes, seconds = (parts[k].fillna(0).to_numpy() for k in parts)
+    total = hours * 3600 + minutes * 60 + seconds
+    valid = ~no_match.to_numpy() & (minutes < 60) & (seconds < 60) & (total > 0)
+    return np.where(valid, total, np.nan)
+
+
+def parse_times(times: pd.Series) -> pd.Series:
+    """
+    Parses a column of times into integer seconds, all rows at once.
+
+    Accepted formats are "h:mm:ss", "mm:ss" and "<hour>h<min>min<sec>s". Each
+    distinct string is parsed once.
+
+    Args:
+        times (pd.Series): The times as strings.
+
+    Returns:
+        pd.Series: The times in seconds (Int64), <NA> where the time is invalid.
+    """
+    codes, distinct = pd.factorize(times.astype("string"))
+    parsed = _parse_distinct_times(pd.Series(distinct, dtype="string"))
+    seconds = np.where(codes >= 0, parsed[codes], np.nan)
+    return pd.Series(seconds, index=times.index).astype("Int64")
+
+
+@dataclass
+class ImportResult:
+    """
+    Rows parsed from a results sheet.
+
+    `rows` has one row per accepted line, with its "row" number in the file and
+    typed columns: "date"
+    (datetime64), "distance" (float), "seconds" (Int64), "event" (category),
+    "rank" and "num_participants" (Int64), and the text columns ("athlete" is
+    <NA> when the sheet does not name the athlete of the row). `rejected` has
+    the "row" number in the file and the "reason" of each refused line.
+    """
+
+    rows: pd.DataFrame
+    rejected: pd.DataFrame
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def of_athlete(self, athlete: Optional[str]) -> "ImportResult":
+        """
+        Keeps the rows of one athlete: the rows naming another athlete are
+        rejected, since a `PerfsRaces` holds the races of a single athlete.
+
+        Args:
+            athlete (Optional[str]): The athlete, compared ignoring case and
+                spacing. The rows naming no athlete are kept.
+
+        Returns:
+            ImportResult: The rows of athlete, and the other rows rejected with
+                the reason "other athlete <name>".
+        """
+        names = self.rows["athlete"]
+        # normalized as in race_key
+        normalized = names.map(
+            lambda name: " ".join(name.casefold().split()), na_action="ignore"
+        )
+        expected = " ".join((athlete or "").casefold().split())
+        other = (names.notna() & (normalized != expected)).to_numpy(dtype=bool)
+        if not other.any():
+            return self
+        rejected = pd.DataFrame(
+            {
+                "row": self.rows["row"][other],
+                "reason": "other athlete " + names[other].astype(str),
+            }
+        )
+        return ImportResult(
+            rows=self.rows[~other].reset_index(drop=True),
+            rejected=pd.concat([self.rejected, rejected], ignore_index=True)
+            .sort_values("row", kind="stable")
+            .reset_index(drop=True),
+        )
+
+    def iter_perfs(self, batch_size: int = 10_000) -> Iterator[list[MainPerf]]:
+        """
+        Builds the MainPerf of the accepted rows.
+
+        Args:
+            batch_size (int, optional): Number of MainPerf per batch.
+
+        Yields:
+            list[MainPerf]: The performances, batch by batch.
+        """
+        rows = self.rows
+        columns = {
+            name: rows[name].astype(object).where(rows[name].notna(), None).tolist()
+            for name in ("name_event", "location", "rank", "num_participants")
+            + ("url_results", "url_strava")
+        }
+        columns["date"] = [date.to_pydatetime() for date in rows["date"]]
+        columns["distance"] = rows["distance"].tolist()
+        seconds = rows["seconds"].tolist()
+        records = zip(seconds, *columns.values())
+        names = list(columns)
+        for _ in range(0, len(rows), batch_size):
+            # every column is validated by parse_results: the models are built
+            # without validating them again
+            batch = [
+                MainPerf.from_trusted_fields(total, dict(zip(names, values)))
+                for total, *values in islice(records, batch_size)
+            ]
+            yield batch
+
+    def add_to(self, perfs: PerfsRaces, upsert: bool = False) -> int:
+        """
+        Adds the accepted rows to perfs. The races already recorded are skipped,
+        so importing a file twice adds nothing the second time, and so are the
+        rows of another athlete than the one of perfs (see `of_athlete`).
+
+        Args:
+            perfs (PerfsRaces): The performances to complete.
+            upsert (bool, optional): Replace the races already recorded instead of
+                skipping them.
+
+        Returns:
+            int: The number of performances added or replaced.
+        """
+        added = 0
+        # building the races creates many objects and none is garbage: pausing
+        # the collector saves about a third of the time
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for batch in self.of_athlete(perfs.athlete).iter_perfs():
+                if not upsert:
+                    added += perfs.add_perfs(batch)
+                    continue
+                for perf in batch:
+                    perfs.upsert_race(perf)
+                    added += 1
+        finally:
+            if enabled:
+                gc.enable()
+        return added
+
+
+def parse_results(df: pd.DataFrame, first_row: int = 0) -> ImportResult:
+    """
+    Validates and converts a results sheet, column by column.
+
+    Args:
+        df (pd.DataFrame): The raw sheet, with at least the columns "name_event",
+            "date", "distance", "time" and "location".
+        first_row (int, optional): Row number of the first line of df, used in
+            the rejection report.
+
+    Returns:
+        ImportResult: The accepted rows and the rejected ones.
+    """
+    missing = [name for name in REQUIRED_COLUMNS if name not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns {missing} in {list(df.columns)}")
+
+    rows = pd.DataFrame({"row": np.arange(len(df)) + first_row}, index=df.index)
+    rows["name_event"] = df["name_event"].astype("string").str.strip()
+    rows["date"] = pd.to_datetime(df["date"], errors="coerce", format="mixed")
+    rows["distance"] = pd.to_numeric(df["distance"], errors="coerce").astype(float)
+    rows["seconds"] = parse_times(df["time"])
+    events = {distance: event.value for distance, event in ROAD_EVENTS.items()}
+    rows["event"] = rows["distance"].map(events).astype("category")
+    rows["location"] = df["location"].astype("string").str.strip()
+    for name in OPTIONAL_COLUMNS:
+        values = (
+            df[name]
+            if name in df.columns
+            else pd.Series(pd.NA, index=df.index, dtype="string")
+        )
+        if name in ("rank", "num_participants"):
+            rows[name] = pd.to_numeric(values, errors="coerce").astype("Int64")
+        else:
+            rows[name] = values.astype("string")
+
+    checks = {
+        "invalid name": rows["name_event"].fillna("") == "",
+        "invalid date": rows["date"].isna(),
+        "invalid distance": ~(rows["distance"] > 0),
+        "invalid time": rows["seconds"].isna(),
+        "invalid location": rows["location"].fillna("") == "",
+    }
+    failed = np.column_stack([check.to_numpy(dtype=bool) for check in checks.values()])
+    is_rejected = failed.any(axis=1)
+    names = np.array(list(checks))
+    rejected = pd.DataFrame(
+        {
+            "row": rows["row"].to_numpy()[is_rejected],
+            "reason": [", ".join(names[mask]) for mask in failed[is_rejected]],
+        }
+    )
+    return ImportResult(
+        rows=rows[~is_rejected].reset_index(drop=True), rejected=rejected
+    )
+
+
+def import_csv(
+    source: Path | IO[str],
+    column_map: Optional[dict[str, str]] = None,
+    chunksize: int = 100_000,
+) -> ImportResult:
+    """
+    Reads a CSV results sheet in chunks and parses it.
+
+    Args:
+        source (Path | IO[str]): The CSV file.
+        column_map (Optional[dict[str, str]]): Renaming of the sheet columns to
+            the expected names, e.g. {"Chrono": "time"}.
+        chunksize (int, optional): Number of lines parsed at once.
+
+    Returns:
+        ImportResult: The accepted rows and the rejected ones. Row numbers start
+            at 0 for the first line after the header.
+    """
+    results: list[ImportResult] = []
+    first_row = 0
+    with pd.read_csv(source, dtype=str, chunksize=chunksize) as reader:
+        for chunk in reader:
+            if column_map:
+                chunk = chunk.rename(columns=column_map)
+            results.append(parse_results(chunk, first_row=first_row))
+            first_row += len(chunk)
+    if not results:
+        return parse_results(pd.DataFrame(columns=list(REQUIRED_COLUMNS)))
+    return ImportResult(
+        rows=pd.concat([r.rows for r in results], ignore_index=True),
+        rejected=pd.concat([r.rejected for r in results], ignore_index=True),
+    )
@@ -0,0 +1,215 @@
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Iterator, Optional
+
+from .iaaf import Gender, IAAFCalculator, get_calculator, score_performance
+from .perfs_tracker import ROAD_EVENTS, MainPerf, Perf, PerfsRaces
+
+# (distance, gender, season), the season being None for all time
+BoardKey = tuple[float, Gender, Optional[int]]
+
+
+@dataclass(frozen=True)
+class LeaderboardEntry:
+    athlete: str
+    distance: float
+    seconds: int
+    iaaf_score: Optional[int]
+    date: datetime
+    name_event: str
+
+
+class Leaderboard:
+    """
+    Best entry of each athlete, sorted by a key where lower is better.
+
+    The keys are kept in a sorted list: a rank is found by bisection in
+    O(log n), and an improved entry moves with one removal and one insertion.
+    """
+
+    def __init__(self, key: Callable[[LeaderboardEntry], float]) -> None:
+        self.key = key
+        self._sorted: list[tuple[float, str]] = []
+        self._entries: dict[str, LeaderboardEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self._sorted)
+
+    def __iter__(self) -> Iterator[LeaderboardEntry]:
+        for _, athlete in self._sorted:
+            yield self._entries[athlete]
+
+    def offer(self, entry: LeaderboardEntry) -> bool:
+        """
+        Records an entry if it is the first or the best one of its athlete.
+
+        Returns:
+            bool: Whether the leaderboard changed.
+        """
+        key = self.key(entry)
+        current = self._entries.get(entry.athlete)
+        if current is not None:
+            current_key = (self.key(current), entry.athlete)
+            if current_key[0] <= key:
+                return False
+            del self._sorted[bisect_left(self._sorted, current_key)]
+        insort(self._sorted, (key, entry.athlete))
+        self._entries[entry.athlete] = entry
+        return True
+
+    def rank(self, key: float) -> int:
+        """Place (from 1) a performance of this key would take, ties included."""
+        return bisect_left(self._sorted, (key,)) + 1
+
+    def rank_of(self, athlete: str) -> Optional[int]:
+        """Place (from 1) of an athlete, None if they are not ranked."""
+        entry = self._entries.get(athlete)
+        if entry is None:
+            return None
+        return self.rank(self.key(entry))
+
+    def top(self, k: int) -> list[LeaderboardEntry]:
+        """The k best entries, in order."""
+        return [self._entries[athlete] for _, athlete in self._sorted[:k]]
+
+    def discard(self, athlete: str) -> None:
+        """Removes the entry of an athlete, if any."""
+        entry = self._entries.pop(athlete, None)
+        if entry is not None:
+            del self._sorted[bisect_left(self._sorted, (self.key(entry), athlete))]
+
+
+def _by_time(entry: LeaderboardEntry) -> float:
+    return entry.seconds
+
+
+def _by_score(entry: LeaderboardEntry) -> float:
+    return -(entry.iaaf_score or 0)
+
+
+class ClubRankings:
+    def __init__(self, iaaf: Optional[IAAFCalculator] = None) -> None:
+        """
+        Leaderboards of a club: for each (distance, gender, season) the best time
+        of each athlete, and for each (gender, season) the best IAAF score of each
+        athlete over all the road distances. The season is the calendar year, or
+        None for all time.
+
+        The leaderboards are updated as races are added to the `PerfsRaces` of
+        the athletes (see `add_athlete`). When a race is updated or deleted, the
+        entries of its athlete are rebuilt. Only the races count, not their
+        splits.
+
+        Args:
+            iaaf (Optional[IAAFCalculator]): The scoring tables. Defaults to the
+                tables in "data".
+        """
+        self.iaaf = iaaf if iaaf is not None else get_calculator()
+        self.by_time: dict[BoardKey, Leaderboard] = {}
+        self.by_score: dict[tuple[Gender, Optional[int]], Leaderboard] = {}
+
+    def add_athlete(self, perfs: PerfsRaces) -> Callable[[], None]:
+        """
+        Ranks the races of an athlete, then the ones added later.
+
+        Args:
+            perfs (PerfsRaces): The races of the athlete, with its `athlete` and
+                `gender` set.
+
+        Returns:
+            Callable[[], None]: A function stopping the updates.
+        """
+        if perfs.athlete is None or perfs.gender is None:
+            raise ValueError("The athlete and gender of the races are required")
+        athlete, gender = perfs.athlete, perfs.gender
+        for perf in perfs:
+            self.add(athlete, gender, perf)
+
+        def on_change(old: Optional[Perf], new: Optional[Perf]) -> None:
+            if old is None and new is not None:
+                self.add(athlete, gender, new)
+                return
+            # the removed race may have been a best: rank the athlete again
+            self.remove_athlete(athlete)
+            for perf in perfs:
+                self.add(athlete, gender, perf)
+
+        return perfs.subscribe(on_change)
+
+    def remove_athlete(self, athlete: str) -> None:
+        """Removes an athlete from all the leaderboards."""
+        for board in self.by_time.values():
+            board.discard(athlete)
+        for board in self.by_score.values():
+            board.discard(athlete)
+
+    def add(self, athlete: str, gender: Gender, perf: Perf) -> None:
+        """Ranks one race of an athlete."""
+        if not isinstance(perf, MainPerf):
+            return
+        seconds = perf.time.get_seconds()
+        event = ROAD_EVENTS.get(perf.distance)
+        coeffs = self.iaaf.table.get(gender, event) if event is not None else None
+        entry = LeaderboardEntry(
+            athlete=athlete,
+            distance=perf.distance,
+            seconds=seconds,
+            iaaf_score=(
+                score_performance(coeffs, seconds) if coeffs is not None else None
+            ),
+            date=perf.date,
+            name_event=perf.name_event,
+        )
+        for season in (perf.date.year, None):
+            key = (perf.distance, gender, season)
+            if key not in self.by_time:
+                self.by_time[key] = Leaderboard(_by_time)
+            self.by_time[key].offer(entry)
+            if entry.iaaf_score is not None:
+                if (gender, season) not in self.by_score:
+                    self.by_score[(gender, season)] = Leaderboard(_by_score)
+                self.by_score[(gender, season)].offer(entry)
+
+    def leaderboard(
+        self, distance: float, gender: Gender, season: Optional[int] = None
+    ) -> Leaderboard:
+        """The leaderboard by time of a distance, empty if nobody ran it."""
+        return self.by_time.get((distance, gender, season), Leaderboard(_by_time))
+
+    def score_leaderboard(
+        self, gender: Gender, season: Optional[int] = None
+    ) -> Leaderboard:
+        """The leaderboard by IAAF score, empty if nobody was scored."""
+        return self.by_score.get((gender, season), Leaderboard(_by_score))
+
+    def rank(
+        self,
+        distance: float,
+        gender: Gender,
+        seconds: int,
+        season: Optional[int] = None,
+    ) -> int:
+        """
+        Place a time would take on the leaderboard of a distance.
+
+        Args:
+            distance (float): The distance in kilometers.
+            gender (Gender): The gender of the leaderboard.
+            seconds (int): The time.
+            season (Optional[int]): The season, None for all time.
+
+        Returns:
+            int: The place, from 1, ex aequo with the athletes of the same time.
+        """
+        return self.leaderboard(distance, gender, season).rank(seconds)
+
+    def top(
+        self,
+        distance: float,
+        gender: Gender,
+        k: int = 10,
+        season: Optional[int] = None,
+    ) -> list[LeaderboardEntry]:
+        """The k best athletes on a distance, in order."""
+        return self.leaderboard(distance, gender, season).top(k)
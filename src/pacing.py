@@ -0,0 +1,234 @@
+from array import array
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional, Sequence
+
+import numpy as np
+
+from .perfs_tracker import MainPerf, PerfsRaces
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+FADE_AFTER_KM = 5.0
+
+
+@dataclass(frozen=True)
+class RaggedSplits:
+    """
+    Base splits of many races packed in flat arrays: the splits of race r are
+    the rows offsets[r] to offsets[r + 1], the i-th one running from begin[i] to
+    end[i] km of its race in seconds[i].
+    """
+
+    offsets: np.ndarray  # int64, one more than the races
+    begin: np.ndarray  # float64, km
+    end: np.ndarray  # float64, km
+    seconds: np.ndarray  # float64
+
+    @classmethod
+    def from_perfs(cls, perfs: Sequence[MainPerf]) -> "RaggedSplits":
+        """Packs the base splits (see `Splits.n_base`) of each race, in order."""
+        # all the splits, concatenated by the arrays themselves
+        begin, end, seconds = array("d"), array("d"), array("q")
+        lengths = np.empty(len(perfs), dtype=np.int64)
+        for r, perf in enumerate(perfs):
+            splits = perf.splits
+            begin += splits.begin
+            end += splits.end
+            seconds += splits.seconds
+            lengths[r] = len(splits)
+        all_begin = np.frombuffer(begin, dtype=np.float64)
+        all_end = np.frombuffer(end, dtype=np.float64)
+        all_offsets = np.concatenate(([0], np.cumsum(lengths)))
+        race = np.repeat(np.arange(len(perfs)), lengths)
+
+        # the base splits are the chain from 0 km at the start of each race
+        first = np.arange(len(race)) == all_offsets[:-1][race]
+        previous_end = np.concatenate(([np.nan], all_end[:-1]))
+        broken = np.where(first, all_begin != 0, all_begin != previous_end)
+        breaks = np.cumsum(broken)
+        before_race = np.concatenate(([0], breaks))[all_offsets[:-1]]
+        base = breaks == before_race[race]
+
+        counts = np.bincount(race[base], minlength=len(perfs))
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        return cls(
+            offsets=offsets.astype(np.int64),
+            begin=all_begin[base],
+            end=all_end[base],
+            seconds=np.frombuffer(seconds, dtype=np.int64)[base].astype(np.float64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def counts(self) -> np.ndarray:
+        """Number of splits of each race."""
+        return np.diff(self.offsets)
+
+    @property
+    def race(self) -> np.ndarray:
+        """Index of the race of each split."""
+        return np.repeat(np.arange(len(self)), self.counts)
+
+    def sum(self, values: np.ndarray) -> np.ndarray:
+        """Sum over the splits of each race of values, given for each split."""
+        cumsum = np.concatenate(([0.0], np.cumsum(values)))
+        return cumsum[self.offsets[1:]] - cumsum[self.offsets[:-1]]
+
+    def distance(self) -> np.ndarray:
+        """Distance covered by the splits of each race, NaN without splits."""
+        last = np.maximum(self.offsets[1:] - 1, 0)
+        return np.where(self.counts > 0, self.end[last] if len(self.end) else 0, np.nan)
+
+    def time_at(self, distance: np.ndarray) -> np.ndarray:
+        """
+        Time of each race at the given distance (one per race), interpolated in
+        the split covering it. NaN where the splits do not reach the distance.
+        """
+        times = np.full(len(self), np.nan)
+        if not len(self.seconds):
+            return times
+        race = self.race
+        # the first split of each race ending at or after the distance
+        covering = np.append(np.flatnonzero(self.end >= distance[race]), len(race))
+        split = covering[np.searchsorted(covering, self.offsets[:-1])]
+        found = split < self.offsets[1:]
+        split = split[found]
+        # time at the beginning of each split
+        cumsum = np.concatenate(([0.0], np.cumsum(self.seconds)))
+        elapsed = cumsum[split] - cumsum[self.offsets[:-1][found]]
+        fraction = (distance[found] - self.begin[split]) / (
+            self.end[split] - self.begin[split]
+        )
+        times[found] = elapsed + self.seconds[split] * fraction
+        return times
+
+
+@dataclass(frozen=True)
+class PacingProfile:
+    """
+    Pacing metrics of races computed from their base splits, NaN (or -1 for
+    the segments) for the races with fewer than 2 of them:
+
+    - split_ratio: time of the second half over time of the first half, below 1
+      for a negative split.
+    - pace_cv: coefficient of variation of the pace of the splits.
+    - fade: pace after `fade_after_km` over pace before, minus 1: positive when
+      the runner slowed down.
+    - fastest, slowest: index in `splits` of the fastest and slowest split.
+    """
+
+    splits: RaggedSplits
+    split_ratio: np.ndarray
+    pace_cv: np.ndarray
+    fade: np.ndarray
+    fade_after_km: float
+    fastest: np.ndarray
+    slowest: np.ndarray
+
+    @classmethod
+    def compute(
+        cls, splits: RaggedSplits, fade_after_km: float = FADE_AFTER_KM
+    ) -> "PacingProfile":
+        """
+        Computes the metrics of all the races at once.
+
+        Args:
+            splits (RaggedSplits): The base splits of the races.
+            fade_after_km (float, optional): Distance after which the fade is
+                measured. It is NaN for the races not longer than that.
+
+        Returns:
+            PacingProfile: The metrics of each race.
+        """
+        counts = splits.counts
+        valid = counts >= 2
+        with np.errstate(invalid="ignore", divide="ignore"):
+            distance = np.where(valid, splits.distance(), np.nan)
+            total = np.where(valid, splits.sum(splits.seconds), np.nan)
+
+            first_half = splits.time_at(distance / 2)
+            split_ratio = (total - first_half) / first_half
+
+            race = splits.race
+            pace = splits.seconds / (splits.end - splits.begin)
+            mean = splits.sum(pace) / counts
+            std = np.sqrt(splits.sum((pace - mean[race]) ** 2) / counts)
+            pace_cv = np.where(valid, std / mean, np.nan)
+
+            before = splits.time_at(np.full(len(splits), fade_after_km))
+            fade = ((total - before) / (distance - fade_after_km)) / (
+                before / fade_after_km
+            ) - 1
+            fade[~(distance > fade_after_km)] = np.nan
+
+        # splits sorted by race, then by pace: the first and last of each race
+        order = np.lexsort((pace, race))
+        fastest = np.full(len(splits), -1)
+        slowest = np.full(len(splits), -1)
+        fastest[valid] = order[splits.offsets[:-1][valid]]
+        slowest[valid] = order[splits.offsets[1:][valid] - 1]
+        return cls(
+            splits=splits,
+            split_ratio=split_ratio,
+            pace_cv=pace_cv,
+            fade=fade,
+            fade_after_km=fade_after_km,
+            fastest=fastest,
+            slowest=slowest,
+        )
+
+    @classmethod
+    def of(cls, perfs: PerfsRaces) -> "PacingProfile":
+        """
+        The metrics of the races of perfs in the order of the rows of
+        `perfs.table()`, computed once per version of perfs.
+        """
+
+        def build() -> PacingProfile:
+            races = [perfs[i] for i in perfs.table_order()]
+            mains = [perf for perf in races if isinstance(perf, MainPerf)]
+            return cls.compute(RaggedSplits.from_perfs(mains))
+
+        return perfs.get_derived("pacing_profile", build)
+
+    def __len__(self) -> int:
+        return len(self.split_ratio)
+
+    def segment(self, split: int) -> Optional[str]:
+        """A split as "begin-end km", None for -1."""
+        if split < 0:
+            return None
+        begin, end = self.splits.begin[split], self.splits.end[split]
+        return f"{begin:g}-{end:g} km"
+
+    def columns(self) -> dict[str, list]:
+        """The metrics as columns of the race table, in percent where relevant."""
+        return {
+            "Split ratio": np.round(self.split_ratio, 3).tolist(),
+            "Pace CV (%)": np.round(self.pace_cv * 100, 1).tolist(),
+            f"Fade after {self.fade_after_km:g} km (%)": np.round(
+                self.fade * 100, 1
+            ).tolist(),
+            "Fastest split": [self.segment(i) for i in self.fastest.tolist()],
+            "Slowest split": [self.segment(i) for i in self.slowest.tolist()],
+        }
+
+
+def add_pacing_columns(df: "pd.DataFrame", perfs: PerfsRaces) -> "pd.DataFrame":
+    """
+    Adds the pacing metrics of each race to its table.
+
+    Args:
+        df (pd.DataFrame): The table of perfs, as returned by `perfs.table()`.
+        perfs (PerfsRaces): The performances.
+
+    Returns:
+        pd.DataFrame: A copy of df with the columns of `PacingProfile.columns`.
+    """
+    profile = PacingProfile.of(perfs)
+    if len(profile) != len(df):
+        raise ValueError(f"{len(df)} rows for the {len(profile)} races of perfs")
+    return df.assign(**profile.columns())
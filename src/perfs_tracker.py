@@ -1,15 +1,148 @@
-import json
-from copy import deepcopy
-from datetime import datetime
+from array import array
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import cache
+from itertools import accumulate
 from pathlib import Path
-from typing import Any, Iterator, Optional
-
-import pandas as pd
-from pydantic import BaseModel
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    Literal,
+    Optional,
+    Sequence,
+    TypeVar,
+    cast,
+)
+
+from pydantic import BaseModel, PrivateAttr
 from typing_extensions import Self
 
-from .iaaf import Event, Gender, IAAFCalculator
-from .time_an_pace import Pace, Time
+from .iaaf import Event, Gender, IAAFCalculator, get_calculator
+from .persistence import (
+    file_digest,
+    read_cache,
+    read_snapshot,
+    write_cache,
+    write_snapshot,
+)
+from .time_an_pace import Pace, Time, format_pace, split_time_str
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+T = TypeVar("T")
+
+ROAD_EVENTS: dict[float, Event] = {
+    5: Event("5km"),
+    10: Event("10km"),
+    15: Event("15km"),
+    16.09: Event("10 Miles"),
+    20: Event("20km"),
+    21.1: Event("HM"),
+    25: Event("25km"),
+    30: Event("30km"),
+    42.2: Event("Marathon"),
+    100: Event("100km"),
+}
+
+NO_SCORE = -1
+
+# version of the pickled PerfsRaces in the warm start caches, to increase when
+# the classes or their caches change
+CACHE_SCHEMA_VERSION = 2
+
+
+def get_event(distance: float) -> Optional[Event]:
+    """
+    Retrieves the road event corresponding to a distance.
+
+    Args:
+        distance (float): The distance in kilometers.
+
+    Returns:
+        Optional[Event]: An Event object if the distance is found in the mapping,
+            otherwise None.
+    """
+    if distance not in ROAD_EVENTS:
+        print(f"Distance {distance} not in mapping")
+        return None
+    return ROAD_EVENTS[distance]
+
+
+# normalized (athlete, date, name_event, distance) identifying a race
+RaceKey = tuple[str, date, str, float]
+
+# (gender, source_hash of the coefficient table) the IAAF scores of a race and
+# of its splits were computed with
+ScoreStamp = tuple[Gender, bytes]
+
+# listener of the changes of a PerfsRaces, called with (old, new): old is None
+# for an addition and new is None for a deletion
+ChangeListener = Callable[[Optional["Perf"], Optional["Perf"]], None]
+
+# raw values of a row of PerfsRaces.table(): (name, date, distance, seconds,
+# location, rank, participants, split seconds)
+TableRow = tuple[
+    str, datetime, float, int, str, Optional[int], Optional[int], list[int]
+]
+
+
+class DuplicateRaceError(ValueError):
+    """Raised when adding a race which is already recorded."""
+
+
+@dataclass(frozen=True, slots=True)
+class Delta:
+    """
+    One change of a PerfsRaces: the race `new` added at `position`, the race
+    `old` at `position` replaced by `new`, or the race `old` deleted from
+    `position`. The races are referenced, not copied.
+    """
+
+    kind: Literal["add", "update", "delete"]
+    position: int
+    old: Optional["Perf"] = None
+    new: Optional["Perf"] = None
+
+    def inverse(self) -> "Delta":
+        """The change undoing this one."""
+        if self.kind == "add":
+            return Delta("delete", self.position, old=self.new)
+        if self.kind == "delete":
+            return Delta("add", self.position, new=self.old)
+        return Delta("update", self.position, old=self.new, new=self.old)
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+def race_key(
+    date: date | datetime,
+    name_event: str,
+    distance: float,
+    athlete: Optional[str] = None,
+) -> RaceKey:
+    """
+    Key identifying a race: case and spacing of the names, the time of day and
+    floating point noise on the distance are ignored.
+
+    Args:
+        date (date | datetime): The date of the race.
+        name_event (str): The name of the race.
+        distance (float): The distance in kilometers.
+        athlete (Optional[str]): The athlete.
+
+    Returns:
+        RaceKey: The key.
+    """
+    if isinstance(date, datetime):
+        date = date.date()
+    return (_normalize(athlete or ""), date, _normalize(name_event), round(distance, 3))
 
 
 class Perf(BaseModel):
@@ -40,28 +173,172 @@ class Perf(BaseModel):
             Optional[Event]: An Event object if the distance is found in the mapping,
                 otherwise None.
         """
-        mapping: dict[float, Event] = {
-            5: Event("5km"),
-            10: Event("10km"),
-            15: Event("15km"),
-            16.09: Event("10 Miles"),
-            20: Event("20km"),
-            21.1: Event("HM"),
-            25: Event("25km"),
-            30: Event("30km"),
-            42.2: Event("Marathon"),
-            100: Event("100km"),
-        }
-        if self.distance not in mapping:
-            print(f"Distance {self.distance} not in mapping")
-            return None
-        return mapping[self.distance]
+        return get_event(self.distance)
+
+
+class Splits:
+    """
+    Splits of a MainPerf, stored as parallel arrays: the i-th split runs from
+    begin[i] to end[i] km in seconds[i], and scored score[i] (NO_SCORE if unknown).
+    """
+
+    __slots__ = ("begin", "end", "seconds", "score", "_keys")
+
+    def __init__(self) -> None:
+        self.begin = array("d")
+        self.end = array("d")
+        self.seconds = array("q")
+        self.score = array("q")
+        self._keys: Optional[dict[tuple[float, float], int]] = None
+
+    def __len__(self) -> int:
+        return len(self.seconds)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Splits):
+            return NotImplemented
+        return (
+            self.begin == other.begin
+            and self.end == other.end
+            and self.seconds == other.seconds
+            and self.score == other.score
+        )
+
+    def __getstate__(self) -> tuple[array, array, array, array]:
+        return self.begin, self.end, self.seconds, self.score
+
+    def __setstate__(self, state: tuple[array, array, array, array]) -> None:
+        self.begin, self.end, self.seconds, self.score = state
+        self._keys = None
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> "Splits":
+        copy = Splits()
+        copy.__setstate__(
+            (array("d", self.begin), array("d", self.end))
+            + (array("q", self.seconds), array("q", self.score))
+        )
+        return copy
+
+    def append(
+        self,
+        begin: float,
+        end: float,
+        seconds: int,
+        score: Optional[int] = None,
+    ) -> None:
+        self.begin.append(begin)
+        self.end.append(end)
+        self.seconds.append(seconds)
+        self.score.append(NO_SCORE if score is None else score)
+        self._keys = None
+
+    def index(self, key: tuple[float, float]) -> Optional[int]:
+        """Position of the split running from key[0] to key[1] km, if any."""
+        if self._keys is None:
+            self._keys = {k: i for i, k in enumerate(zip(self.begin, self.end))}
+        return self._keys.get(key)
+
+    def get_score(self, i: int) -> Optional[int]:
+        score = self.score[i]
+        return None if score == NO_SCORE else score
+
+    @property
+    def n_base(self) -> int:
+        """
+        Number of base splits: the chain of consecutive segments stored first,
+        from which the longer windows are derived.
+        """
+        n = 0
+        while n < len(self) and (
+            self.begin[n] == 0 if n == 0 else self.begin[n] == self.end[n - 1]
+        ):
+            n += 1
+        return n
+
+
+M = TypeVar("M", bound=BaseModel)
+
+
+@cache
+def _field_defaults(cls: type[BaseModel]) -> dict[str, Any]:
+    """Default of each field of cls, PydanticUndefined for the required ones."""
+    return {name: field.default for name, field in cls.model_fields.items()}
+
+
+def _construct(cls: type[M], values: dict[str, Any]) -> M:
+    """
+    Like `cls.model_construct(**values)`, without validation, but faster: values
+    must hold valid values of the fields of cls, whose defaults are plain values
+    (no default factory). The private attributes get their default factory or
+    a shared, immutable default.
+    """
+    self = cls.__new__(cls)
+    object.__setattr__(self, "__dict__", {**_field_defaults(cls), **values})
+    object.__setattr__(self, "__pydantic_fields_set__", set(values))
+    object.__setattr__(self, "__pydantic_extra__", None)
+    defaults, factories = _private_defaults(cls)
+    private = dict(defaults)
+    for name, factory in factories:
+        private[name] = factory()
+    object.__setattr__(self, "__pydantic_private__", private or None)
+    return self
+
+
+@cache
+def _private_defaults(
+    cls: type[BaseModel],
+) -> tuple[dict[str, Any], tuple[tuple[str, Callable[[], Any]], ...]]:
+    """
+    Default of each private attribute of cls without a default factory, and the
+    factory of the others.
+    """
+    defaults: dict[str, Any] = {}
+    factories: list[tuple[str, Callable[[], Any]]] = []
+    for name, attr in cls.__private_attributes__.items():
+        if attr.default_factory is not None:
+            factories.append((name, cast(Callable[[], Any], attr.default_factory)))
+        else:
+            defaults[name] = attr.get_default()
+    return defaults, tuple(factories)
+
+
+def _seconds(time_str: str) -> int:
+    hours, minutes, seconds = split_time_str(time_str)
+    return hours * 3600 + minutes * 60 + seconds
+
+
+class SubPerfsView(Mapping[tuple[float, float], "SubPerf"]):
+    """Read-only mapping (begin, end) -> SubPerf over the splits of a MainPerf."""
+
+    def __init__(self, parent: "MainPerf") -> None:
+        self._parent = parent
+
+    def __len__(self) -> int:
+        return len(self._parent.splits)
+
+    def __iter__(self) -> Iterator[tuple[float, float]]:
+        splits = self._parent.splits
+        return zip(splits.begin, splits.end)
+
+    def __getitem__(self, key: tuple[float, float]) -> "SubPerf":
+        i = self._parent.splits.index(key)
+        if i is None:
+            raise KeyError(key)
+        return SubPerf(self._parent, i)
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, tuple) and self._parent.splits.index(key) is not None
+
+    def values(self) -> Iterator["SubPerf"]:  # type: ignore[override]
+        return (SubPerf(self._parent, i) for i in range(len(self)))
 
 
 class MainPerf(Perf):
     num_participants: Optional[int] = None
     rank: Optional[int] = None
-    sub_perfs: dict[tuple[float, float], "SubPerf"] = {}
+    _splits: Splits = PrivateAttr(default_factory=Splits)
+    # None until scored, and again after a change of the splits
+    _score_stamp: Optional[ScoreStamp] = PrivateAttr(default=None)
 
     @classmethod
     def from_dict(cls, data: dict[str, str | list[dict[str, str]]]) -> Self:
@@ -72,21 +349,93 @@ class MainPerf(Perf):
             raise ValueError("Time is required")
         args["time"] = Time.from_str(time_str=str(data["time"]))
 
-        # Convert sub_perfs to SubPerf objects
-        if "sub_perfs" in data:
-            sub_perfs = {}
-            del args["sub_perfs"]
-            self = cls(**args)
-            for sub_perf_data in data["sub_perfs"]:
-                if isinstance(sub_perf_data, str):
-                    raise ValueError
-                args_copy = args.copy()
-                args_copy.update(sub_perf_data)
-                sub_perf = SubPerf.from_dict(args_copy, parent=self)
-                sub_perfs[(sub_perf.begin_distance, sub_perf.end_distance)] = sub_perf
-            args["sub_perfs"] = sub_perfs
-
-        return cls(**args)
+        sub_perfs_data = args.pop("sub_perfs", None) or []
+        self = cls(**args)
+
+        # Store the sub_perfs in the splits arrays
+        for sub_perf_data in sub_perfs_data:
+            if isinstance(sub_perf_data, str):
+                raise ValueError
+            if "time" not in sub_perf_data:
+                raise ValueError("Time is required")
+            score = sub_perf_data.get("iaaf_score")
+            self.splits.append(
+                begin=float(sub_perf_data["begin_distance"]),
+                end=float(sub_perf_data["end_distance"]),
+                seconds=Time.from_str(sub_perf_data["time"]).get_seconds(),
+                score=int(score) if score is not None else None,
+            )
+
+        return self
+
+    @classmethod
+    def from_trusted_dict(cls, data: dict[str, Any]) -> Self:
+        """
+        Builds a MainPerf from a dictionary written by `to_dict`, without any
+        validation (as with `model_construct`): only for data read back from a
+        verified snapshot, use `from_dict` for everything else.
+
+        Args:
+            data (dict[str, Any]): The dictionary, as returned by `to_dict`.
+
+        Returns:
+            MainPerf: The performance with its splits.
+        """
+        fields = _field_defaults(cls)
+        args = {k: v for k, v in data.items() if k in fields}
+        hours, minutes, seconds = split_time_str(args["time"])
+        args["time"] = _construct(
+            Time, {"hours": hours, "minutes": minutes, "seconds": seconds}
+        )
+        args["date"] = datetime.fromisoformat(args["date"])
+        args["distance"] = float(args["distance"])
+        self = _construct(cls, args)
+
+        subs = data.get("sub_perfs") or []
+        if subs:
+            scores = (sub.get("iaaf_score") for sub in subs)
+            self.splits.__setstate__(
+                (
+                    array("d", [float(sub["begin_distance"]) for sub in subs]),
+                    array("d", [float(sub["end_distance"]) for sub in subs]),
+                    array("q", [_seconds(sub["time"]) for sub in subs]),
+                    array("q", [NO_SCORE if x is None else int(x) for x in scores]),
+                )
+            )
+        return self
+
+    @classmethod
+    def from_trusted_fields(cls, seconds: int, fields: dict[str, Any]) -> Self:
+        """
+        Builds a MainPerf without splits from the values of its fields, without
+        any validation (see `from_trusted_dict`): only for values already
+        validated, e.g. column by column by `importer.parse_results`.
+
+        Args:
+            seconds (int): The time of the race, in seconds.
+            fields (dict[str, Any]): The values of the other fields.
+
+        Returns:
+            MainPerf: The performance.
+        """
+        time = _construct(
+            Time,
+            {
+                "hours": seconds // 3600,
+                "minutes": seconds // 60 % 60,
+                "seconds": seconds % 60,
+            },
+        )
+        return _construct(cls, {"time": time, **fields})
+
+    @property
+    def splits(self) -> Splits:
+        return self._splits
+
+    @property
+    def sub_perfs(self) -> SubPerfsView:
+        """The splits of the race, as SubPerf created on access."""
+        return SubPerfsView(self)
 
     @property
     def ratio(self) -> Optional[float]:
@@ -122,21 +471,57 @@ class MainPerf(Perf):
             )
 
         sub_section_length = self._create_each_sub_section_length(
-            list_sub_time, sub_distance
+            [sub_time.get_seconds() for sub_time in list_sub_time], sub_distance
         )
 
-        for distance, list_sub_time in sub_section_length.items():
+        for distance, list_sub_seconds in sub_section_length.items():
 
-            for i, sub_time in enumerate(list_sub_time):
+            for i, sub_seconds in enumerate(list_sub_seconds):
                 begin_distance = i * sub_distance
                 end_distance = begin_distance + distance
-                sub_pref = self._create_sub_perf(sub_time, begin_distance, end_distance)
+                self._check_sub_perf(sub_seconds, begin_distance, end_distance)
                 if (begin_distance, end_distance) in self.sub_perfs:
                     raise ValueError(
                         f"SubPerf for {begin_distance}-{end_distance} already exists"
                     )
-                self.sub_perfs[(begin_distance, end_distance)] = sub_pref
-                print(f"Added sub_perf: {sub_pref}")
+                self.splits.append(begin_distance, end_distance, sub_seconds)
+        self._score_stamp = None
+        print(f"Added {len(self.splits)} sub_perfs to {self}")
+
+    def add_splits(
+        self, end_distances: Sequence[float], list_sub_seconds: Sequence[int]
+    ) -> None:
+        """
+        Adds consecutive splits of any length, e.g. measured by a GPS watch.
+
+        The i-th split runs from end_distances[i - 1] (0 for the first one) to
+        end_distances[i] in list_sub_seconds[i] seconds. Unlike `add_sub_perf`, no
+        longer windows are derived from them.
+
+        Args:
+            end_distances (Sequence[float]): The increasing end distance of each
+                split, in km.
+            list_sub_seconds (Sequence[int]): The time of each split, in seconds.
+        """
+        if len(self.splits):
+            raise ValueError(f"{self} already has {len(self.splits)} splits")
+        if len(end_distances) != len(list_sub_seconds):
+            raise ValueError(
+                f"Got {len(end_distances)} distances for {len(list_sub_seconds)} times"
+            )
+        sum_time = sum(list_sub_seconds)
+        if sum_time > self.time.get_seconds():
+            raise ValueError(
+                "Sum of sub times cannot be greater than total"
+                + f" time (sum sub time{sum_time} > time:{self.time})"
+            )
+
+        begin_distance = 0.0
+        for end_distance, sub_seconds in zip(end_distances, list_sub_seconds):
+            self._check_sub_perf(sub_seconds, begin_distance, end_distance)
+            self.splits.append(begin_distance, end_distance, sub_seconds)
+            begin_distance = end_distance
+        self._score_stamp = None
 
     def to_dict(self) -> dict[str, str | int | float | list[dict[str, str]]]:
         output: dict[str, str | int | float | list[dict[str, str]] | None] = {
@@ -152,14 +537,14 @@ class MainPerf(Perf):
             "num_participants": self.num_participants,
             "sub_perfs": (
                 [sub_perf.to_dict() for sub_perf in self.sub_perfs.values()]
-                if self.sub_perfs
+                if self.splits
                 else None
             ),
         }
         # remove None value
         return {k: v for k, v in output.items() if v is not None}
 
-    def get_basic_info(self) -> dict[str, str | float | list[float] | None]:
+    def get_basic_info(self) -> dict[str, str | float | list[int] | None]:
         """
         Retrieve basic information about the event.
 
@@ -172,35 +557,45 @@ class MainPerf(Perf):
                 - "Pace (min/km)" (str): The pace of the event in minutes per kilometer.
                 - "Location" (str): The location of the event.
                 - "rank" (float | None): The rank of the event.
-                - "sub_perfs" (list[float]): A list of sub-performance times.
+                - "sub_perfs" (list[int]): A list of sub-performance times.
         """
         return {
             "Name": self.name_event,
             "Date": str(self.date.date()),
             "Distance (km)": self.distance,
             "Time": str(self.time),
-            "Pace (min/km)": str(self.pace),
+            "Pace (min/km)": format_pace(self.time.get_seconds() / self.distance),
             "Location": self.location,
             "rank": 1 - self.ratio if self.ratio is not None else None,
-            "sub_perfs": (
-                [value.time.get_seconds() for value in self.sub_perfs.values()]
-            ),
+            "sub_perfs": self.splits.seconds.tolist(),
         }
 
-    def _create_sub_perf(
-        self, sub_time: Time, begin_distance: float, end_distance: float
-    ) -> "SubPerf":
+    def table_row(self) -> TableRow:
+        """The values of the row of the race in `PerfsRaces.table()`."""
+        return (
+            self.name_event,
+            self.date,
+            self.distance,
+            self.time.get_seconds(),
+            self.location,
+            self.rank,
+            self.num_participants,
+            self.splits.seconds.tolist(),
+        )
+
+    def _check_sub_perf(
+        self, sub_seconds: int, begin_distance: float, end_distance: float
+    ) -> None:
         """
-        Creates a sub-performance (SubPerf) instance based on the given sub_time,
-        begin_distance, and end_distance.
+        Checks that a sub-performance fits in the race.
 
         Args:
-            sub_time (Time): The time duration for the sub-performance.
+            sub_seconds (int): The time duration for the sub-performance, in seconds.
             begin_distance (float): The starting distance for the sub-performance.
             end_distance (float): The ending distance for the sub-performance.
 
-        Returns:
-            SubPerf: A new SubPerf instance representing the sub-performance.
+        Raises:
+            ValueError: If the sub-performance does not fit in the race.
         """
         if begin_distance < 0:
             raise ValueError("Begin distance cannot be negative")
@@ -208,56 +603,100 @@ class MainPerf(Perf):
             raise ValueError("End distance cannot be greater than total distance")
         if begin_distance > end_distance:
             raise ValueError("End distance must be greater than begin distance")
-        if sub_time.get_seconds() > self.time.get_seconds():
+        if sub_seconds > self.time.get_seconds():
             raise ValueError(
                 "Sub time cannot be greater than total time"
-                + f" (sub time:{sub_time} > time:{self.time})"
+                + f" (sub time:{Time.from_total_seconds(sub_seconds)} > "
+                + f"time:{self.time})"
             )
-        sub_data = deepcopy(self.__dict__)
-        del sub_data["sub_perfs"]
-        del sub_data["num_participants"]
-        del sub_data["rank"]
-        sub_data["time"] = sub_time
-        sub_data["distance"] = end_distance - begin_distance
-        sub_data["parent_perf"] = self
-        sub_data["begin_distance"] = begin_distance
-        sub_data["end_distance"] = end_distance
-        return SubPerf(**sub_data)
 
     def _create_each_sub_section_length(
-        self, list_sub_time: list[Time], sub_distance: float
-    ) -> dict[float, list[Time]]:
-        each_sub_section_length: dict[float, list[Time]] = {}
+        self, list_sub_seconds: list[int], sub_distance: float
+    ) -> dict[float, list[int]]:
+        prefix = list(accumulate(list_sub_seconds, initial=0))
+        each_sub_section_length: dict[float, list[int]] = {}
         step: int = 0
         step_distance: float = sub_distance
         while step_distance < self.distance:
-            each_sub_section_length[step_distance] = []
-            for i in range(len(list_sub_time) - step):
-                slice_time = list_sub_time[i : i + 1 + step]
-                sum_time_seconds = sum(
-                    sub_time.get_seconds() for sub_time in slice_time
-                )
-                each_sub_section_length[step_distance].append(
-                    Time.from_total_seconds(sum_time_seconds)
-                )
+            each_sub_section_length[step_distance] = [
+                prefix[i + 1 + step] - prefix[i]
+                for i in range(len(list_sub_seconds) - step)
+            ]
             step_distance += sub_distance
             step += 1
         return each_sub_section_length
 
 
-class SubPerf(Perf):
-    parent_perf: MainPerf
-    begin_distance: float
-    end_distance: float
+class SubPerf:
+    """
+    A split of a MainPerf. It is a view on the splits arrays of its parent: the
+    event details are those of the parent and nothing is copied.
+    """
 
-    @classmethod
-    def from_dict(cls, data: dict[str, Any], parent: MainPerf) -> Self:
-        args: dict[str, str | Time] = data.copy()
-        # convert time to Time object
-        if "time" not in data:
-            raise ValueError("Time is required")
-        args["time"] = Time.from_str(time_str=data["time"])
-        return cls(**args, parent_perf=parent)
+    __slots__ = ("parent_perf", "_i")
+
+    def __init__(self, parent_perf: MainPerf, i: int) -> None:
+        self.parent_perf = parent_perf
+        self._i = i
+
+    @property
+    def begin_distance(self) -> float:
+        return self.parent_perf.splits.begin[self._i]
+
+    @property
+    def end_distance(self) -> float:
+        return self.parent_perf.splits.end[self._i]
+
+    @property
+    def distance(self) -> float:
+        return self.end_distance - self.begin_distance
+
+    @property
+    def time(self) -> Time:
+        return Time.from_total_seconds(self.parent_perf.splits.seconds[self._i])
+
+    @property
+    def iaaf_score(self) -> Optional[int]:
+        return self.parent_perf.splits.get_score(self._i)
+
+    @iaaf_score.setter
+    def iaaf_score(self, score: Optional[int]) -> None:
+        self.parent_perf.splits.score[self._i] = NO_SCORE if score is None else score
+
+    @property
+    def date(self) -> datetime:
+        return self.parent_perf.date
+
+    @property
+    def name_event(self) -> str:
+        return self.parent_perf.name_event
+
+    @property
+    def location(self) -> str:
+        return self.parent_perf.location
+
+    @property
+    def url_results(self) -> Optional[str]:
+        return self.parent_perf.url_results
+
+    @property
+    def url_strava(self) -> Optional[str]:
+        return self.parent_perf.url_strava
+
+    @property
+    def pace(self) -> Pace:
+        return Pace.from_time_distance(self.time, self.distance)
+
+    def get_event(self) -> Optional[Event]:
+        return get_event(self.distance)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, SubPerf):
+            return NotImplemented
+        return self.parent_perf is other.parent_perf and self._i == other._i
+
+    def __hash__(self) -> int:
+        return hash((id(self.parent_perf), self._i))
 
     def __str__(self):
         return (
@@ -276,15 +715,212 @@ class SubPerf(Perf):
         return {k: v for k, v in output.items() if v != "None"}
 
 
+def records_of(perfs: Iterable[Perf]) -> list[dict[str, Any]]:
+    """The dictionaries of the main performances of perfs, as in the JSON file."""
+    return [perf.to_dict() for perf in perfs if isinstance(perf, MainPerf)]
+
+
+def _pb_candidates(perf: Perf) -> Iterator[tuple[float, int, int]]:
+    """(distance, seconds, split or -1) of a race and of each of its splits."""
+    yield perf.distance, perf.time.get_seconds(), -1
+    if isinstance(perf, MainPerf):
+        splits = perf.splits
+        for i, seconds in enumerate(splits.seconds):
+            yield splits.end[i] - splits.begin[i], seconds, i
+
+
+def _pb_perf(best: tuple[int, Perf, int]) -> Perf | SubPerf:
+    _, perf, split = best
+    if split < 0 or not isinstance(perf, MainPerf):
+        return perf
+    return SubPerf(perf, split)
+
+
+def table_frame(rows: Sequence[TableRow]) -> "pd.DataFrame":
+    """
+    Builds the table of `PerfsRaces.table()` from the rows of its races (see
+    `MainPerf.table_row`), in the given order.
+
+    The columns are typed, to be formatted only for display (see
+    `st_utils.format_table`): "Name" (string), "Date" (datetime64),
+    "Distance (km)" (float), "Time (s)" (int), "Pace (s/km)" (float),
+    "Location" and "Event" (category, <NA> for a distance which is not a
+    road event), "Rank" and "Participants" (Int64), "Ratio" (Float64, 1 -
+    rank / participants) and "sub_perfs" (the seconds of each split).
+
+    Args:
+        rows (Sequence[TableRow]): The rows of the races.
+
+    Returns:
+        pd.DataFrame: A DataFrame with one row per race.
+    """
+    import numpy as np
+    import pandas as pd
+
+    columns: list[tuple[Any, ...]] = list(zip(*rows)) if rows else [()] * 8
+    names, dates, distances, seconds, locations, ranks, participants, splits = columns
+
+    distance = np.array(distances, dtype=np.float64)
+    time = np.array(seconds, dtype=np.int64)
+    rank = pd.array(ranks, dtype="Int64")
+    num_participants = pd.array(participants, dtype="Int64")
+    road_events = [event.value for event in ROAD_EVENTS.values()]
+    return pd.DataFrame(
+        {
+            "Name": pd.array(names, dtype="string"),
+            "Date": np.array(dates, dtype="datetime64[s]"),
+            "Distance (km)": distance,
+            "Time (s)": time,
+            "Pace (s/km)": time / distance,
+            "Location": pd.Categorical(locations),
+            "Event": pd.Categorical(
+                [ROAD_EVENTS[d].value if d in ROAD_EVENTS else None for d in distances],
+                categories=road_events,
+            ),
+            "Rank": rank,
+            "Participants": num_participants,
+            "Ratio": 1 - rank / num_participants,
+            "sub_perfs": pd.Series(splits, dtype=object),
+        }
+    )
+
+
 class PerfsRaces(BaseModel):
     perfs: list[Perf] = []
     gender: Optional[Gender] = None
+    athlete: Optional[str] = None
+    _version: int = PrivateAttr(default=0)
+    _derived: dict[str, tuple[Any, Any]] = PrivateAttr(default_factory=dict)
+    _listeners: list[ChangeListener] = PrivateAttr(default_factory=list)
+    # race_key of each performance -> its position in perfs
+    _index: dict[RaceKey, int] = PrivateAttr(default_factory=dict)
+    # (number of perfs, athlete) the index is up to date with
+    _index_stamp: tuple[int, Optional[str]] = PrivateAttr(default=(0, None))
+    _history: list[Delta] = PrivateAttr(default_factory=list)
+    _redo: list[Delta] = PrivateAttr(default_factory=list)
+    # caches maintained from each delta, valid while their version is current:
+    # the personal best of each distance as (seconds, race, split or -1), and the
+    # row of table() of each race (None for a race which is not a MainPerf)
+    _pbs: dict[float, tuple[int, Perf, int]] = PrivateAttr(default_factory=dict)
+    _pbs_version: int = PrivateAttr(default=-1)
+    _rows: list[Optional[TableRow]] = PrivateAttr(default_factory=list)
+    _rows_version: int = PrivateAttr(default=-1)
 
     @property
     def iaaf(self) -> Optional[IAAFCalculator]:
         if self.gender is None:
             return None
-        return IAAFCalculator()
+        return get_calculator()
+
+    @property
+    def version(self) -> int:
+        """Counter increased by each change of the performances."""
+        return self._version
+
+    def touch(self) -> None:
+        """Records that the performances changed, invalidating the derived data."""
+        self._version += 1
+
+    def get_derived(self, key: str, build: Callable[[], T]) -> T:
+        """
+        Returns data derived from the performances, built once per version.
+
+        Args:
+            key (str): The name of the derived data.
+            build (Callable[[], T]): Function building the data when it is missing
+                or outdated.
+
+        Returns:
+            T: The derived data for the current version and gender.
+        """
+        stamp = (self._version, self.gender)
+        cached = self._derived.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        value = build()
+        self._derived[key] = (stamp, value)
+        return value
+
+    def subscribe(self, listener: ChangeListener) -> Callable[[], None]:
+        """
+        Registers a function called after each change with (old, new): (None,
+        perf) for an addition, (old, new) for an update and (perf, None) for a
+        deletion.
+
+        Args:
+            listener (ChangeListener): The function to call.
+
+        Returns:
+            Callable[[], None]: A function removing the listener.
+        """
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def key_of(self, perf: Perf) -> RaceKey:
+        """The race_key of a performance of this athlete."""
+        return race_key(perf.date, perf.name_event, perf.distance, self.athlete)
+
+    @property
+    def index(self) -> dict[RaceKey, int]:
+        """
+        Position in perfs of each race, by race_key. It is rebuilt when the
+        athlete changes, and kept up to date by the methods adding, updating and
+        deleting races (not by direct changes of `perfs`).
+        """
+        if self._index_stamp != (len(self.perfs), self.athlete):
+            self._index = {self.key_of(perf): i for i, perf in enumerate(self.perfs)}
+            self._index_stamp = (len(self.perfs), self.athlete)
+        return self._index
+
+    def __getstate__(self) -> dict[Any, Any]:
+        state = super().__getstate__()
+        # the listeners and the history belong to this process, and the derived
+        # data may not be picklable
+        private = dict(state["__pydantic_private__"] or {})
+        private.update(_derived={}, _listeners=[], _history=[], _redo=[])
+        return {**state, "__pydantic_private__": private}
+
+    @classmethod
+    def load_cached(
+        cls, filepath: Path, cache_path: Optional[Path] = None
+    ) -> "PerfsRaces":
+        """
+        Loads the races of a JSON file with their index, personal bests and table
+        rows already built.
+
+        They are unpickled from a cache file next to filepath when it was written
+        from the same content of the file by the same version of the code.
+        Otherwise the races are loaded from the file (see `load_from_json`) and
+        the cache is written again.
+
+        Args:
+            filepath (Path): The path to the JSON file containing the performance data.
+            cache_path (Optional[Path]): The path to the cache file. Defaults to
+                filepath with a ".cache" suffix added.
+
+        Returns:
+            PerfsRaces: The races.
+        """
+        if cache_path is None:
+            cache_path = filepath.with_name(filepath.name + ".cache")
+        key = f"chrontrack-cache-{CACHE_SCHEMA_VERSION}:".encode()
+        key += file_digest(filepath)
+        perfs = read_cache(cache_path, key)
+        if isinstance(perfs, cls):
+            print(f"Load {filepath} from {cache_path}")
+            return perfs
+
+        perfs = cls()
+        perfs.load_from_json(filepath)
+        # build the derived data, to be stored in the cache
+        perfs.index
+        perfs._personal_bests()
+        perfs._table_rows()
+        try:
+            write_cache(cache_path, key, perfs)
+        except OSError as e:
+            print(f"Failed to write the cache {cache_path}: {e}")
+        return perfs
 
     def __len__(self) -> int:
         return len(self.perfs)
@@ -300,95 +936,431 @@ class PerfsRaces(BaseModel):
         """
         Adds a performance record to the tracker.
 
-        If the performance record is an instance of MainPerf, its sub-performances
-        are also added to the tracker.
+        The sub-performances of a MainPerf stay stored in the MainPerf: they are
+        not added as performances of their own.
 
         Args:
             perf (Perf): The performance record to be added.
+
+        Raises:
+            DuplicateRaceError: If a race with the same key is already recorded.
         """
-        self.perfs.append(perf)
+        self.apply(Delta("add", len(self.perfs), new=perf))
 
-        if isinstance(perf, MainPerf):
-            for sub_perf in perf.sub_perfs.values():
-                self.perfs.append(sub_perf)
+    def add_perfs(self, perfs: Iterable[Perf]) -> int:
+        """
+        Adds many performance records at once, skipping the races already
+        recorded (or given twice).
+
+        Each race added is recorded in the history as by `add_perf`, but the
+        cached personal bests and table rows are rebuilt on first use rather than
+        updated race by race.
+
+        Args:
+            perfs (Iterable[Perf]): The performance records to be added.
 
-    def get_personal_best(self, distance: float) -> Optional[Perf]:
+        Returns:
+            int: The number of performances added.
+        """
+        index = self.index
+        added = 0
+        for perf in perfs:
+            key = self.key_of(perf)
+            if key in index:
+                continue
+            index[key] = len(self.perfs)
+            self._history.append(Delta("add", len(self.perfs), new=perf))
+            self.perfs.append(perf)
+            for listener in self._listeners:
+                listener(None, perf)
+            added += 1
+        self._index_stamp = (len(self.perfs), self.athlete)
+        if added:
+            self._redo.clear()
+            self.touch()
+        return added
+
+    def get_race(
+        self, date: date | datetime, name_event: str, distance: float
+    ) -> Optional[Perf]:
         """
-        Retrieves the personal best performance for a given distance.
+        Finds a race in O(1).
 
         Args:
-            distance (float): The distance for which to retrieve the personal best.
+            date (date | datetime): The date of the race.
+            name_event (str): The name of the race, case and spacing ignored.
+            distance (float): The distance in kilometers.
 
         Returns:
-            Optional[Perf]: The personal best performance if found, otherwise None.
+            Optional[Perf]: The race, None if it is not recorded.
         """
-        filtered_perfs = list(
-            filter(lambda perf: perf.distance == distance, self.perfs)
-        )
-        if len(filtered_perfs) == 0:
+        i = self.index.get(race_key(date, name_event, distance, self.athlete))
+        return None if i is None else self.perfs[i]
+
+    def _position(self, date: date | datetime, name_event: str, distance: float) -> int:
+        key = race_key(date, name_event, distance, self.athlete)
+        if key not in self.index:
+            raise ValueError(f"No race {key}")
+        return self.index[key]
+
+    def update_race(
+        self, date: date | datetime, name_event: str, distance: float, perf: Perf
+    ) -> Perf:
+        """
+        Replaces a race, which keeps its position.
+
+        Args:
+            date (date | datetime): The date of the race to replace.
+            name_event (str): The name of the race to replace.
+            distance (float): The distance of the race to replace.
+            perf (Perf): The new version of the race.
+
+        Returns:
+            Perf: The replaced race.
+
+        Raises:
+            ValueError: If the race is not recorded.
+            DuplicateRaceError: If the new version has the key of another race.
+        """
+        i = self._position(date, name_event, distance)
+        old = self.perfs[i]
+        self.apply(Delta("update", i, old=old, new=perf))
+        return old
+
+    def upsert_race(self, perf: Perf) -> Optional[Perf]:
+        """
+        Adds a race, or replaces the recorded race with the same key.
+
+        Returns:
+            Optional[Perf]: The replaced race, None if the race was added.
+        """
+        if self.key_of(perf) not in self.index:
+            self.add_perf(perf)
             return None
-        return min(filtered_perfs, key=lambda perf: perf.time)
+        return self.update_race(perf.date, perf.name_event, perf.distance, perf)
 
-    def get_all_personal_best(self) -> dict[float, Perf]:
+    def delete_race(
+        self, date: date | datetime, name_event: str, distance: float
+    ) -> Perf:
+        """
+        Deletes a race. The positions of the following races are shifted, so this
+        is O(n).
+
+        Returns:
+            Perf: The deleted race.
+
+        Raises:
+            ValueError: If the race is not recorded.
+        """
+        i = self._position(date, name_event, distance)
+        perf = self.perfs[i]
+        self.apply(Delta("delete", i, old=perf))
+        return perf
+
+    @property
+    def history(self) -> list[Delta]:
+        """The changes made since the creation, the last one at the end."""
+        return list(self._history)
+
+    @property
+    def can_undo(self) -> bool:
+        return bool(self._history)
+
+    @property
+    def can_redo(self) -> bool:
+        return bool(self._redo)
+
+    def undo(self) -> Delta:
+        """
+        Undoes the last change.
+
+        Returns:
+            Delta: The change applied to undo it.
+
+        Raises:
+            ValueError: If there is nothing to undo.
+        """
+        if not self._history:
+            raise ValueError("Nothing to undo")
+        delta = self._history[-1].inverse()
+        self.apply(delta, record=False)
+        self._redo.append(self._history.pop())
+        return delta
+
+    def redo(self) -> Delta:
+        """
+        Applies again the last undone change.
+
+        Returns:
+            Delta: The change applied.
+
+        Raises:
+            ValueError: If there is nothing to redo.
+        """
+        if not self._redo:
+            raise ValueError("Nothing to redo")
+        delta = self._redo[-1]
+        self.apply(delta, record=False)
+        self._history.append(self._redo.pop())
+        return delta
+
+    def apply(self, delta: Delta, record: bool = True) -> None:
+        """
+        Applies a change, and updates the index, the cached personal bests and
+        table rows from it rather than rebuilding them.
+
+        Args:
+            delta (Delta): The change, e.g. one received from another copy of the
+                performances.
+            record (bool, optional): Record the change in the history to be able
+                to undo it. A new change clears the changes to redo.
+
+        Raises:
+            ValueError: If the delta does not match the current races.
+            DuplicateRaceError: If the delta adds a race already recorded.
+        """
+        index, i, new = self.index, delta.position, delta.new
+        if delta.kind == "add":
+            if new is None or not 0 <= i <= len(self.perfs):
+                raise ValueError(f"Invalid delta {delta}")
+        elif not 0 <= i < len(self.perfs) or self.perfs[i] is not delta.old:
+            raise ValueError(f"Delta {delta.kind} does not match race {i}")
+        elif delta.kind == "update" and new is None:
+            raise ValueError(f"Invalid delta {delta}")
+        if new is not None:
+            key = self.key_of(new)
+            if key in index and (delta.old is None or key != self.key_of(delta.old)):
+                raise DuplicateRaceError(f"Race already recorded: {key}")
+
+        rows_fresh = self._rows_version == self._version
+        pbs_fresh = self._pbs_version == self._version
+        if new is None:
+            self._remove(i)
+        elif delta.kind == "add":
+            self._insert(i, new)
+        else:
+            del index[self.key_of(self.perfs[i])]
+            self.perfs[i] = new
+            index[self.key_of(new)] = i
+        if rows_fresh:
+            self._update_rows(delta)
+        if pbs_fresh:
+            self._update_pbs(delta)
+        self.touch()
+        self._rows_version = self._version if rows_fresh else -1
+        self._pbs_version = self._version if pbs_fresh else -1
+
+        if record:
+            self._history.append(delta)
+            self._redo.clear()
+        for listener in self._listeners:
+            listener(delta.old, delta.new)
+
+    def _insert(self, i: int, perf: Perf) -> None:
+        index = self.index
+        if i < len(self.perfs):
+            for key, position in index.items():
+                if position >= i:
+                    index[key] = position + 1
+        self.perfs.insert(i, perf)
+        index[self.key_of(perf)] = i
+        self._index_stamp = (len(self.perfs), self.athlete)
+
+    def _remove(self, i: int) -> None:
+        index = self.index
+        del index[self.key_of(self.perfs.pop(i))]
+        if i < len(self.perfs):
+            for key, position in index.items():
+                if position > i:
+                    index[key] = position - 1
+        self._index_stamp = (len(self.perfs), self.athlete)
+
+    def _update_rows(self, delta: Delta) -> None:
+        row = delta.new.table_row() if isinstance(delta.new, MainPerf) else None
+        if delta.kind == "add":
+            self._rows.insert(delta.position, row)
+        elif delta.kind == "delete":
+            del self._rows[delta.position]
+        else:
+            self._rows[delta.position] = row
+
+    def _update_pbs(self, delta: Delta) -> None:
+        pbs = self._pbs
+        stale: set[float] = set()
+        if delta.old is not None:
+            stale.update(
+                distance for distance, (_, perf, _) in pbs.items() if perf is delta.old
+            )
+        if delta.new is not None:
+            appended = delta.position == len(self.perfs) - 1
+            for distance, seconds, split in _pb_candidates(delta.new):
+                current = pbs.get(distance)
+                if current is None or seconds < current[0]:
+                    pbs[distance] = (seconds, delta.new, split)
+                elif seconds == current[0] and not appended:
+                    # the first race in order wins a tie
+                    stale.add(distance)
+        for distance in stale:
+            pbs.pop(distance, None)
+            best = self._scan_personal_best(distance)
+            if best is not None:
+                pbs[distance] = best
+
+    def iter_with_splits(self) -> Iterator[Perf | SubPerf]:
+        """
+        Iterates over the performances, each MainPerf being followed by its
+        sub-performances.
+        """
+        for perf in self.perfs:
+            yield perf
+            if isinstance(perf, MainPerf):
+                yield from perf.sub_perfs.values()
+
+    def _scan_personal_best(self, distance: float) -> Optional[tuple[int, Perf, int]]:
+        best: Optional[tuple[int, Perf, int]] = None
+        for perf in self.perfs:
+            for candidate, seconds, split in _pb_candidates(perf):
+                if candidate == distance and (best is None or seconds < best[0]):
+                    best = (seconds, perf, split)
+        return best
+
+    def _personal_bests(self) -> dict[float, tuple[int, Perf, int]]:
+        """The cached personal bests, rebuilt in one pass when outdated."""
+        if self._pbs_version != self._version:
+            pbs: dict[float, tuple[int, Perf, int]] = {}
+            for perf in self.perfs:
+                for distance, seconds, split in _pb_candidates(perf):
+                    if distance not in pbs or seconds < pbs[distance][0]:
+                        pbs[distance] = (seconds, perf, split)
+            self._pbs, self._pbs_version = pbs, self._version
+        return self._pbs
+
+    def get_personal_best(self, distance: float) -> Optional[Perf | SubPerf]:
+        """
+        Retrieves the personal best performance for a given distance, including the
+        sub-performances of the races.
+
+        Args:
+            distance (float): The distance for which to retrieve the personal best.
+
+        Returns:
+            Optional[Perf | SubPerf]: The personal best performance if found,
+                otherwise None.
+        """
+        best = self._personal_bests().get(distance)
+        return None if best is None else _pb_perf(best)
+
+    def get_all_personal_best(self) -> dict[float, Perf | SubPerf]:
         """
         Retrieves the personal best performance for each distance.
 
         Returns:
-            dict[float, Perf]: A dictionary with the distance as key and the
+            dict[float, Perf | SubPerf]: A dictionary with the distance as key and the
                 personal best performance as value.
         """
-        runned_distances = sorted(list(set(perf.distance for perf in self.perfs)))
-        all_pb = {
-            distance: self.get_personal_best(distance) for distance in runned_distances
-        }
-        return {distance: perf for distance, perf in all_pb.items() if perf is not None}
+        pbs = self._personal_bests()
+        return {distance: _pb_perf(pbs[distance]) for distance in sorted(pbs)}
 
-    def compute_iaaf_scores(self) -> None:
+    def compute_iaaf_scores(self) -> int:
         """
-        Computes the IAAF scores for each performance in the `perfs` list.
+        Computes the IAAF scores of the performances and of their splits.
 
         This method requires that the `iaaf` and `gender` attributes are set.
         If either is not set, the method returns without computing any scores.
 
+        Each MainPerf remembers the gender and coefficient table its scores were
+        computed with: only the races added, replaced or whose splits changed
+        since are scored, unless the gender or the table changed, in which case
+        all of them are. They are scored in one vectorized pass.
+
         Returns:
-            None
+            int: The number of races scored.
         """
         if self.iaaf is None or self.gender is None:
             print("IAAF scores cannot be computed without gender information")
-            return None
-        for perf in self.perfs:
-            event = perf.get_event()
-            if event is None:
+            return 0
+        iaaf = self.iaaf
+        stamp: ScoreStamp = (self.gender, iaaf.table.source_hash)
+        stale = [
+            perf
+            for perf in self.perfs
+            if not isinstance(perf, MainPerf) or perf._score_stamp != stamp
+        ]
+        if not stale:
+            return 0
+
+        import numpy as np
+
+        events: list[Optional[Event]] = []
+        seconds: list[int] = []
+        for perf in stale:
+            events.append(ROAD_EVENTS.get(perf.distance))
+            seconds.append(perf.time.get_seconds())
+            if events[-1] is None and isinstance(perf, MainPerf):
                 print(f"Event not found for distance {perf.distance}")
-                continue
-            iaaf_score = self.iaaf.get_iaaf_score(
-                gender=self.gender, event=event, time=perf.time
-            )
-            perf.iaaf_score = iaaf_score
-            print(f"IAAF score for {perf} is {iaaf_score}")
+            if isinstance(perf, MainPerf):
+                splits = perf.splits
+                events.extend(
+                    ROAD_EVENTS.get(end - begin)
+                    for begin, end in zip(splits.begin, splits.end)
+                )
+                seconds.extend(splits.seconds)
+        scores = iaaf.get_iaaf_scores(self.gender, events, np.array(seconds))
+        # unknown events keep their score
+        known = ~np.isnan(scores)
+        values = np.where(known, scores, NO_SCORE).astype(np.int64).tolist()
+
+        i = 0
+        for perf in stale:
+            if known[i]:
+                perf.iaaf_score = values[i]
+            i += 1
+            if isinstance(perf, MainPerf):
+                score = perf.splits.score
+                for j in range(len(perf.splits)):
+                    if known[i + j]:
+                        score[j] = values[i + j]
+                i += len(perf.splits)
+                perf._score_stamp = stamp
+        print(f"IAAF scores computed for {len(stale)} races")
+        self.touch()
+        return len(stale)
+
+    def to_records(self) -> list[dict[str, Any]]:
+        """
+        Converts the main performances to a list of dictionaries, as written in the
+        JSON file.
+
+        Returns:
+            list[dict[str, Any]]: One dictionary per MainPerf.
+        """
+        return records_of(self.perfs)
 
     def save_to_json(self, filepath: Path) -> None:
         """
         Save the performance data to a JSON file.
 
         This method filters the performance data to include only instances of MainPerf,
-        converts them to dictionaries, and writes them to a JSON file at the filepath.
+        converts them to dictionaries, and writes them atomically as a checksummed
+        snapshot (see `persistence.write_snapshot`) at the filepath.
 
         Args:
             filepath (Path): The path to the file where the JSON data will be saved.
         """
-        main_perfs: list[MainPerf] = list(
-            filter(lambda perf: isinstance(perf, MainPerf), self.perfs)
-        )
-        data = [perf.to_dict() for perf in main_perfs]
-        json.dump(data, open(filepath, "w"), indent=4)
+        write_snapshot(filepath, self.to_records())
 
-    def load_from_json(self, filepath: Path) -> None:
+    def load_from_json(self, filepath: Path, validate: bool = False) -> None:
         """
         Load performance data from a JSON file and add it to the tracker.
 
+        A snapshot written by `save_to_json` whose checksum matches is trusted:
+        its races are built without validation. Any other file (a plain JSON
+        list, or a snapshot modified since it was written) is fully validated.
+
         Args:
             filepath (Path): The path to the JSON file containing the performance data.
+            validate (bool, optional): Validate the races even if the file is a
+                verified snapshot.
         """
         if len(self):
             raise ValueError(f"perf is not empty: it contains {len(self)} performances")
@@ -396,26 +1368,73 @@ class PerfsRaces(BaseModel):
         if not filepath.exists():
             raise FileNotFoundError(f"File {filepath} does not exist")
 
-        data: list[dict[str, str | list[dict[str, str]]]] = json.load(
-            open(filepath, "r")
+        data, verified = read_snapshot(filepath)
+        build = (
+            MainPerf.from_trusted_dict
+            if verified and not validate
+            else MainPerf.from_dict
         )
+        # added in one go, the index and caches being rebuilt on first use;
+        # loading is not a change which can be undone
+        keys: set[RaceKey] = set()
         for perf_data in data:
-            perf = MainPerf.from_dict(perf_data)
-            self.add_perf(perf)
+            perf = build(perf_data)
+            key = self.key_of(perf)
+            if key in keys:
+                print(f"Skip: Race already recorded: {key}")
+                continue
+            keys.add(key)
+            self.perfs.append(perf)
+        self.touch()
+        for listener in self._listeners:
+            for loaded in self.perfs:
+                listener(None, loaded)
         print(f"Load {filepath}")
 
-    def table(self) -> pd.DataFrame:
+    def _table_rows(self) -> list[Optional[TableRow]]:
+        """The cached rows of table(), rebuilt when outdated."""
+        if self._rows_version != self._version:
+            self._rows = [
+                perf.table_row() if isinstance(perf, MainPerf) else None
+                for perf in self.perfs
+            ]
+            self._rows_version = self._version
+        return self._rows
+
+    def table_position(self, i: int) -> int:
+        """Position in table() of the row of the main performance perfs[i]."""
+        rows = self._table_rows()
+        row = rows[i]
+        if row is None:
+            raise ValueError(f"Race {i} is not a main performance")
+        day = row[1].date()
+        return sum(
+            1
+            for j, other in enumerate(rows)
+            if other is not None and (other[1].date(), j) < (day, i)
+        )
+
+    def table_order(self) -> list[int]:
+        """
+        Positions in perfs of the rows of table(): the main performances sorted
+        by date, in their order of addition on the same day.
+        """
+        days = {
+            i: row[1].date()
+            for i, row in enumerate(self._table_rows())
+            if row is not None
+        }
+        return sorted(days, key=days.__getitem__)
+
+    def table(self) -> "pd.DataFrame":
         """
         Returns a pandas DataFrame with the performance data with
-        only the main performances.
+        only the main performances, sorted by date (see `table_frame`).
 
         Returns:
             pd.DataFrame: A DataFrame with the performance data.
         """
-        mainperfs: list[MainPerf] = list(
-            filter(lambda perf: isinstance(perf, MainPerf), self.perfs)
+        rows = self._table_rows()
+        return table_frame(
+            [row for i in self.table_order() if (row := rows[i]) is not None]
         )
-        data = list(map(lambda x: x.get_basic_info(), mainperfs))
-        data.sort(key=lambda x: str(x.get("Date")))
-
-        return pd.DataFrame(data)
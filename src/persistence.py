@@ -0,0 +1,293 @@
+import atexit
+import gc
+import hashlib
+import json
+import os
+import pickle
+import queue
+import re
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+Records = list[dict[str, Any]]
+
+SNAPSHOT_FORMAT = 1
+# the header of a snapshot, followed by the JSON records and "}"
+SNAPSHOT_HEADER = re.compile(
+    rb'^\{"format": (\d+), "sha256": "([0-9a-f]{64})", "races": '
+)
+
+
+def atomic_write_bytes(filepath: Path, data: bytes) -> None:
+    """
+    Write data to filepath atomically.
+
+    The data is first written to a temporary file in the same directory, flushed
+    to disk, and then renamed over filepath, so a reader never sees a partially
+    written file.
+
+    Args:
+        filepath (Path): The path to the file to write.
+        data (bytes): The content of the file.
+    """
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(
+        dir=filepath.parent, prefix=f".{filepath.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_name, filepath)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def atomic_write_json(filepath: Path, data: Any) -> None:
+    """
+    Write data as JSON to filepath atomically, see `atomic_write_bytes`.
+
+    Args:
+        filepath (Path): The path to the file where the JSON data will be saved.
+        data (Any): The JSON-serializable data to write.
+    """
+    atomic_write_bytes(filepath, json.dumps(data, indent=4).encode())
+
+
+def write_snapshot(filepath: Path, records: Records) -> None:
+    """
+    Write records atomically as a snapshot: a JSON document holding the records
+    and the SHA-256 checksum of their serialization, so that a later read can
+    tell whether the file is exactly as written.
+
+    Args:
+        filepath (Path): The path to the snapshot file.
+        records (Records): The records, as returned by `PerfsRaces.to_records`.
+    """
+    payload = json.dumps(records, indent=4).encode()
+    checksum = hashlib.sha256(payload).hexdigest()
+    header = f'{{"format": {SNAPSHOT_FORMAT}, "sha256": "{checksum}", "races": '
+    atomic_write_bytes(filepath, header.encode() + payload + b"}\n")
+
+
+def read_snapshot(filepath: Path) -> tuple[Records, bool]:
+    """
+    Read the records of a snapshot, or of a plain JSON list of records.
+
+    Args:
+        filepath (Path): The path to the file.
+
+    Returns:
+        tuple[Records, bool]: The records, and whether they are a snapshot of this
+            format whose checksum matches, i.e. written by `write_snapshot` and not
+            modified since.
+    """
+    data = filepath.read_bytes()
+    match = SNAPSHOT_HEADER.match(data)
+    if match is not None and int(match[1]) == SNAPSHOT_FORMAT:
+        payload = data[match.end() :].rstrip()
+        if payload.endswith(b"}"):
+            payload = payload[:-1]
+            if hashlib.sha256(payload).hexdigest() == match[2].decode():
+                return json.loads(payload), True
+    document = json.loads(data)
+    if isinstance(document, dict):
+        print(f"Checksum mismatch in {filepath}: the races will be validated")
+        document = document.get("races", [])
+    if not isinstance(document, list):
+        raise ValueError(f"{filepath} does not contain a list of races")
+    return document, False
+
+
+def file_digest(filepath: Path) -> bytes:
+    """The SHA-256 digest of the content of a file."""
+    with open(filepath, "rb") as file:
+        return hashlib.file_digest(file, "sha256").digest()
+
+
+def read_cache(cache_path: Path, key: bytes) -> Optional[Any]:
+    """
+    Read the object of a cache file written by `write_cache`.
+
+    Args:
+        cache_path (Path): The path to the cache file.
+        key (bytes): The key the object must have been written with, e.g. the
+            digest of its source file and the version of the code.
+
+    Returns:
+        Optional[Any]: The object, None if the file is missing, was written with
+            another key or cannot be read.
+    """
+    try:
+        with open(cache_path, "rb") as file:
+            if file.read(len(key)) != key:
+                return None
+            # unpickling creates many objects and none is garbage: pausing the
+            # collector halves the time
+            enabled = gc.isenabled()
+            gc.disable()
+            try:
+                return pickle.load(file)
+            finally:
+                if enabled:
+                    gc.enable()
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Ignore the cache {cache_path}: {type(e).__name__}: {e}")
+        return None
+
+
+def write_cache(cache_path: Path, key: bytes, obj: Any) -> None:
+    """
+    Pickle an object atomically to a cache file, after its key.
+
+    Args:
+        cache_path (Path): The path to the cache file.
+        key (bytes): The key of the object, see `read_cache`.
+        obj (Any): The object.
+    """
+    atomic_write_bytes(
+        cache_path, key + pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    )
+
+
+class WriteStatus(BaseModel):
+    submitted: int = 0
+    written: int = 0
+    last_saved: Optional[datetime] = None
+    last_error: Optional[str] = None
+
+    @property
+    def pending(self) -> int:
+        return self.submitted - self.written
+
+    @property
+    def durable(self) -> bool:
+        """True when every submitted snapshot is on disk and no write failed."""
+        return self.pending == 0 and self.last_error is None
+
+
+class BackgroundWriter:
+    def __init__(self, filepath: Path) -> None:
+        """
+        Starts a worker thread which persists snapshots of the performances to
+        filepath (see `write_snapshot`).
+
+        Snapshots are taken off a queue; when several are waiting, only the most
+        recent one (the highest sequence number) is written, so a burst of
+        submissions costs a single write. A snapshot counts as written only once
+        it is on disk: after a failed write, `flush` returns False until a newer
+        snapshot is written.
+
+        Args:
+            filepath (Path): The path to the snapshot file to keep up to date.
+        """
+        self.filepath = filepath
+        self._queue: queue.Queue[Optional[tuple[int, Records]]] = queue.Queue()
+        self._condition = threading.Condition()
+        self._status = WriteStatus()
+        # sequence number of the last snapshot whose write failed
+        self._failed = 0
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="perfs-writer", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def status(self) -> WriteStatus:
+        with self._condition:
+            return self._status.model_copy()
+
+    def submit(self, records: Records) -> int:
+        """
+        Queue a snapshot of the performances to be written to disk.
+
+        Args:
+            records (Records): The snapshot, as returned by `PerfsRaces.to_records`.
+
+        Returns:
+            int: The sequence number of the snapshot, to be given to `flush`.
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("BackgroundWriter is closed")
+            self._status.submitted += 1
+            seq = self._status.submitted
+            # queued under the lock, so that the snapshots are queued in order
+            self._queue.put((seq, records))
+        return seq
+
+    def flush(self, seq: Optional[int] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until a snapshot has been written to disk.
+
+        Args:
+            seq (Optional[int]): The sequence number to wait for. Defaults to the
+                last submitted snapshot.
+            timeout (Optional[float]): Maximum number of seconds to wait.
+
+        Returns:
+            bool: True if the snapshot was written, False on timeout or if the
+                write of this snapshot, or of a newer one replacing it, failed
+                (see `status.last_error`). A failure of an older snapshot does
+                not stop the wait.
+        """
+        with self._condition:
+            target = self._status.submitted if seq is None else seq
+            self._condition.wait_for(
+                lambda: self._status.written >= target or self._failed >= target,
+                timeout=timeout,
+            )
+            return self._status.written >= target
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Write the pending snapshots and stop the worker thread."""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+        atexit.unregister(self.close)
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is None:
+                break
+            # coalesce: keep only the most recent snapshot waiting in the queue
+            while True:
+                try:
+                    newer = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if newer is None:
+                    stop = True
+                elif newer[0] > item[0]:
+                    item = newer
+            seq, records = item
+            error: Optional[str] = None
+            try:
+                write_snapshot(self.filepath, records)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                print(f"Failed to save {self.filepath}: {error}")
+            with self._condition:
+                if error is None:
+                    self._status.written = max(self._status.written, seq)
+                    self._status.last_saved = datetime.now()
+                else:
+                    self._failed = max(self._failed, seq)
+                self._status.last_error = error
+                self._condition.notify_all()
@@ -0,0 +1,188 @@
+from functools import cache
+from typing import TYPE_CHECKING, Optional, Sequence
+
+import numpy as np
+
+from .iaaf import (
+    EVENT_DISTANCES,
+    MAX_SCORE,
+    TIMED_EVENTS,
+    Event,
+    Gender,
+    IAAFCalculator,
+    get_calculator,
+    iaaf_polynomial,
+)
+from .perfs_tracker import ROAD_EVENTS, PerfsRaces
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+RIEGEL_EXPONENT = 1.06
+
+
+def invert_points(coeffs: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """
+    Time in seconds scoring the given points, on the decreasing branch of the
+    scoring formula a*t^2 + b*t + c.
+
+    Args:
+        coeffs (np.ndarray): Array of shape (n, 3) of coefficients (a, b, c).
+        points (np.ndarray): Array broadcastable with shape (n, m) of points.
+
+    Returns:
+        np.ndarray: The times, NaN where the points cannot be reached.
+    """
+    a, b, c = (coeffs[:, k, np.newaxis] for k in range(3))
+    discriminant = b**2 - 4 * a * (c - points)
+    with np.errstate(invalid="ignore"):
+        return (-b - np.sqrt(discriminant)) / (2 * a)
+
+
+class RacePredictor:
+    def __init__(self, gender: Gender, iaaf: Optional[IAAFCalculator] = None) -> None:
+        """
+        Predicts equivalent times across distances.
+
+        The score-to-time grid of every timed event is computed once: grid[e, p]
+        is the time scoring p points on self.events[e].
+
+        Args:
+            gender (Gender): The gender of the athlete.
+            iaaf (Optional[IAAFCalculator]): The scoring tables. Defaults to the
+                tables in "data".
+        """
+        iaaf = iaaf if iaaf is not None else get_calculator()
+        self.gender = gender
+        self.events: list[Event] = [
+            event for event in TIMED_EVENTS if iaaf.has_event(gender, event)
+        ]
+        self._event_index = {event: i for i, event in enumerate(self.events)}
+        self.coeffs = iaaf.get_coeffs_array(gender, self.events)
+        self.grid = invert_points(self.coeffs, np.arange(MAX_SCORE + 1))
+
+    def event_index(self, events: Sequence[Event]) -> np.ndarray:
+        """Rows of the grid of the given events."""
+        try:
+            return np.array([self._event_index[event] for event in events], dtype=int)
+        except KeyError as e:
+            raise ValueError(f"No scoring table for event {e} ({self.gender})") from e
+
+    def scores(self, events: Sequence[Event], seconds: np.ndarray) -> np.ndarray:
+        """
+        Unrounded IAAF scores of performances, clipped to [0, 1400]. The times
+        slower than the vertex of the scoring formula score 0 (see
+        `iaaf_polynomial`).
+
+        Args:
+            events (Sequence[Event]): The event of each performance.
+            seconds (np.ndarray): The time of each performance.
+
+        Returns:
+            np.ndarray: The scores.
+        """
+        coeffs = self.coeffs[self.event_index(events)]
+        points, past_vertex = iaaf_polynomial(
+            list(coeffs.T), np.asarray(seconds, dtype=float)
+        )
+        return np.clip(np.where(past_vertex, 0, points), 0, MAX_SCORE)
+
+    def predict(
+        self,
+        events: Sequence[Event],
+        seconds: np.ndarray,
+        targets: Optional[Sequence[Event]] = None,
+    ) -> np.ndarray:
+        """
+        Predicts, for each performance, the time of same IAAF score on each target
+        event, by linear interpolation in the grid.
+
+        The performances scoring less than 1 point are too slow for the scoring
+        tables to tell their equivalents, their predictions are NaN.
+
+        Args:
+            events (Sequence[Event]): The event of each performance.
+            seconds (np.ndarray): The time of each performance.
+            targets (Optional[Sequence[Event]]): The events to predict. Defaults
+                to all the timed events.
+
+        Returns:
+            np.ndarray: Array of shape (len(events), len(targets)) of times in
+                seconds, NaN where the performance scores less than 1 point.
+        """
+        rows = self.event_index(targets if targets is not None else self.events)
+        scores = self.scores(events, seconds)
+        predictable = scores >= 1
+        low = np.clip(np.floor(scores).astype(int), 1, MAX_SCORE - 1)
+        fraction = (scores - low)[:, np.newaxis]
+        grid = self.grid[rows]
+        predicted = (1 - fraction) * grid[:, low].T + fraction * grid[:, low + 1].T
+        predicted[~predictable] = np.nan
+        return predicted
+
+    def predict_riegel(
+        self,
+        distances: np.ndarray,
+        seconds: np.ndarray,
+        target_distances: np.ndarray,
+        exponent: float = RIEGEL_EXPONENT,
+    ) -> np.ndarray:
+        """
+        Predicts times with Riegel's formula t2 = t1 * (d2 / d1) ** exponent.
+
+        Args:
+            distances (np.ndarray): The distance of each performance, in km.
+            seconds (np.ndarray): The time of each performance.
+            target_distances (np.ndarray): The distances to predict, in km.
+            exponent (float, optional): Fatigue exponent. Defaults to 1.06.
+
+        Returns:
+            np.ndarray: Array of shape (len(distances), len(target_distances)).
+        """
+        ratio = (
+            np.asarray(target_distances)[np.newaxis, :]
+            / np.asarray(distances)[:, np.newaxis]
+        )
+        return np.asarray(seconds, dtype=float)[:, np.newaxis] * ratio**exponent
+
+    def predict_personal_bests(
+        self, perfs: PerfsRaces, targets: Optional[Sequence[Event]] = None
+    ) -> "pd.DataFrame":
+        """
+        Predicts the equivalent times of all the personal bests of an athlete in one
+        vectorized call.
+
+        Args:
+            perfs (PerfsRaces): The performances of the athlete.
+            targets (Optional[Sequence[Event]]): The events to predict. Defaults
+                to the flat running events.
+
+        Returns:
+            pd.DataFrame: One row per personal best on a scored distance, indexed
+                by its distance, with the predicted times in seconds in one column
+                per target event.
+        """
+        import pandas as pd
+
+        targets = targets if targets is not None else list(EVENT_DISTANCES)
+        pbs = {
+            distance: perf
+            for distance, perf in perfs.get_all_personal_best().items()
+            if distance in ROAD_EVENTS
+        }
+        predictions = self.predict(
+            [ROAD_EVENTS[distance] for distance in pbs],
+            np.array([perf.time.get_seconds() for perf in pbs.values()], dtype=float),
+            targets,
+        )
+        return pd.DataFrame(
+            predictions.reshape(len(pbs), len(targets)),
+            index=pd.Index(list(pbs), name="Distance (km)"),
+            columns=[event.value for event in targets],
+        )
+
+
+@cache
+def get_predictor(gender: Gender) -> RacePredictor:
+    """Returns the predictor of a gender, built once per process."""
+    return RacePredictor(gender)
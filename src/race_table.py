@@ -0,0 +1,74 @@
+from .facets import FacetIndex, table_values
+from .pacing import PacingProfile, RaggedSplits, add_pacing_columns
+from .perfs_tracker import Delta, MainPerf, PerfsRaces, table_frame
+
+
+class RaceTable:
+    def __init__(self, perfs: PerfsRaces) -> None:
+        """
+        The table of the races of perfs with their pacing columns (see
+        `add_pacing_columns`) and its facet index, kept up to date by `apply`:
+        each change moves, adds or deletes one row of the table and one bit of
+        each facet, instead of building them again from all the races.
+
+        Args:
+            perfs (PerfsRaces): The performances. They must be changed through
+                `apply` only, for the table to follow them.
+        """
+        self.perfs = perfs
+        self.df = add_pacing_columns(perfs.table(), perfs)
+        self.facets = FacetIndex.from_table(self.df)
+
+    def apply(self, delta: Delta, record: bool = True) -> None:
+        """
+        Applies a change to the performances (see `PerfsRaces.apply`), then to
+        the rows of the table and the facet index.
+
+        Raises:
+            ValueError: If the delta does not match the current races.
+            DuplicateRaceError: If the delta adds a race already recorded.
+        """
+        perfs = self.perfs
+        old_row = (
+            perfs.table_position(delta.position)
+            if isinstance(delta.old, MainPerf)
+            else None
+        )
+        perfs.apply(delta, record=record)
+        if old_row is not None:
+            self._delete(old_row)
+        if isinstance(delta.new, MainPerf):
+            self._insert(perfs.table_position(delta.position), delta.new)
+
+    def _delete(self, row: int) -> None:
+        df = self.df.drop(index=row).reset_index(drop=True)
+        if len(df):
+            df["Location"] = df["Location"].cat.remove_unused_categories()
+        else:
+            # built without self.perfs, to which an update already added its race
+            empty = PerfsRaces()
+            df = add_pacing_columns(empty.table(), empty)
+        self.df = df
+        self.facets.delete(row)
+
+    def _insert(self, row: int, perf: MainPerf) -> None:
+        import pandas as pd
+
+        frame = table_frame([perf.table_row()])
+        frame = frame.assign(
+            **PacingProfile.compute(RaggedSplits.from_perfs([perf])).columns()
+        )
+        df = self.df
+        # the locations stay a categorical column with sorted categories
+        locations = pd.CategoricalDtype(
+            sorted(
+                set(df["Location"].cat.categories)
+                | set(frame["Location"].cat.categories)
+            )
+        )
+        df = df.astype({"Location": locations})
+        frame = frame.astype({"Location": locations})
+        parts = [part for part in (df.iloc[:row], frame, df.iloc[row:]) if len(part)]
+        # the pacing columns of text are inferred as in a table built at once
+        self.df = pd.concat(parts, ignore_index=True).infer_objects()
+        self.facets.insert(row, {k: v[0] for k, v in table_values(frame).items()})
@@ -0,0 +1,298 @@
+import json
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Literal, Optional
+
+from .perfs_tracker import Delta, DuplicateRaceError, MainPerf
+from .persistence import atomic_write_bytes, atomic_write_json
+from .store import PerfStore
+
+DATA_FILENAME = "perfs.json"
+LOG_FILENAME = "changes.jsonl"
+STATE_FILENAME = "replication.json"
+
+# (date, name_event, distance) of the race changed, as in the JSON file
+ChangeKey = tuple[str, str, float]
+
+
+@dataclass(frozen=True)
+class Changeset:
+    """
+    One change made on a node, in the order of its `seq` (from 1) on this node:
+    the race `race` added, the race `key` replaced by `race`, or the race `key`
+    deleted (`race` is None).
+
+    Applying a changeset twice changes nothing more: an addition of a race
+    already recorded replaces it, and a deletion of a missing race is skipped.
+    """
+
+    node: str
+    seq: int
+    kind: Literal["add", "update", "delete"]
+    key: ChangeKey
+    race: Optional[dict[str, Any]] = None
+
+    @classmethod
+    def from_delta(cls, node: str, seq: int, delta: Delta) -> "Changeset":
+        """The changeset of a change of the store."""
+        identified = delta.old if delta.old is not None else delta.new
+        if not isinstance(identified, MainPerf):
+            raise ValueError(f"Only the main performances are replicated: {delta}")
+        return cls(
+            node=node,
+            seq=seq,
+            kind=delta.kind,
+            key=(
+                str(identified.date.date()),
+                identified.name_event,
+                identified.distance,
+            ),
+            race=delta.new.to_dict() if isinstance(delta.new, MainPerf) else None,
+        )
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "node": self.node,
+                "seq": self.seq,
+                "kind": self.kind,
+                "key": list(self.key),
+                "race": self.race,
+            }
+        )
+
+    @classmethod
+    def from_json(cls, line: str) -> "Changeset":
+        data = json.loads(line)
+        date, name_event, distance = data["key"]
+        return cls(
+            node=data["node"],
+            seq=data["seq"],
+            kind=data["kind"],
+            key=(date, name_event, distance),
+            race=data["race"],
+        )
+
+
+def read_changesets(log_path: Path, offset: int = 0) -> Iterator[tuple[Changeset, int]]:
+    """
+    Reads the changesets of a log from a byte offset.
+
+    A last line without its newline is being written: it is left for the next
+    read.
+
+    Args:
+        log_path (Path): The log, one changeset per line.
+        offset (int, optional): Where to start, the end of a line.
+
+    Yields:
+        tuple[Changeset, int]: Each changeset and the offset after it.
+    """
+    if not log_path.exists():
+        return
+    with open(log_path, "rb") as file:
+        file.seek(offset)
+        for line in file:
+            if not line.endswith(b"\n"):
+                return
+            offset += len(line)
+            yield Changeset.from_json(line.decode()), offset
+
+
+class Replica:
+    def __init__(self, directory: Path, store: Optional[PerfStore] = None) -> None:
+        """
+        A node replicating its races with other nodes by changesets.
+
+        The node directory holds the races ("perfs.json"), the log of the
+        changes made on the node ("changes.jsonl", one changeset per line, in
+        the order of their sequence numbers) and the replication state
+        ("replication.json": the id of the node, the changesets and bytes
+        dropped from the start of its log by `compact` and, for each peer, the
+        last changeset applied from it and where it ends in the peer's log,
+        counting the bytes dropped).
+
+        Each change of the store is appended to the log, except the ones
+        applied from a peer: every node pulls the changes of every other one
+        (see `pull`). Concurrent changes of the same race on two nodes are
+        resolved by the order in which each node applies them.
+
+        Args:
+            directory (Path): The directory of the node, created if needed.
+            store (Optional[PerfStore]): The store of the node, on
+                "perfs.json" in directory. Defaults to a new store.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+        self.store = (
+            store if store is not None else PerfStore(directory / DATA_FILENAME)
+        )
+        self.log_path = directory / LOG_FILENAME
+        self.state_path = directory / STATE_FILENAME
+        if self.state_path.exists():
+            with open(self.state_path) as file:
+                state = json.load(file)
+        else:
+            state = {"node": uuid.uuid4().hex[:12], "peers": {}}
+            atomic_write_json(self.state_path, state)
+        self.node: str = state["node"]
+        # {"seq": changesets, "offset": bytes} dropped from the log by `compact`
+        self.dropped: dict[str, int] = _dropped(state)
+        # peer -> {"seq": last changeset applied, "offset": its end in the log}
+        self.peers: dict[str, dict[str, int]] = state["peers"]
+        self.seq = self.dropped["seq"] + sum(1 for _ in read_changesets(self.log_path))
+        self._lock = threading.Lock()
+        self._applying = threading.local()
+        self.unsubscribe = self.store.subscribe(self._export)
+
+    def _export(self, version: int, delta: Delta) -> None:
+        """Appends a change of the store to the log, unless it was pulled."""
+        if getattr(self._applying, "active", False):
+            return
+        with self._lock:
+            changeset = Changeset.from_delta(self.node, self.seq + 1, delta)
+            with open(self.log_path, "a") as file:
+                file.write(changeset.to_json() + "\n")
+            self.seq += 1
+
+    def _save_state(self) -> None:
+        atomic_write_json(
+            self.state_path,
+            {"node": self.node, "dropped": self.dropped, "peers": self.peers},
+        )
+
+    def apply(self, changeset: Changeset) -> bool:
+        """
+        Applies a changeset of another node to the store, without logging it.
+
+        Returns:
+            bool: Whether the races changed.
+        """
+        date_str, name_event, distance = changeset.key
+        date = datetime.fromisoformat(date_str)
+        race = (
+            MainPerf.from_dict(changeset.race) if changeset.race is not None else None
+        )
+        self._applying.active = True
+        try:
+            with self.store.read() as perfs:
+                current = perfs.get_race(date, name_event, distance)
+            if race is None:
+                if current is None:
+                    return False
+                self.store.delete_race(date, name_event, distance)
+            elif current is not None:
+                if (
+                    isinstance(current, MainPerf)
+                    and current.to_dict() == race.to_dict()
+                ):
+                    return False
+                self.store.update_race(date, name_event, distance, race)
+            else:
+                try:
+                    self.store.add_perf(race)
+                except DuplicateRaceError:
+                    # an update renaming a race into one recorded here
+                    self.store.update_race(
+                        race.date, race.name_event, race.distance, race
+                    )
+            return True
+        finally:
+            self._applying.active = False
+
+    def pull(self, peer: Path) -> int:
+        """
+        Applies the changesets of a peer not applied yet, in order. Only the
+        end of the peer's log written since the last pull is read.
+
+        Args:
+            peer (Path): The directory of the peer node.
+
+        Returns:
+            int: The number of changesets applied.
+        """
+        with open(peer / STATE_FILENAME) as file:
+            peer_state = json.load(file)
+        peer_node = peer_state["node"]
+        if peer_node == self.node:
+            raise ValueError(f"{peer} is this node {self.node}")
+        state = self.peers.get(peer_node, {"seq": 0, "offset": 0})
+        log_path = peer / LOG_FILENAME
+        # the offsets count the bytes the peer dropped from its log
+        dropped = _dropped(peer_state)["offset"]
+        offset = state["offset"] - dropped
+        if offset < 0 or not log_path.exists() or log_path.stat().st_size < offset:
+            # the log was replaced: read it again from the start
+            offset = 0
+
+        applied = 0
+        try:
+            for changeset, end in read_changesets(log_path, offset):
+                if changeset.node != peer_node:
+                    raise ValueError(f"Changeset of {changeset.node} in {log_path}")
+                if changeset.seq > state["seq"]:
+                    if changeset.seq != state["seq"] + 1:
+                        raise ValueError(
+                            f"Changeset {changeset.seq} of {peer_node} follows "
+                            f"changeset {state['seq']}"
+                        )
+                    self.apply(changeset)
+                    applied += 1
+                state = {
+                    "seq": max(state["seq"], changeset.seq),
+                    "offset": end + dropped,
+                }
+        finally:
+            self.peers[peer_node] = state
+            self._save_state()
+        return applied
+
+    def compact(self, peers: Iterable[Path]) -> int:
+        """
+        Drops from the log the changesets applied by every peer, which no pull
+        reads again.
+
+        Only the process owning the node may compact its log, and the pulls of
+        the peers running meanwhile may fail: the next ones read the new log.
+
+        Args:
+            peers (Iterable[Path]): The directories of all the peers of the node.
+                A peer which never pulled from it keeps the whole log.
+
+        Returns:
+            int: The number of changesets dropped.
+        """
+        applied = self.seq
+        for peer in peers:
+            with open(peer / STATE_FILENAME) as file:
+                peer_state = json.load(file)
+            applied = min(
+                applied, peer_state["peers"].get(self.node, {"seq": 0})["seq"]
+            )
+        with self._lock:
+            seq, cut = self.dropped["seq"], 0
+            for changeset, end in read_changesets(self.log_path):
+                if changeset.seq > applied:
+                    break
+                seq, cut = changeset.seq, end
+            if not cut:
+                return 0
+            with open(self.log_path, "rb") as file:
+                file.seek(cut)
+                rest = file.read()
+            atomic_write_bytes(self.log_path, rest)
+            dropped = seq - self.dropped["seq"]
+            self.dropped = {
+                "seq": seq,
+                "offset": self.dropped["offset"] + cut,
+            }
+            self._save_state()
+        return dropped
+
+
+def _dropped(state: dict[str, Any]) -> dict[str, int]:
+    """What `compact` dropped from the log of a node, given its state."""
+    return state.get("dropped", {"seq": 0, "offset": 0})
@@ -0,0 +1,225 @@
+import re
+from enum import Enum
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+
+from .iaaf import (
+    COMBINED_EVENTS,
+    FIELD_EVENTS,
+    MAX_SCORE,
+    EnumT,
+    Event,
+    Gender,
+    IAAFCalculator,
+    compute_points,
+    get_calculator,
+)
+from .time_an_pace import parse_time
+
+# "9.58", "1:45.20", "2:01:09"
+DECIMAL_TIME = (
+    r"^\s*(?:(?:(?P<hours>\d+):)?(?P<minutes>\d{1,2}):)?"
+    r"(?P<seconds>\d{1,2}(?:\.\d+)?)\s*$"
+)
+# "8.95", "8.95m", "8,95 m"
+MARK = r"^\s*(?P<mark>\d+(?:[.,]\d+)?)\s*m?\s*$"
+
+
+class EventType(str, Enum):
+    time = "time"  # seconds, the lower the better
+    distance = "distance"  # meters, the higher the better
+    points = "points"  # points of a combined event, the higher the better
+
+
+def get_event_type(event: Event) -> EventType:
+    if event in FIELD_EVENTS:
+        return EventType.distance
+    if event in COMBINED_EVENTS:
+        return EventType.points
+    return EventType.time
+
+
+def parse_performance(event: Event, performance: str) -> float:
+    """
+    Parses a performance written as on a results sheet.
+
+    Times are "h:mm:ss", "mm:ss.ff", "ss.ff" or "<hour>h<min>min<sec>s", marks of
+    field events are in meters ("8.95", "8.95m") and combined events in points.
+
+    Args:
+        event (Event): The event of the performance.
+        performance (str): The performance.
+
+    Returns:
+        float: The performance in seconds, meters or points.
+
+    Raises:
+        ValueError: If the string is not a valid performance of this event.
+    """
+    event = Event(event)
+    event_type = get_event_type(event)
+    if event_type is EventType.time:
+        match = re.match(DECIMAL_TIME, performance)
+        if match is None:
+            return float(parse_time(performance).get_seconds())
+        hours, minutes, seconds = (
+            float(match[k] or 0) for k in ("hours", "minutes", "seconds")
+        )
+        if (match["minutes"] and seconds >= 60) or (match["hours"] and minutes >= 60):
+            raise ValueError(f"Invalid time {performance!r}")
+        value = hours * 3600 + minutes * 60 + seconds
+    else:
+        match = re.match(MARK, performance)
+        if match is None or (event_type is EventType.points and "m" in performance):
+            raise ValueError(
+                f"Invalid {event_type.value} {performance!r} ({event.value})"
+            )
+        value = float(match["mark"].replace(",", "."))
+    if value <= 0:
+        raise ValueError(f"Invalid {event_type.value} {performance!r} ({event.value})")
+    return value
+
+
+def score_times(coeffs: np.ndarray, seconds: np.ndarray) -> np.ndarray:
+    """Scores times: slower ones than the vertex of the formula score 0."""
+    return compute_points(coeffs, seconds)
+
+
+def score_marks(coeffs: np.ndarray, marks: np.ndarray) -> np.ndarray:
+    """
+    Scores distances in meters or points of combined events: shorter ones than
+    the vertex of the formula score 0.
+    """
+    return compute_points(coeffs, marks, lower_is_better=False)
+
+
+EVALUATORS: dict[EventType, Callable[[np.ndarray, np.ndarray], np.ndarray]] = {
+    EventType.time: score_times,
+    EventType.distance: score_marks,
+    EventType.points: score_marks,
+}
+
+
+def _lookup(
+    values: Sequence[str], enum: type[EnumT], index: dict[EnumT, int]
+) -> np.ndarray:
+    """Maps values to their index, -1 when unknown, converting each distinct one."""
+    distinct: dict[str, int] = {}
+    rows = np.empty(len(values), dtype=int)
+    for i, value in enumerate(values):
+        row = distinct.get(value)
+        if row is None:
+            try:
+                row = distinct[value] = index.get(enum(value), -1)
+            except ValueError:
+                row = distinct[value] = -1
+        rows[i] = row
+    return rows
+
+
+class ScoringEngine:
+    def __init__(self, iaaf: Optional[IAAFCalculator] = None) -> None:
+        """
+        Scores the results of any event of the IAAF tables: times, marks in
+        meters of the field events and points of the combined events.
+
+        Args:
+            iaaf (Optional[IAAFCalculator]): The scoring tables. Defaults to the
+                tables in "data".
+        """
+        self.iaaf = iaaf if iaaf is not None else get_calculator()
+        self.coeffs = self.iaaf.table.to_numpy()
+        # the type of each event of the table, and "" for the unknown ones (-1)
+        self._event_types = np.array(
+            [get_event_type(Event(name)).value for name in self.iaaf.table.events]
+            + [""]
+        )
+
+    def _rows(
+        self, genders: Gender | Sequence[Gender], events: Sequence[Event]
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Indices in the coefficient table of each result, -1 when unknown."""
+        table = self.iaaf.table
+        event_rows = _lookup(events, Event, table.event_index)
+        if isinstance(genders, str):
+            gender_rows = _lookup([genders], Gender, table.gender_index)
+            return np.repeat(gender_rows, len(event_rows)), event_rows
+        gender_rows = _lookup(genders, Gender, table.gender_index)
+        if len(gender_rows) != len(event_rows):
+            raise ValueError(f"{len(gender_rows)} genders for {len(event_rows)} events")
+        return gender_rows, event_rows
+
+    def score(
+        self,
+        genders: Gender | Sequence[Gender],
+        events: Sequence[Event],
+        performances: Sequence[float] | np.ndarray,
+    ) -> np.ndarray:
+        """
+        Scores a batch of results, each event type with its evaluator.
+
+        Args:
+            genders (Gender | Sequence[Gender]): The gender of all the results, or
+                of each result.
+            events (Sequence[Event]): The event of each result.
+            performances (Sequence[float] | np.ndarray): Each performance, in
+                seconds, meters or points depending on the event.
+
+        Returns:
+            np.ndarray: The scores as floats, rounded and clipped to [0, 1400], NaN
+                where the event has no scoring table for the gender or the
+                performance is not positive.
+        """
+        performances = np.asarray(performances, dtype=float)
+        if len(events) != len(performances):
+            raise ValueError(
+                f"{len(events)} events for {len(performances)} performances"
+            )
+        gender_rows, event_rows = self._rows(genders, events)
+        known = (gender_rows >= 0) & (event_rows >= 0)
+        coeffs = np.full((len(events), 3), np.nan)
+        coeffs[known] = self.coeffs[gender_rows[known], event_rows[known]]
+        event_types = self._event_types[event_rows]
+
+        points = np.full(len(events), np.nan)
+        for event_type, evaluate in EVALUATORS.items():
+            mask = event_types == event_type.value
+            if mask.any():
+                points[mask] = evaluate(coeffs[mask], performances[mask])
+        points[np.isnan(coeffs[:, 0]) | ~(performances > 0)] = np.nan
+        return np.clip(np.round(points), 0, MAX_SCORE)
+
+    def score_results(
+        self,
+        genders: Gender | Sequence[Gender],
+        events: Sequence[Event],
+        performances: Sequence[str],
+    ) -> np.ndarray:
+        """
+        Parses then scores a batch of results written as on a results sheet (see
+        `parse_performance`). Results which cannot be parsed score NaN.
+        """
+        values = np.full(len(performances), np.nan)
+        for i, (event, performance) in enumerate(zip(events, performances)):
+            try:
+                values[i] = parse_performance(event, performance)
+            except ValueError:
+                pass
+        return self.score(genders, events, values)
+
+    def score_one(self, gender: Gender, event: Event, performance: float) -> int:
+        """
+        Scores a single result.
+
+        Raises:
+            ValueError: If the event has no scoring table for the gender or the
+                performance is not positive.
+        """
+        coeffs = self.iaaf.get_coeffs(gender, event)
+        if not performance > 0:
+            raise ValueError(f"Invalid performance {performance} ({event.value})")
+        points = EVALUATORS[get_event_type(event)](
+            np.array([coeffs]), np.array([performance], dtype=float)
+        )[0]
+        return int(np.clip(np.round(points), 0, MAX_SCORE))
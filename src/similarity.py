@@ -0,0 +1,287 @@
+from collections.abc import Mapping
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .pacing import RaggedSplits
+from .perfs_tracker import ROAD_EVENTS, MainPerf, PerfsRaces
+
+PROFILE_BINS = 10
+
+
+def pacing_profiles(splits: RaggedSplits, bins: int = PROFILE_BINS) -> np.ndarray:
+    """
+    Normalized pacing profile of each race: its course cut in `bins` sections of
+    equal distance, the time of each section over the mean time of a section.
+    A perfectly even race is all ones, a fading one increases.
+
+    Args:
+        splits (RaggedSplits): The base splits of the races.
+        bins (int, optional): The number of sections.
+
+    Returns:
+        np.ndarray: Array of shape (len(splits), bins), NaN rows for the races
+            with fewer than 2 base splits.
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        distance = np.where(splits.counts >= 2, splits.distance(), np.nan)
+        times = np.column_stack(
+            [np.zeros(len(splits))]
+            + [splits.time_at(distance * (k + 1) / bins) for k in range(bins)]
+        )
+        sections = np.diff(times, axis=1)
+        return sections * bins / times[:, -1:]
+
+
+class VectorIndex:
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        approximate: bool = False,
+        n_tables: int = 8,
+        n_projections: int = 4,
+        bucket_width: Optional[float] = None,
+        seed: int = 0,
+    ) -> None:
+        """
+        Nearest neighbours of vectors by euclidean distance.
+
+        The exact search computes the distances to all the vectors at once. The
+        approximate one (locality sensitive hashing) only ranks the vectors
+        sharing a bucket with the query in one of `n_tables` hash tables, each
+        hashing the vectors by `n_projections` random projections cut in
+        intervals of `bucket_width`.
+
+        Args:
+            vectors (np.ndarray): Array of shape (n, dims), without NaN.
+            approximate (bool, optional): Build the hash tables.
+            n_tables (int, optional): Number of hash tables: more find more of
+                the true neighbours.
+            n_projections (int, optional): Projections per table: more make
+                smaller buckets.
+            bucket_width (Optional[float]): Width of the intervals. Defaults to
+                the 10th percentile of the distances between sampled vectors.
+            seed (int, optional): Seed of the random projections.
+        """
+        self.vectors = np.asarray(vectors, dtype=np.float64)
+        if self.vectors.ndim != 2 or np.isnan(self.vectors).any():
+            raise ValueError("The vectors must be a 2D array without NaN")
+        self._norms = np.einsum("ij,ij->i", self.vectors, self.vectors)
+        self.approximate = approximate
+        self._tables: list[dict[bytes, list[int]]] = []
+        if not approximate or not len(self.vectors):
+            return
+
+        rng = np.random.default_rng(seed)
+        if bucket_width is None:
+            sample = self.vectors[rng.choice(len(self.vectors), 256)]
+            distances = np.sqrt(_squared_distances(sample, sample, None))
+            bucket_width = float(np.percentile(distances[distances > 0], 10))
+        dims = self.vectors.shape[1]
+        self._projections = rng.normal(size=(n_tables, dims, n_projections))
+        self._offsets = rng.uniform(0, bucket_width, size=(n_tables, n_projections))
+        self._bucket_width = bucket_width
+        for keys in self._hash(self.vectors):
+            table: dict[bytes, list[int]] = {}
+            for row, key in enumerate(keys):
+                table.setdefault(key, []).append(row)
+            self._tables.append(table)
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def _hash(self, vectors: np.ndarray) -> list[list[bytes]]:
+        """The bucket of each vector in each table."""
+        codes = np.floor(
+            (
+                np.einsum("nd,tdp->tnp", vectors, self._projections)
+                + self._offsets[:, None]
+            )
+            / self._bucket_width
+        ).astype(np.int32)
+        return [[code.tobytes() for code in table] for table in codes]
+
+    def query(
+        self, vector: np.ndarray, k: int = 5, exclude: Optional[int] = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        The k nearest vectors of vector.
+
+        Args:
+            vector (np.ndarray): The query, of shape (dims,).
+            k (int, optional): The number of neighbours.
+            exclude (Optional[int]): A row to leave out, e.g. the query itself.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: The rows of the neighbours, nearest
+                first, and their distances. Fewer than k with the approximate
+                search when the buckets hold fewer vectors.
+        """
+        vector = np.asarray(vector, dtype=np.float64)
+        if self._tables:
+            found: set[int] = set()
+            for table, (key,) in zip(self._tables, self._hash(vector[None])):
+                found.update(table.get(key, ()))
+            candidates = np.fromiter(found, dtype=np.int64, count=len(found))
+        else:
+            candidates = np.arange(len(self.vectors))
+        if exclude is not None:
+            candidates = candidates[candidates != exclude]
+        distances = _squared_distances(
+            vector[None], self.vectors[candidates], self._norms[candidates]
+        )[0]
+        k = min(k, len(candidates))
+        nearest = np.argpartition(distances, k - 1)[:k] if k else candidates[:0]
+        nearest = nearest[np.argsort(distances[nearest], kind="stable")]
+        return candidates[nearest], np.sqrt(distances[nearest])
+
+
+def _squared_distances(
+    queries: np.ndarray, vectors: np.ndarray, norms: Optional[np.ndarray]
+) -> np.ndarray:
+    """|q - v|^2 of every pair, as |q|^2 + |v|^2 - 2 q.v."""
+    if norms is None:
+        norms = np.einsum("ij,ij->i", vectors, vectors)
+    squared = (
+        np.einsum("ij,ij->i", queries, queries)[:, None]
+        + norms[None]
+        - 2 * queries @ vectors.T
+    )
+    return np.maximum(squared, 0)
+
+
+class RaceSimilarity:
+    def __init__(
+        self,
+        perfs: PerfsRaces,
+        approximate: bool = False,
+        bins: int = PROFILE_BINS,
+    ) -> None:
+        """
+        Index of the races with splits by pacing profile (see
+        `pacing_profiles`), to find the races paced like a given one.
+
+        Use `RaceSimilarity.of(perfs)` to share one index per version of the
+        performances.
+
+        Args:
+            perfs (PerfsRaces): The performances.
+            approximate (bool, optional): Use the approximate search of
+                `VectorIndex`, for large archives.
+            bins (int, optional): The number of sections of the profiles.
+        """
+        mains = [perf for perf in perfs if isinstance(perf, MainPerf)]
+        profiles = pacing_profiles(RaggedSplits.from_perfs(mains), bins)
+        profiled = ~np.isnan(profiles).any(axis=1)
+        self.races: list[MainPerf] = [
+            perf for perf, keep in zip(mains, profiled.tolist()) if keep
+        ]
+        self._rows = {id(perf): row for row, perf in enumerate(self.races)}
+        self.bins = bins
+        self.index = VectorIndex(
+            profiles[profiled].reshape(-1, bins), approximate=approximate
+        )
+
+    @classmethod
+    def of(cls, perfs: PerfsRaces) -> "RaceSimilarity":
+        """Returns the exact index of perfs, built once per version of perfs."""
+        return perfs.get_derived("race_similarity", lambda: cls(perfs))
+
+    def profile(self, perf: MainPerf) -> Optional[np.ndarray]:
+        """The pacing profile of a race, None if it has fewer than 2 base splits."""
+        row = self._rows.get(id(perf))
+        if row is not None:
+            return self.index.vectors[row]
+        profile = pacing_profiles(RaggedSplits.from_perfs([perf]), self.bins)[0]
+        return None if np.isnan(profile).any() else profile
+
+    def similar(self, perf: MainPerf, k: int = 5) -> list[tuple[MainPerf, float]]:
+        """
+        The k races whose pacing profile is the nearest to the one of perf.
+
+        Args:
+            perf (MainPerf): The race, indexed or not.
+            k (int, optional): The number of races.
+
+        Returns:
+            list[tuple[MainPerf, float]]: The races, nearest first, with the
+                distance of their profile. Empty if perf has no profile.
+        """
+        profile = self.profile(perf)
+        if profile is None:
+            return []
+        rows, distances = self.index.query(profile, k, exclude=self._rows.get(id(perf)))
+        return [
+            (self.races[row], distance)
+            for row, distance in zip(rows.tolist(), distances.tolist())
+        ]
+
+
+def pb_vector(perfs: PerfsRaces, distances: Sequence[float]) -> np.ndarray:
+    """
+    Log of the personal best pace (s/km) of perfs on each distance, NaN where
+    the distance was never run: two athletes at the same level on different
+    distances have vectors of about the same shape.
+    """
+    pbs = perfs.get_all_personal_best()
+    return np.array(
+        [
+            np.log(pbs[d].time.get_seconds() / d) if d in pbs else np.nan
+            for d in distances
+        ]
+    )
+
+
+class AthleteSimilarity:
+    def __init__(
+        self,
+        athletes: Mapping[str, PerfsRaces],
+        distances: Sequence[float] = tuple(ROAD_EVENTS),
+    ) -> None:
+        """
+        Index of athletes by personal bests (see `pb_vector`), to find the
+        athletes of the same level and profile as a given one.
+
+        Two athletes are compared on the distances both of them ran: the
+        distance is the root mean square difference of their log paces there.
+
+        Args:
+            athletes (Mapping[str, PerfsRaces]): The races of each athlete.
+            distances (Sequence[float], optional): The distances compared.
+                Defaults to the road events.
+        """
+        self.athletes = list(athletes)
+        self.distances = list(distances)
+        self.vectors = np.array(
+            [pb_vector(perfs, self.distances) for perfs in athletes.values()]
+        ).reshape(len(self.athletes), len(self.distances))
+
+    def similar(
+        self, athlete: str, k: int = 5, min_shared: int = 2
+    ) -> list[tuple[str, float]]:
+        """
+        The k athletes whose personal bests are the nearest to those of athlete.
+
+        Args:
+            athlete (str): The athlete.
+            k (int, optional): The number of athletes.
+            min_shared (int, optional): Minimum number of distances run by both
+                athletes for them to be compared.
+
+        Returns:
+            list[tuple[str, float]]: The athletes, nearest first, with their
+                distance.
+        """
+        query = self.vectors[self.athletes.index(athlete)]
+        differences = self.vectors - query
+        shared = (~np.isnan(differences)).sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            distances = np.sqrt(np.nansum(differences**2, axis=1) / shared)
+        distances[shared < min_shared] = np.nan
+        distances[self.athletes.index(athlete)] = np.nan
+        order = np.argsort(distances, kind="stable")
+        return [
+            (self.athletes[i], float(distances[i]))
+            for i in order[:k].tolist()
+            if not np.isnan(distances[i])
+        ]
@@ -1,75 +1,230 @@
 import datetime
 from pathlib import Path
+from typing import Any
 
 import pandas as pd
 import streamlit as st
 
-from .perfs_tracker import MainPerf, PerfsRaces
-from .time_an_pace import Time
+from .charts import METRICS, PERIODS, ProgressionCharts
+from .facets import FacetIndex
+from .perfs_tracker import DuplicateRaceError, MainPerf, PerfsRaces
+from .race_table import RaceTable
+from .replication import Replica
+from .store import PerfStore, VersionConflictError
+from .time_an_pace import Time, format_pace
 
+DATA_FILE = Path("data/perfs.json")
+FACET_LABELS = {
+    "location": "location",
+    "distance": "distance (km)",
+    "year": "year",
+    "event": "event",
+}
 
-@st.cache_data
-def load_data() -> PerfsRaces:
+
+@st.cache_resource
+def get_replica() -> Replica:
     """
-    Loads performance data from a JSON file.
+    Returns the node of the app, shared by all its sessions: its store is
+    replicated with the other nodes by changesets, and its log compacted with
+    `Replica.compact`.
     """
-    filepath = Path("data/perfs.json")
-    perfs = PerfsRaces()
-    if filepath.exists():
-        perfs.load_from_json(Path("data/perfs.json"))
+    return Replica(DATA_FILE.parent, PerfStore(DATA_FILE))
+
 
-    return perfs
+def get_store() -> PerfStore:
+    """Returns the store of the performances, shared by all the sessions."""
+    return get_replica().store
 
 
-def filter_location(df: pd.DataFrame) -> pd.DataFrame:
+def init_session() -> None:
     """
-    Filters the given DataFrame by a selected location using
-    a Streamlit sidebar selectbox.
+    Copies the performances of the shared store into a new session.
 
-    Args:
-        df (pd.DataFrame): The input DataFrame containing a "Location" column.
+    The list is copied but the races are those of the store, which the deltas of
+    `sync_session` refer to: the session must not change them in place, its
+    changes go through the store.
+    """
+    store = get_store()
+    with store.read() as shared_perfs:
+        perfs = PerfsRaces(
+            perfs=[perf for perf in shared_perfs if isinstance(perf, MainPerf)]
+        )
+        st.session_state["perfs_version"] = store.version
+    st.session_state["perfs"] = perfs
+    table = RaceTable(perfs)
+    st.session_state["table"] = table
+    st.session_state["df"] = table.df
+    st.session_state["facets"] = table.facets
 
-    Returns:
-        pd.DataFrame: The filtered DataFrame based on the selected location.
-            If "All" is selected, the original DataFrame is returned.
+
+def sync_session() -> None:
+    """
+    Applies to the session the changes made by all the sessions since its last
+    sync. Each change updates the races, then the rows of the table with their
+    pacing columns and the facet index (see `RaceTable.apply`).
+    """
+    version, deltas = get_store().changes_since(st.session_state["perfs_version"])
+    if not deltas:
+        return
+    table: RaceTable = st.session_state["table"]
+    for delta in deltas:
+        table.apply(delta, record=False)
+    st.session_state["df"] = table.df
+    st.session_state["perfs_version"] = version
+
+
+def show_save_status() -> None:
+    """
+    Displays in the sidebar whether the last changes are safely written to disk.
+    """
+    status = get_store().writer.status
+    if status.last_error is not None:
+        st.sidebar.error(f"⚠️ Saving failed: {status.last_error}")
+    elif status.pending:
+        st.sidebar.caption(f"💾 Saving {status.pending} change(s)...")
+    elif status.last_saved is not None:
+        st.sidebar.caption(f"💾 Saved at {status.last_saved:%H:%M:%S}")
+
+
+def edit_races() -> None:
     """
-    locations = df["Location"].unique()
-    locations.sort()
-    selected_location = st.sidebar.selectbox(
-        "Filter by location :", ["All"] + list(locations)
+    Displays the controls to delete a race and to undo or redo the last changes.
+    """
+    store = get_store()
+    perfs: PerfsRaces = st.session_state["perfs"]
+    race = st.selectbox(
+        "Race",
+        [perf for perf in perfs if isinstance(perf, MainPerf)],
+        format_func=lambda perf: (
+            f"{perf.date.date()} - {perf.name_event} ({perf.distance} km)"
+        ),
+        index=None,
     )
-    if selected_location != "All":
-        df = df[df["Location"] == selected_location]
+    version = st.session_state["perfs_version"]
+    col1, col2, col3 = st.columns(3)
+    try:
+        if col1.button("🗑️ Delete", disabled=race is None) and race is not None:
+            store.delete_race(
+                race.date, race.name_event, race.distance, expected_version=version
+            )
+        elif col2.button("↩️ Undo", disabled=not store.can_undo):
+            store.undo(expected_version=version)
+        elif col3.button("↪️ Redo", disabled=not store.can_redo):
+            store.redo(expected_version=version)
+        else:
+            return
+    except VersionConflictError:
+        sync_session()
+        st.warning(
+            "⚠️ The races were changed by someone else meanwhile. "
+            "The table is refreshed, please check it and try again."
+        )
+        return
+    sync_session()
+    st.rerun()
 
-    return df
 
+def format_table(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Formats the typed table of `PerfsRaces.table()` for display: the dates as
+    days, the times as "1h25min0s" and the paces as "04'03".
 
-def filter_distance(df: pd.DataFrame) -> pd.DataFrame:
+    Args:
+        df (pd.DataFrame): The rows to display.
+
+    Returns:
+        pd.DataFrame: A copy of df with the columns "Time" and "Pace (min/km)"
+            as text instead of "Time (s)" and "Pace (s/km)".
+    """
+    return df.assign(
+        **{
+            "Date": df["Date"].dt.date,
+            "Time (s)": [
+                str(Time.from_total_seconds(seconds))
+                for seconds in df["Time (s)"].tolist()
+            ],
+            "Pace (s/km)": [format_pace(pace) for pace in df["Pace (s/km)"].tolist()],
+        }
+    ).rename(columns={"Time (s)": "Time", "Pace (s/km)": "Pace (min/km)"})
+
+
+def filter_races(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Filters the given DataFrame based on the selected distance from a Streamlit sidebar.
+    Filters the races by location, distance, year and event with Streamlit
+    sidebar selectboxes, each option showing its number of races given the other
+    filters. The rows are selected with the facet index of the session table.
 
     Args:
-        df (pd.DataFrame): The input DataFrame containing a column "Distance (km)".
+        df (pd.DataFrame): The table of the session, as built by `init_session`.
 
     Returns:
-        pd.DataFrame: The filtered DataFrame based on the selected distance.
+        pd.DataFrame: The selected rows. If "All" is selected everywhere, the
+            original DataFrame is returned.
     """
-    distances = df["Distance (km)"].unique()
-    distances.sort()
-    selected_distance = st.sidebar.selectbox(
-        "Filter by distance (km) :", ["All"] + list(distances)
-    )
-    if selected_distance != "All":
-        df = df[df["Distance (km)"] == selected_distance]
+    facets: FacetIndex = st.session_state["facets"]
+    # the counts of each facet depend on the selection of all the others
+    selection: dict[str, Any] = {}
+    for facet in FACET_LABELS:
+        selected = st.session_state.get(f"facet_{facet}", "All")
+        # a value may have disappeared with the races changed by another session
+        known = selected in facets.bitsets[facet]
+        selection[facet] = selected if known else None
+    for facet, label in FACET_LABELS.items():
+        counts = facets.counts(facet, **selection)
 
-    return df
+        def format_option(option: Any, counts: dict[Any, int] = counts) -> str:
+            return "All" if option == "All" else f"{option} ({counts[option]})"
+
+        st.sidebar.selectbox(
+            f"Filter by {label} :",
+            ["All"] + facets.options(facet),
+            format_func=format_option,
+            key=f"facet_{facet}",
+        )
+    if all(selected is None for selected in selection.values()):
+        return df
+    return df.iloc[facets.rows(**selection)]
+
+
+def show_progression_chart() -> None:
+    """
+    Displays the progression chart of a distance: time or IAAF score (when the
+    races are scored) of each race, or best of each week, month or season, over a
+    date range.
+    """
+    perfs: PerfsRaces = st.session_state["perfs"]
+    charts = ProgressionCharts.of(perfs)
+    history = charts.history
+    if not len(history):
+        st.info("No race to chart yet.")
+        return
+    col1, col2, col3 = st.columns(3)
+    distance = col1.selectbox(
+        "Distance (km)", sorted(set(history.distance.tolist())), key="chart_distance"
+    )
+    metric = col2.radio(
+        "Metric",
+        charts.metrics(),
+        format_func=lambda metric: METRICS[metric][0],
+        key="chart_metric",
+    )
+    period = col3.radio("Best of each", PERIODS, key="chart_period")
+    first, last = history.date[0].item(), history.date[-1].item()
+    start, end = (
+        st.slider("Dates", first, last, (first, last), key="chart_dates")
+        if first < last
+        else (first, last)
+    )
+    series = charts.series(distance, metric, period, start, end)
+    st.line_chart(series, x="Date", y=METRICS[metric][0])
 
 
 def add_new_race():
     """
     Displays a form to add a new race event with details such as name, location, time,
-    and distance. On form submission, the new race is added to the session state
-    DataFrame and saved to a JSON file.
+    and distance. On form submission, the new race is added to the shared store, which
+    saves it to the JSON file, and the session is synced with the store.
     """
     st.subheader("Enter the race detail:")
     name = st.text_input("Race name", placeholder="Ex: Marathon de Paris")
@@ -110,7 +265,7 @@ def add_new_race():
         new_time = Time(hours=hours, minutes=minutes, seconds=seconds)
         new_perf = MainPerf(
             name_event=name,
-            date=date,
+            date=datetime.datetime.combine(date, datetime.time()),
             distance=distance,
             time=new_time,
             location=location,
@@ -119,12 +274,21 @@ def add_new_race():
             url_results=url_results,
             url_strava=url_strava,
         )
-        perfs: PerfsRaces = st.session_state["perfs"]
-        perfs.add_perf(new_perf)
-        st.session_state["df"] = perfs.table()
-
-        if perfs:
-            perfs.save_to_json(Path("data/perfs.json"))
+        try:
+            get_store().add_perf(
+                new_perf, expected_version=st.session_state["perfs_version"]
+            )
+        except VersionConflictError:
+            sync_session()
+            st.warning(
+                "⚠️ Races were added by someone else meanwhile. "
+                "The table is refreshed, please check it and submit again."
+            )
+            return
+        except DuplicateRaceError:
+            st.warning("⚠️ This race is already recorded.")
+            return
+        sync_session()
 
         st.success("✅ Race added successfully!")
 
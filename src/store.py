@@ -0,0 +1,326 @@
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Iterator, Optional, TypeVar
+
+from .perfs_tracker import Delta, MainPerf, PerfsRaces
+from .persistence import BackgroundWriter
+
+Listener = Callable[[int, Delta], None]
+T = TypeVar("T")
+
+
+class VersionConflictError(ValueError):
+    """Raised when a write is based on an outdated version of the store."""
+
+
+class RWLock:
+    """
+    Readers-writer lock: any number of readers, or a single writer.
+
+    Waiting writers have priority over new readers, so a steady flow of readers
+    cannot starve them.
+    """
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        with self._condition:
+            self._condition.wait_for(
+                lambda: not self._writer and not self._waiting_writers
+            )
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        with self._condition:
+            self._waiting_writers += 1
+            self._condition.wait_for(lambda: not self._writer and not self._readers)
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = False
+                self._condition.notify_all()
+
+
+class PerfStore:
+    def __init__(
+        self, filepath: Path, writer: Optional[BackgroundWriter] = None
+    ) -> None:
+        """
+        Process-wide store of the performances, shared by all the app sessions.
+
+        Every change gets a new version number. Sessions remember the version
+        they have seen and fetch only the newer changes with `changes_since`.
+
+        Args:
+            filepath (Path): The JSON file holding the performances. It is loaded
+                if it exists, from its warm start cache when up to date (see
+                `PerfsRaces.load_cached`).
+            writer (Optional[BackgroundWriter]): Writer used to persist each
+                change. Defaults to a new writer on filepath.
+        """
+        self.filepath = filepath
+        self.writer = writer if writer is not None else BackgroundWriter(filepath)
+        self.perfs = (
+            PerfsRaces.load_cached(filepath) if filepath.exists() else PerfsRaces()
+        )
+        self._lock = RWLock()
+        self._log: list[Delta] = []
+        # len(self._log), updated by the writer once its change is logged, so
+        # that the version is read without the lock, e.g. under `read()`
+        self._version = 0
+        self._listeners: list[Listener] = []
+
+    @property
+    def version(self) -> int:
+        """
+        The number of changes made to the store. It is read without taking the
+        lock (which is not reentrant), so it can be read under `read()`.
+        """
+        return self._version
+
+    @property
+    def can_undo(self) -> bool:
+        with self._lock.read():
+            return self.perfs.can_undo
+
+    @property
+    def can_redo(self) -> bool:
+        with self._lock.read():
+            return self.perfs.can_redo
+
+    @contextmanager
+    def read(self) -> Iterator[PerfsRaces]:
+        """Gives access to the shared performances under the read lock."""
+        with self._lock.read():
+            yield self.perfs
+
+    def changes_since(self, version: int) -> tuple[int, list[Delta]]:
+        """
+        Retrieves the changes made after a given version.
+
+        Args:
+            version (int): The last version seen by the caller.
+
+        Returns:
+            tuple[int, list[Delta]]: The current version and the changes made
+                since `version`, in order, to apply with `PerfsRaces.apply`.
+        """
+        with self._lock.read():
+            if version > len(self._log):
+                raise ValueError(f"Unknown version {version} > {len(self._log)}")
+            return len(self._log), self._log[version:]
+
+    def _check_version(self, expected_version: Optional[int]) -> None:
+        if expected_version is not None and expected_version != len(self._log):
+            raise VersionConflictError(
+                f"Store is at version {len(self._log)}, "
+                f"write was based on version {expected_version}"
+            )
+
+    def _log_changes(self, deltas: list[Delta]) -> list[Listener]:
+        """
+        Logs changes made under the write lock and schedules their persistence.
+
+        Returns:
+            list[Listener]: The listeners to notify, once the lock is released.
+        """
+        self._log.extend(deltas)
+        self._version = len(self._log)
+        if deltas:
+            # serialized under the lock: the races may be changed in place (e.g.
+            # their IAAF scores), so a copy of the list is not a snapshot
+            self.writer.submit(self.perfs.to_records())
+        return list(self._listeners)
+
+    def _notify(
+        self, listeners: list[Listener], version: int, deltas: list[Delta]
+    ) -> None:
+        """Calls the listeners with each change, up to the given version."""
+        for i, delta in enumerate(deltas, version - len(deltas) + 1):
+            for listener in listeners:
+                listener(i, delta)
+
+    def _write(
+        self, change: Callable[[], Delta], expected_version: Optional[int]
+    ) -> int:
+        """
+        Makes a change under the write lock, logs it, schedules its persistence
+        and notifies the listeners.
+
+        Args:
+            change (Callable[[], Delta]): Function changing `self.perfs` and
+                returning the change made.
+            expected_version (Optional[int]): The version the caller's data is
+                based on. If given and the store has changed since, nothing is
+                written and VersionConflictError is raised.
+
+        Returns:
+            int: The new version of the store.
+        """
+        with self._lock.write():
+            self._check_version(expected_version)
+            delta = change()
+            listeners = self._log_changes([delta])
+            version = self._version
+
+        self._notify(listeners, version, [delta])
+        return version
+
+    def batch(
+        self,
+        change: Callable[[PerfsRaces], T],
+        expected_version: Optional[int] = None,
+    ) -> tuple[int, T]:
+        """
+        Makes many changes at once, e.g. an import (see `ImportResult.add_to`).
+        Each race added, replaced or deleted is logged and notified as a change
+        of its own, but all of them are persisted with a single snapshot.
+
+        Args:
+            change (Callable[[PerfsRaces], T]): Function adding, replacing or
+                deleting races of the performances it is given, with the
+                methods recording their history (e.g. `PerfsRaces.add_perfs`).
+            expected_version (Optional[int]): See `_write`.
+
+        Returns:
+            tuple[int, T]: The new version of the store and the result of change.
+        """
+        deltas: list[Delta] = []
+        listeners: list[Listener] = []
+        version = 0
+        try:
+            with self._lock.write():
+                self._check_version(expected_version)
+                start = len(self.perfs.history)
+                try:
+                    result = change(self.perfs)
+                finally:
+                    # the changes made before an error are logged as well
+                    deltas = self.perfs.history[start:]
+                    listeners = self._log_changes(deltas)
+                    version = self._version
+        finally:
+            self._notify(listeners, version, deltas)
+        return version, result
+
+    def _apply(self, delta: Delta) -> Delta:
+        self.perfs.apply(delta)
+        return delta
+
+    def _find(self, date: date | datetime, name_event: str, distance: float) -> int:
+        race = self.perfs.get_race(date, name_event, distance)
+        if race is None:
+            raise ValueError(f"No race {name_event} on {date} ({distance} km)")
+        return self.perfs.index[self.perfs.key_of(race)]
+
+    def add_perf(self, perf: MainPerf, expected_version: Optional[int] = None) -> int:
+        """
+        Adds a performance to the store and schedules its persistence.
+
+        Args:
+            perf (MainPerf): The performance to add.
+            expected_version (Optional[int]): See `_write`.
+
+        Returns:
+            int: The new version of the store.
+        """
+        return self._write(
+            lambda: self._apply(Delta("add", len(self.perfs), new=perf)),
+            expected_version,
+        )
+
+    def update_race(
+        self,
+        date: date | datetime,
+        name_event: str,
+        distance: float,
+        perf: MainPerf,
+        expected_version: Optional[int] = None,
+    ) -> int:
+        """
+        Replaces a race, see `PerfsRaces.update_race`.
+
+        Returns:
+            int: The new version of the store.
+        """
+
+        def change() -> Delta:
+            i = self._find(date, name_event, distance)
+            return self._apply(Delta("update", i, old=self.perfs[i], new=perf))
+
+        return self._write(change, expected_version)
+
+    def delete_race(
+        self,
+        date: date | datetime,
+        name_event: str,
+        distance: float,
+        expected_version: Optional[int] = None,
+    ) -> int:
+        """
+        Deletes a race, see `PerfsRaces.delete_race`.
+
+        Returns:
+            int: The new version of the store.
+        """
+
+        def change() -> Delta:
+            i = self._find(date, name_event, distance)
+            return self._apply(Delta("delete", i, old=self.perfs[i]))
+
+        return self._write(change, expected_version)
+
+    def undo(self, expected_version: Optional[int] = None) -> int:
+        """
+        Undoes the last change made to the store, whichever session made it.
+
+        Returns:
+            int: The new version of the store.
+        """
+        return self._write(self.perfs.undo, expected_version)
+
+    def redo(self, expected_version: Optional[int] = None) -> int:
+        """
+        Applies again the last undone change.
+
+        Returns:
+            int: The new version of the store.
+        """
+        return self._write(self.perfs.redo, expected_version)
+
+    def subscribe(self, listener: Listener) -> Callable[[], None]:
+        """
+        Registers a function called with (version, delta) after each change.
+
+        Args:
+            listener (Listener): The function to call.
+
+        Returns:
+            Callable[[], None]: A function removing the listener.
+        """
+        with self._lock.write():
+            self._listeners.append(listener)
+
+        def unsubscribe() -> None:
+            with self._lock.write():
+                self._listeners.remove(listener)
+
+        return unsubscribe
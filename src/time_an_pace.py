@@ -1,6 +1,34 @@
+import re
+
 from pydantic import BaseModel, Field, model_validator
 from typing_extensions import Self
 
+# "1:25:00", "42:10"
+COLON_TIME = r"^\s*(?:(?P<hours>\d+):)?(?P<minutes>\d{1,2}):(?P<seconds>\d{1,2})\s*$"
+# "1h25min0s", as written by Time.__str__
+UNIT_TIME = (
+    r"^\s*(?:(?P<hours>\d+)\s*h)?\s*(?:(?P<minutes>\d+)\s*min)?"
+    r"\s*(?:(?P<seconds>\d+)\s*s)?\s*$"
+)
+
+
+def split_time_str(time_str: str) -> tuple[int, int, int]:
+    """
+    Splits a time written "<hour>h<min>min<sec>s", as by `Time.__str__`, into
+    (hours, minutes, seconds), without checking them.
+    """
+    hours, minutes, seconds = 0, 0, 0
+    if "h" in time_str:
+        hours_str, time_str = time_str.split("h")
+        hours = int(hours_str)
+    if "min" in time_str:
+        minutes_str, time_str = time_str.split("min")
+        minutes = int(minutes_str)
+    if "s" in time_str:
+        seconds_str, _ = time_str.split("s")
+        seconds = int(seconds_str)
+    return hours, minutes, seconds
+
 
 class Time(BaseModel):
     hours: int = Field(default=0, ge=0)
@@ -41,16 +69,7 @@ class Time(BaseModel):
         Returns:
             Time: The Time object calculated from the string.
         """
-        hours, minutes, seconds = 0, 0, 0
-        if "h" in time_str:
-            hours_str, time_str = time_str.split("h")
-            hours = int(hours_str)
-        if "min" in time_str:
-            minutes_str, time_str = time_str.split("min")
-            minutes = int(minutes_str)
-        if "s" in time_str:
-            seconds_str, _ = time_str.split("s")
-            seconds = int(seconds_str)
+        hours, minutes, seconds = split_time_str(time_str)
         return Time(hours=hours, minutes=minutes, seconds=seconds)
 
     def __str__(self) -> str:
@@ -130,3 +149,37 @@ class Pace(BaseModel):
 
     def __str__(self) -> str:
         return f"{self.minutes:02d}'{self.seconds:02.0f}"
+
+
+def format_pace(seconds_per_km: float) -> str:
+    """
+    Format a pace given in seconds per kilometer as Pace does, e.g. "04'03".
+
+    Args:
+        seconds_per_km (float): The pace in seconds per kilometer.
+
+    Returns:
+        str: The formatted pace.
+    """
+    minutes, seconds = divmod(int(seconds_per_km), 60)
+    return f"{minutes:02d}'{seconds:02d}"
+
+
+def parse_time(time_str: str) -> Time:
+    """
+    Parse a time written as "h:mm:ss", "mm:ss" or "<hour>h<min>min<sec>s".
+
+    Args:
+        time_str (str): The time to parse.
+
+    Returns:
+        Time: The parsed time.
+
+    Raises:
+        ValueError: If the string is not a valid time.
+    """
+    match = re.match(COLON_TIME, time_str) or re.match(UNIT_TIME, time_str)
+    if match is None or not any(match.groups()):
+        raise ValueError(f"Invalid time {time_str!r}")
+    parts = {k: int(v) for k, v in match.groupdict().items() if v is not None}
+    return Time(**parts)
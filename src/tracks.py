@@ -0,0 +1,236 @@
+import math
+import multiprocessing
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from functools import partial
+from itertools import count
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Sequence
+
+import numpy as np
+
+from .perfs_tracker import MainPerf
+from .time_an_pace import Time
+
+EARTH_RADIUS_KM = 6371.0088
+
+# (latitude, longitude, time)
+TrackPoint = tuple[float, float, datetime]
+
+
+def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in km between two points given in degrees."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(dphi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _parse_trackpoint(elem: ET.Element) -> Optional[TrackPoint]:
+    """Reads a GPX <trkpt> or a TCX <Trackpoint>, None if it has no position."""
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    time: Optional[datetime] = None
+    if _local_name(elem.tag) == "trkpt":
+        lat, lon = float(elem.get("lat", "nan")), float(elem.get("lon", "nan"))
+    for child in elem.iter():
+        name = _local_name(child.tag)
+        if name in ("time", "Time") and child.text:
+            time = datetime.fromisoformat(child.text.strip())
+        elif name == "LatitudeDegrees" and child.text:
+            lat = float(child.text)
+        elif name == "LongitudeDegrees" and child.text:
+            lon = float(child.text)
+    if lat is None or lon is None or time is None or math.isnan(lat + lon):
+        return None
+    return lat, lon, time
+
+
+def iter_trackpoints(path: Path) -> Iterator[TrackPoint]:
+    """
+    Streams the trackpoints of a GPX or TCX file with an iterative parser.
+
+    Each point is dropped from the tree once read, so memory does not grow with
+    the number of points.
+
+    Args:
+        path (Path): The GPX or TCX file.
+
+    Yields:
+        TrackPoint: (latitude, longitude, time) of each point with a position.
+    """
+    parents: list[ET.Element] = []
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            parents.append(elem)
+            continue
+        parents.pop()
+        if _local_name(elem.tag) not in ("trkpt", "Trackpoint"):
+            continue
+        point = _parse_trackpoint(elem)
+        if parents:
+            parents[-1].clear()
+        if point is not None:
+            yield point
+
+
+def iter_splits(
+    points: Iterable[TrackPoint], boundaries: Iterable[float]
+) -> Iterator[tuple[float, float, float]]:
+    """
+    Cuts a track into splits at the given distances, in a single pass.
+
+    The time at a boundary is interpolated between the two points around it. The
+    last split ends at the last point of the track.
+
+    Args:
+        points (Iterable[TrackPoint]): The trackpoints, in order.
+        boundaries (Iterable[float]): Increasing distances in km, can be infinite.
+
+    Yields:
+        tuple[float, float, float]: (begin, end, seconds) of each split.
+    """
+    bounds = iter(boundaries)
+    boundary = next(bounds, None)
+    previous: Optional[TrackPoint] = None
+    start = previous_elapsed = elapsed = 0.0
+    distance = split_begin = split_begin_elapsed = 0.0
+    for point in points:
+        if previous is None:
+            previous, start = point, point[2].timestamp()
+            continue
+        step = haversine(previous[0], previous[1], point[0], point[1])
+        elapsed = point[2].timestamp() - start
+        while boundary is not None and distance + step >= boundary:
+            fraction = (boundary - distance) / step if step else 1.0
+            at = previous_elapsed + fraction * (elapsed - previous_elapsed)
+            yield split_begin, boundary, at - split_begin_elapsed
+            split_begin, split_begin_elapsed = boundary, at
+            boundary = next(bounds, None)
+        distance += step
+        previous, previous_elapsed = point, elapsed
+    if distance > split_begin:
+        yield split_begin, distance, elapsed - split_begin_elapsed
+
+
+@dataclass(frozen=True)
+class TrackSplits:
+    path: Path
+    begin: np.ndarray  # km
+    end: np.ndarray  # km
+    seconds: np.ndarray  # float64
+    split_distance: Optional[float] = None
+
+    @property
+    def distance(self) -> float:
+        return float(self.end[-1]) if len(self.end) else 0.0
+
+    @property
+    def total_seconds(self) -> float:
+        return float(self.seconds.sum())
+
+    def rounded_seconds(self) -> np.ndarray:
+        """
+        Split times in whole seconds. The cumulative times are rounded, so the
+        rounding errors do not add up along the race.
+        """
+        cumulated = np.round(np.cumsum(self.seconds)).astype(np.int64)
+        return np.diff(cumulated, prepend=0)
+
+    def apply_to(self, perf: MainPerf) -> None:
+        """
+        Stores the splits in a MainPerf. The splits after the race distance are
+        dropped and the last one is cut at the race distance.
+
+        With equal splits, only the full ones are given to `add_sub_perf`, which
+        also derives the longer windows. Otherwise they are stored as they are
+        with `add_splits`.
+
+        Args:
+            perf (MainPerf): The race run on this track.
+        """
+        keep = self.begin < perf.distance
+        ends = np.minimum(self.end[keep], perf.distance)
+        seconds = self.rounded_seconds()[keep]
+        if self.split_distance is not None:
+            full = np.isclose(ends - self.begin[keep], self.split_distance)
+            perf.add_sub_perf(
+                [Time.from_total_seconds(int(s)) for s in seconds[full]],
+                self.split_distance,
+            )
+        else:
+            perf.add_splits(ends.tolist(), seconds.tolist())
+
+
+def read_track(
+    path: Path,
+    split_distance: Optional[float] = 1.0,
+    boundaries: Optional[Sequence[float]] = None,
+) -> TrackSplits:
+    """
+    Reads a GPX or TCX file and computes its splits in a streaming pass.
+
+    Args:
+        path (Path): The GPX or TCX file.
+        split_distance (Optional[float]): Length of the splits in km. Defaults to
+            1 km. Ignored if boundaries are given.
+        boundaries (Optional[Sequence[float]]): Increasing distances in km at
+            which to cut the splits.
+
+    Returns:
+        TrackSplits: The splits of the track.
+    """
+    if boundaries is None:
+        if split_distance is None or split_distance <= 0:
+            raise ValueError("A positive split_distance or boundaries are required")
+        step = split_distance
+        bounds: Iterable[float] = (k * step for k in count(1))
+    else:
+        split_distance = None
+        bounds = boundaries
+
+    splits = np.array(list(iter_splits(iter_trackpoints(path), bounds)), dtype=float)
+    splits = splits.reshape(-1, 3)
+    return TrackSplits(
+        path=path,
+        begin=splits[:, 0],
+        end=splits[:, 1],
+        seconds=splits[:, 2],
+        split_distance=split_distance,
+    )
+
+
+def read_tracks(
+    paths: Sequence[Path],
+    split_distance: Optional[float] = 1.0,
+    boundaries: Optional[Sequence[float]] = None,
+    max_workers: Optional[int] = None,
+) -> list[TrackSplits]:
+    """
+    Reads many GPX or TCX files in parallel processes.
+
+    Args:
+        paths (Sequence[Path]): The files.
+        split_distance (Optional[float]): See `read_track`.
+        boundaries (Optional[Sequence[float]]): See `read_track`.
+        max_workers (Optional[int]): Number of processes. Defaults to the number
+            of CPUs.
+
+    Returns:
+        list[TrackSplits]: The splits of each file, in the order of paths.
+    """
+    read = partial(read_track, split_distance=split_distance, boundaries=boundaries)
+    # spawn: forking a process running threads (e.g. the writer) is unsafe
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+        return list(executor.map(read, paths))
@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+from src.perfs_tracker import MainPerf
+from src.time_an_pace import Time
+
+
+def make_race(
+    seconds: int,
+    distance: float = 10,
+    date: datetime = datetime(2024, 5, 1),
+    name: Optional[str] = None,
+    location: str = "Paris",
+    splits: Sequence[int] = (),
+    **fields: Any,
+) -> MainPerf:
+    """
+    A race of the tests, named after its time unless a name is given, with the
+    given seconds of equal splits and any other field of MainPerf.
+    """
+    perf = MainPerf(
+        time=Time.from_total_seconds(seconds),
+        distance=distance,
+        date=date,
+        name_event=name if name is not None else f"Race in {seconds}s",
+        location=location,
+        **fields,
+    )
+    if splits:
+        step = distance / len(splits)
+        perf.add_splits([step * (i + 1) for i in range(len(splits))], list(splits))
+    return perf
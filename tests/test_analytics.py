@@ -0,0 +1,86 @@
+from datetime import datetime
+
+import numpy as np
+
+from src.analytics import RaceHistory
+from src.iaaf import Gender
+from src.perfs_tracker import MainPerf, PerfsRaces
+from src.time_an_pace import Time
+
+# (date, distance, time), not sorted by date on purpose
+races: list[tuple[str, float, Time]] = [
+    ("2023-06-01", 10, Time(minutes=42, seconds=0)),
+    ("2022-03-01", 10, Time(minutes=45, seconds=0)),
+    ("2022-10-01", 10, Time(minutes=43, seconds=0)),
+    ("2023-09-01", 21.1, Time(hours=1, minutes=35, seconds=0)),
+    ("2024-12-01", 10, Time(minutes=44, seconds=0)),
+    ("2023-11-01", 10, Time(minutes=41, seconds=0)),
+    ("2022-05-01", 6, Time(minutes=30, seconds=0)),
+]
+
+
+def naive_rolling_best(history: RaceHistory, window_days: int) -> np.ndarray:
+    window = np.timedelta64(window_days, "D")
+    best = np.full(len(history), np.nan)
+    for i in range(len(history)):
+        in_window = (history.date > history.date[i] - window) & (
+            np.arange(len(history)) <= i
+        )
+        scores = history.iaaf_score[in_window]
+        scores = scores[~np.isnan(scores)]
+        if len(scores):
+            best[i] = scores.max()
+    return best
+
+
+class TestRaceHistory:
+    def setup_method(self):
+        self.perfs = PerfsRaces(gender=Gender("male"))
+        for i, (date, distance, time) in enumerate(races):
+            self.perfs.add_perf(
+                MainPerf(
+                    time=time,
+                    distance=distance,
+                    date=date,
+                    name_event=f"race {i}",
+                    location="Paris",
+                )
+            )
+        self.history = RaceHistory.of(self.perfs)
+
+    def test_sorted_by_date(self):
+        assert (np.diff(self.history.date) >= np.timedelta64(0, "D")).all()
+        assert self.history.perfs[0].name_event == "race 1"
+
+    def test_rolling_best_score(self):
+        for window_days in (30, 200, 365, 1000):
+            np.testing.assert_array_equal(
+                self.history.rolling_best_score(window_days),
+                naive_rolling_best(self.history, window_days),
+            )
+
+    def test_season_bests(self):
+        bests = self.history.season_bests()
+        best_10k = bests[bests["Distance (km)"] == 10].set_index("Season")["Seconds"]
+        assert best_10k.to_dict() == {2022: 43 * 60, 2023: 41 * 60, 2024: 44 * 60}
+        assert len(bests) == 5
+
+    def test_progression(self):
+        progression = self.history.progression(10)
+        assert progression["Seconds"].tolist() == [45 * 60, 43 * 60, 42 * 60, 41 * 60]
+        assert len(self.history.progression(5)) == 0
+
+    def test_cached_per_version(self):
+        assert RaceHistory.of(self.perfs) is self.history
+        self.perfs.add_perf(
+            MainPerf(
+                time=Time(minutes=20, seconds=0),
+                distance=5,
+                date=datetime(2025, 1, 1),
+                name_event="5km",
+                location="Paris",
+            )
+        )
+        history = RaceHistory.of(self.perfs)
+        assert history is not self.history
+        assert len(history) == len(self.history) + 1
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import threading
+from pathlib import Path
+
+from conftest import make_race
+
+from src.api import PerfsApi, load_test
+from src.iaaf import Gender
+from src.leaderboard import ClubRankings
+from src.store import PerfStore
+from src.time_an_pace import Time
+
+
+class TestPerfsApi:
+    def setup_method(self):
+        self.store: PerfStore | None = None
+
+    def teardown_method(self):
+        if self.store is not None:
+            self.store.writer.close()
+
+    def make_api(self, tmp_path: Path) -> PerfsApi:
+        self.store = PerfStore(tmp_path / "perfs.json")
+        self.store.perfs.athlete = "alice"
+        self.store.perfs.gender = Gender("female")
+        self.store.add_perf(make_race(2500))
+        self.store.add_perf(make_race(1200, 5))
+        rankings = ClubRankings()
+        rankings.add_athlete(self.store.perfs)
+        return PerfsApi(self.store, rankings)
+
+    def test_races_and_pbs(self, tmp_path: Path):
+        api = self.make_api(tmp_path)
+        races = json.loads(api.handle("GET", "/races?distance=5").body)["races"]
+        assert [race["time"] for race in races] == [str(Time.from_total_seconds(1200))]
+        pbs = json.loads(api.handle("GET", "/pbs").body)["pbs"]
+        assert {pb["distance"]: pb["seconds"] for pb in pbs} == {5: 1200, 10: 2500}
+        assert api.handle("GET", "/races?distance=ten").status == 400
+        assert api.handle("GET", "/nowhere").status == 404
+        assert api.handle("DELETE", "/races").status == 405
+
+    def test_etag_per_version(self, tmp_path: Path):
+        api = self.make_api(tmp_path)
+        response = api.handle("GET", "/pbs")
+        assert api.handle("GET", "/pbs") is response
+        assert api.cached("/pbs")
+        revalidated = api.handle("GET", "/pbs", {"if-none-match": response.etag})
+        assert revalidated.status == 304 and not revalidated.body
+
+        assert self.store is not None
+        self.store.add_perf(make_race(2400))
+        assert not api.cached("/pbs")
+        changed = api.handle("GET", "/pbs", {"if-none-match": response.etag})
+        assert changed.status == 200 and changed.etag != response.etag
+
+    def test_cache_from_threads(self, tmp_path: Path):
+        api = self.make_api(tmp_path)
+        targets = [f"/races?distance={d}" for d in range(300)] + ["/pbs"]
+
+        def get_all() -> None:
+            for target in targets:
+                assert api.handle("GET", target).status == 200
+
+        threads = [threading.Thread(target=get_all) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert api.cached("/pbs")
+        assert len(api._cache) == 256
+
+        # a cache hit does not wait for a writer queued on the store's lock
+        assert self.store is not None
+        with self.store.read():
+            writer = threading.Thread(
+                target=self.store.add_perf, args=(make_race(2400),)
+            )
+            writer.start()
+            while not self.store._lock._waiting_writers:
+                pass
+            assert api.cached("/pbs")
+        writer.join(timeout=5)
+        assert not api.cached("/pbs")
+
+    def test_leaderboards(self, tmp_path: Path):
+        api = self.make_api(tmp_path)
+        entries = json.loads(
+            api.handle("GET", "/leaderboards?gender=female&distance=10").body
+        )["entries"]
+        assert [(e["rank"], e["athlete"], e["seconds"]) for e in entries] == [
+            (1, "alice", 2500)
+        ]
+        assert api.handle("GET", "/leaderboards?gender=robot").status == 400
+
+    def test_leaderboards_wait_for_writes(self, tmp_path: Path):
+        api = self.make_api(tmp_path)
+        assert self.store is not None
+        statuses: list[int] = []
+        with self.store._lock.write():
+            reader = threading.Thread(
+                target=lambda: statuses.append(
+                    api.handle("GET", "/leaderboards?gender=female").status
+                )
+            )
+            reader.start()
+            # the boards are not read while a write may be changing them
+            reader.join(timeout=0.2)
+            assert reader.is_alive()
+        reader.join(timeout=5)
+        assert statuses == [200]
+
+    def test_scoring(self, tmp_path: Path):
+        api = self.make_api(tmp_path)
+        single = api.handle("GET", "/score?gender=male&event=10km&performance=30:00")
+        score = json.loads(single.body)["score"]
+        assert 0 < score < 1400
+        batch = {
+            "gender": "male",
+            "results": [
+                {"event": "10km", "performance": "30:00"},
+                {"event": "LJ", "performance": "7.50", "gender": "female"},
+                {"event": "10km", "performance": "soon"},
+            ],
+        }
+        response = api.handle("POST", "/score", body=json.dumps(batch).encode())
+        scores = json.loads(response.body)["scores"]
+        assert scores[0] == score and scores[1] > 0 and scores[2] is None
+        assert api.handle("POST", "/score", body=b"{").status == 400
+        assert api.handle("POST", "/score", body=b'{"results": [{}]}').status == 400
+        for results in (b"5", b'"10km"', b"null", b'{"event": "10km"}'):
+            body = b'{"results": ' + results + b"}"
+            assert api.handle("POST", "/score", body=body).status == 400
+
+    def test_served_on_localhost(self, tmp_path: Path):
+        api = self.make_api(tmp_path)
+
+        async def run():
+            server = await api.serve("127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                return await load_test(
+                    "127.0.0.1", port, "/pbs", requests=200, connections=4
+                )
+            finally:
+                server.close()
+                await server.wait_closed()
+
+        result = asyncio.run(run())
+        assert result.requests == 200
+        # each connection gets the body once, then revalidates it
+        assert result.statuses == {200: 4, 304: 196}
+        assert "requests/s" in result.report()
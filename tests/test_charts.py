@@ -0,0 +1,106 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import make_race
+
+from src.charts import ProgressionCharts, lttb, period_start, split_paces
+from src.iaaf import Event, Gender, get_calculator
+from src.perfs_tracker import PerfsRaces
+
+
+class TestLTTB:
+    def test_keeps_endpoints_and_peaks(self):
+        x = np.arange(10_000, dtype=np.float64)
+        y = np.sin(x / 500)
+        y[4321] = 10
+        kept = lttb(x, y, 100)
+        assert len(kept) == 100
+        assert kept[0] == 0 and kept[-1] == len(x) - 1
+        assert (np.diff(kept) > 0).all()
+        assert 4321 in kept
+
+    def test_short_series(self):
+        assert lttb(np.arange(5), np.arange(5), 10).tolist() == list(range(5))
+        assert lttb(np.arange(5), np.arange(5), 2).tolist() == [0, 4]
+
+
+class TestProgressionCharts:
+    def setup_method(self):
+        rng = np.random.default_rng(0)
+        self.perfs = PerfsRaces()
+        first = datetime(2015, 1, 1)
+        for i in range(2000):
+            day = first + timedelta(days=int(rng.integers(0, 3650)))
+            distance = float(rng.choice([5, 10]))
+            seconds = int(rng.integers(170, 260) * distance)
+            self.perfs.add_perf(make_race(seconds, distance, day, f"Race {i}"))
+
+    def test_period_start(self):
+        dates = np.array(["2024-05-15", "2024-05-20"], dtype="datetime64[D]")
+        assert period_start(dates, "week").tolist() == [
+            date(2024, 5, 13),
+            date(2024, 5, 20),
+        ]
+        assert period_start(dates, "month")[0] == np.datetime64("2024-05-01")
+        assert period_start(dates, "season")[0] == np.datetime64("2024-01-01")
+        with pytest.raises(ValueError):
+            period_start(dates, "day")
+
+    def test_monthly_bests(self):
+        charts = ProgressionCharts.of(self.perfs)
+        series = charts.series(10, period="month", max_points=10_000)
+        tens = [perf for perf in self.perfs if perf.distance == 10]
+        expected = (
+            pd.Series(
+                [perf.time.get_seconds() for perf in tens],
+                index=[perf.date.strftime("%Y-%m") for perf in tens],
+            )
+            .groupby(level=0)
+            .min()
+        )
+        assert series["Seconds"].tolist() == expected.tolist()
+
+    def test_downsampled_and_zoomed(self):
+        charts = ProgressionCharts.of(self.perfs)
+        series = charts.series(5, max_points=50)
+        assert len(series) == 50
+        assert series["Date"].is_monotonic_increasing
+        zoomed = charts.series(5, start=date(2020, 1, 1), end=date(2020, 12, 31))
+        assert zoomed["Date"].between("2020-01-01", "2020-12-31").all()
+        with pytest.raises(ValueError):
+            charts.series(None)
+
+    def test_scored_series(self):
+        # without gender no race is scored, and the score is not offered
+        assert ProgressionCharts.of(self.perfs).metrics() == ["time"]
+        self.perfs.gender = Gender.male
+        charts = ProgressionCharts.of(self.perfs)
+        assert charts.metrics() == ["time", "iaaf_score"]
+        series = charts.series(10, "iaaf_score", max_points=10_000)
+        tens = sorted(
+            (perf for perf in self.perfs if perf.distance == 10),
+            key=lambda perf: perf.date,
+        )
+        iaaf = get_calculator()
+        assert series["IAAF score"].tolist() == [
+            iaaf.get_iaaf_score(Gender.male, Event.e10km, perf.time) for perf in tens
+        ]
+
+    def test_cached_per_version(self):
+        charts = ProgressionCharts.of(self.perfs)
+        series = charts.series(10, period="week")
+        assert charts.series(10, period="week") is series
+        self.perfs.add_perf(make_race(1500, 10, datetime(2030, 1, 1)))
+        updated = ProgressionCharts.of(self.perfs).series(10, period="week")
+        assert updated["Seconds"].iloc[-1] == 1500
+
+
+def test_split_paces():
+    race = make_race(3000, 10, datetime(2024, 1, 1))
+    race.add_splits([k / 10 for k in range(1, 101)], [30] * 99 + [3])
+    paces = split_paces(race, max_points=20)
+    assert len(paces) == 20
+    assert paces["Pace (s/km)"].iloc[-1] == pytest.approx(30)
+    assert paces["Distance (km)"].iloc[-1] == pytest.approx(10)
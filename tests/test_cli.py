@@ -0,0 +1,149 @@
+import io
+import shutil
+import subprocess
+import sys
+import sysconfig
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from src.cli import main
+from src.iaaf import Gender
+from src.perfs_tracker import MainPerf, PerfsRaces
+from src.replication import LOG_FILENAME, read_changesets
+from src.time_an_pace import Time
+
+
+def run(*argv: str) -> tuple[int, str]:
+    out = io.StringIO()
+    code = main(list(argv), out=out)
+    return code, out.getvalue()
+
+
+@pytest.fixture
+def data_file(tmp_path: Path) -> Path:
+    perfs = PerfsRaces()
+    for minutes in (42, 40):
+        perfs.add_perf(
+            MainPerf(
+                time=Time(minutes=minutes, seconds=0),
+                distance=10,
+                date=datetime(2024, 1, minutes - 30),
+                name_event=f"10km in {minutes}min",
+                location="Paris",
+            )
+        )
+    filepath = tmp_path / "perfs.json"
+    perfs.save_to_json(filepath)
+    return filepath
+
+
+def test_installed_script():
+    # installed by `uv sync` (or `pip install -e .`) next to the interpreter
+    script = shutil.which("chrontrack", path=sysconfig.get_path("scripts"))
+    assert script is not None, "the chrontrack script is not installed"
+    result = subprocess.run(
+        [script, "score", "-g", "female", "10km", "40:00"],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).parents[1],
+    )
+    assert result.stdout == "755\n"
+
+
+def test_score():
+    assert run("score", "-g", "female", "10km", "40:00") == (0, "755\n")
+
+
+def test_score_field_event():
+    assert run("score", "-g", "male", "LJ", "8.95m") == (0, "1346\n")
+
+
+def test_score_stream(tmp_path: Path):
+    input_file = tmp_path / "perfs.csv"
+    input_file.write_text("10km,40:00\n# comment\nHM,1h25min0s\n")
+    code, output = run("score", "-g", "female", "-i", str(input_file))
+    assert code == 0
+    assert output.splitlines() == ["10km,40:00,755", "HM,1h25min0s,843"]
+
+
+def test_score_invalid_time():
+    assert run("score", "-g", "male", "10km", "40:75")[0] == 2
+
+
+def test_pbs(data_file: Path):
+    code, output = run("pbs", "-d", str(data_file), "-g", "female")
+    assert code == 0
+    assert output.splitlines() == [
+        "distance_km,time,date,event,iaaf_score",
+        "10.0,40min0s,2024-01-10,10km in 40min,755",
+    ]
+
+
+def test_import(data_file: Path, tmp_path: Path):
+    csv_file = tmp_path / "results.csv"
+    csv_file.write_text(
+        "Race,date,distance,Chrono,location\n"
+        "Semi,2024-10-06,21.1,1:25:00,Lyon\n"
+        "Broken,2024-10-06,21.1,,Lyon\n"
+    )
+    args = ("import", str(csv_file), "-d", str(data_file))
+    columns = ("-c", "Race=name_event", "-c", "Chrono=time")
+    code, output = run(*args, *columns)
+    assert code == 0
+    assert output == "1 races imported, 0 already recorded, 1 rejected\n"
+    perfs = PerfsRaces(gender=Gender("male"))
+    perfs.load_from_json(data_file)
+    assert len(perfs) == 3
+    # the import is logged for the other nodes
+    changesets = [c for c, _ in read_changesets(data_file.parent / LOG_FILENAME)]
+    assert [(c.kind, c.key) for c in changesets] == [
+        ("add", ("2024-10-06", "Semi", 21.1))
+    ]
+
+    # importing the same file again adds nothing
+    code, output = run(*args, *columns)
+    assert output == "0 races imported, 1 already recorded, 1 rejected\n"
+
+
+def test_convert():
+    code, output = run("convert", "-g", "male", "10km", "40:00", "--to", "10km")
+    assert code == 0
+    assert output.splitlines() == ["event,time,pace_min_km", "10km,40min0s,04'00"]
+
+
+@pytest.mark.parametrize("command", ["score", "convert"])
+def test_does_not_import_pandas(command: str):
+    code = (
+        "import sys; from src.cli import main;"
+        f"main(['{command}', '-g', 'male', '10km', '40:00']);"
+        "assert 'pandas' not in sys.modules and 'streamlit' not in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)
+
+
+def test_sync(tmp_path: Path):
+    from src.replication import Replica
+
+    node = Replica(tmp_path / "a")
+    node.store.add_perf(
+        MainPerf(
+            time=Time(minutes=40, seconds=0),
+            distance=10,
+            date=datetime(2024, 1, 10),
+            name_event="10km",
+            location="Paris",
+        )
+    )
+    node.store.writer.close()
+    peer = str(tmp_path / "a")
+    assert run("sync", "-n", str(tmp_path / "b"), peer) == (
+        0,
+        f"{peer}: 1 changes applied\n",
+    )
+    assert run("sync", "-n", str(tmp_path / "b"), peer)[1].endswith(
+        ": 0 changes applied\n"
+    )
+    assert len(PerfsRaces.load_cached(tmp_path / "b" / "perfs.json")) == 1
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import numpy as np
+
+from src.columns import RaceColumns
+from src.iaaf import Event, Gender, IAAFCalculator
+from src.perfs_tracker import MainPerf, PerfsRaces
+from src.time_an_pace import Pace, Time
+
+races: list[tuple[float, Time]] = [
+    (10, Time(minutes=40, seconds=0)),
+    (21.1, Time(hours=1, minutes=25, seconds=0)),
+    (6, Time(minutes=47, seconds=28)),
+]
+
+
+class TestRaceColumns:
+    def setup_method(self):
+        self.perfs = PerfsRaces(gender=Gender("female"))
+        for i, (distance, time) in enumerate(races):
+            self.perfs.add_perf(
+                MainPerf(
+                    time=time,
+                    distance=distance,
+                    date=datetime(2024, 1, i + 1),
+                    name_event=f"race {i}",
+                    location="Paris",
+                )
+            )
+        self.columns = RaceColumns.from_perfs(self.perfs)
+
+    def test_columns(self):
+        assert len(self.columns) == len(races)
+        assert self.columns.seconds.dtype == np.int64
+        assert self.columns.date[0] == np.datetime64("2024-01-01")
+        assert self.columns.pace[0] == 240
+        assert self.columns.speed[0] == 15
+
+    def test_iaaf_scores_match_scalar_scoring(self):
+        # same values as in test_perfs.TestPerfOfAllTime.test_get_iaaf
+        iaaf = IAAFCalculator()
+        expected = [
+            iaaf.get_iaaf_score(Gender("female"), Event("10km"), races[0][1]),
+            iaaf.get_iaaf_score(Gender("female"), Event("HM"), races[1][1]),
+        ]
+        assert self.columns.iaaf_score[:2].tolist() == expected
+        assert np.isnan(self.columns.iaaf_score[2])
+
+    def test_no_gender(self):
+        columns = RaceColumns.from_perfs(PerfsRaces(perfs=self.perfs.perfs))
+        assert np.isnan(columns.iaaf_score).all()
+
+    def test_format_pace(self):
+        expected = [str(Pace.from_time_distance(t, d)) for d, t in races[:2]]
+        assert self.columns.format_pace(slice(0, 2)) == expected
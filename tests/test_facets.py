@@ -0,0 +1,96 @@
+import random
+from datetime import datetime
+
+from src.facets import FacetIndex, bitset, positions
+from src.perfs_tracker import MainPerf, PerfsRaces
+from src.time_an_pace import Time
+
+
+def test_bitset_positions():
+    assert bitset([]) == 0
+    assert bitset([0, 3, 9]) == 0b1000001001
+    rng = random.Random(0)
+    rows = sorted(rng.sample(range(10_000), 500))
+    assert positions(bitset(rows)) == rows
+
+
+class TestFacetIndex:
+    def setup_method(self):
+        self.perfs = PerfsRaces()
+        races = [
+            ("Paris", 10, datetime(2023, 4, 2)),
+            ("Paris", 21.1, datetime(2023, 10, 8)),
+            ("Lyon", 10, datetime(2024, 3, 3)),
+            ("Lyon", 12, datetime(2024, 6, 9)),
+            ("Paris", 10, datetime(2024, 9, 1)),
+        ]
+        for i, (location, distance, date) in enumerate(races):
+            self.perfs.add_perf(
+                MainPerf(
+                    time=Time(minutes=50, seconds=i),
+                    distance=distance,
+                    date=date,
+                    name_event=f"Race {i}",
+                    location=location,
+                )
+            )
+        self.df = self.perfs.table()
+        self.facets = FacetIndex.from_table(self.df)
+
+    def test_options(self):
+        assert self.facets.options("location") == ["Lyon", "Paris"]
+        assert self.facets.options("distance") == [10, 12, 21.1]
+        assert self.facets.options("year") == [2023, 2024]
+        # 12 km is not a road event
+        assert self.facets.options("event") == ["10km", "HM"]
+
+    def test_rows_match_masks(self):
+        df = self.df
+        rows = self.facets.rows(location="Paris", year=2024)
+        expected = (df["Location"] == "Paris") & (df["Date"].dt.year == 2024)
+        assert rows == list(df.index[expected])
+        assert self.facets.rows(distance=[10, 12], location=None) == list(
+            df.index[df["Distance (km)"].isin([10, 12])]
+        )
+        assert self.facets.rows() == list(range(len(df)))
+        assert self.facets.rows(location="Marseille") == []
+
+    def test_counts(self):
+        assert self.facets.counts("location") == {"Lyon": 2, "Paris": 3}
+        assert self.facets.counts("location", year=2023) == {"Lyon": 0, "Paris": 2}
+        # the selection of the facet itself does not change its counts
+        assert self.facets.counts("year", year=2023, location="Paris") == {
+            2023: 2,
+            2024: 1,
+        }
+        assert self.facets.counts("event", location="Lyon") == {"10km": 1, "HM": 0}
+
+    def test_empty_table(self):
+        facets = FacetIndex.from_table(PerfsRaces().table())
+        assert facets.rows() == []
+        assert facets.counts("location") == {}
+
+    def test_insert_and_delete_rows(self):
+        values = {"location": "Brest", "distance": 10, "year": 2025, "event": None}
+        self.facets.insert(2, values)
+        expected = FacetIndex(
+            {
+                "location": ["Paris", "Paris", "Brest", "Lyon", "Lyon", "Paris"],
+                "distance": [10, 21.1, 10, 10, 12, 10],
+                "year": [2023, 2023, 2025, 2024, 2024, 2024],
+                "event": ["10km", "HM", None, "10km", None, "10km"],
+            }
+        )
+        assert self.facets.bitsets == expected.bitsets
+        assert self.facets.options("location") == ["Brest", "Lyon", "Paris"]
+        assert self.facets.rows() == list(range(6))
+
+        # the only race of 21.1 km
+        self.facets.delete(1)
+        self.facets.delete(1)
+        assert self.facets.bitsets == FacetIndex.from_table(self.df.drop(1)).bitsets
+        assert self.facets.rows(location="Paris") == [0, 3]
+        for _ in range(4):
+            self.facets.delete(0)
+        assert all(not bitsets for bitsets in self.facets.bitsets.values())
+        assert self.facets.rows() == []
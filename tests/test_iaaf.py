@@ -1,8 +1,21 @@
 import json
+import shutil
+from pathlib import Path
 
+import numpy as np
 import pytest
 
-from src.iaaf import Event, Gender, IAAFCalculator
+from src.iaaf import (
+    JSON_FILENAME,
+    TABLE_FILENAME,
+    CoefficientTable,
+    Event,
+    Gender,
+    IAAFCalculator,
+    compile_coefficients,
+    get_calculator,
+    verify_coefficients,
+)
 from src.time_an_pace import Time
 
 
@@ -34,3 +47,109 @@ class TestIAAFCalculator:
         self, gender: Gender, event: Event, time: Time, expected: int
     ):
         assert self.iaaf.get_iaaf_score(gender, event, time) == expected
+
+    def test_get_iaaf_scores_vectorized(self):
+        events = [Event("100m"), Event("HM"), None, Event("Marathon")]
+        seconds = np.array([10, 3600, 3600, 9000])
+        scores = self.iaaf.get_iaaf_scores(Gender("male"), events, seconds)
+        assert scores[[0, 1, 3]].tolist() == [1206, 1186, 853]
+        assert np.isnan(scores[2])
+
+    def test_unknown_event(self):
+        assert not self.iaaf.has_event(Gender("male"), Event("Heptathlon"))
+        with pytest.raises(ValueError):
+            self.iaaf.get_iaaf_score(
+                Gender("male"), Event("Heptathlon"), Time(minutes=0, seconds=10)
+            )
+
+
+class TestCoefficientTable:
+    def setup_method(self):
+        self.data_path = Path("data")
+
+    def test_shipped_table_is_up_to_date(self):
+        assert verify_coefficients(self.data_path) > 0
+
+    def test_compile(self, tmp_path: Path):
+        shutil.copy(self.data_path / JSON_FILENAME, tmp_path)
+        compile_coefficients(tmp_path)
+        assert (tmp_path / TABLE_FILENAME).read_bytes() == (
+            self.data_path / TABLE_FILENAME
+        ).read_bytes()
+
+    def test_stale_table(self, tmp_path: Path):
+        shutil.copy(self.data_path / TABLE_FILENAME, tmp_path)
+        formulas = json.loads((self.data_path / JSON_FILENAME).read_text())
+        formulas["male"]["100m"][2] += 1
+        (tmp_path / JSON_FILENAME).write_text(json.dumps(formulas))
+        with pytest.raises(ValueError):
+            verify_coefficients(tmp_path)
+
+    def test_verify_reads_the_array(self, monkeypatch: pytest.MonkeyPatch):
+        to_numpy = CoefficientTable.to_numpy
+        # an array read with the events in the wrong order
+        monkeypatch.setattr(
+            CoefficientTable, "to_numpy", lambda table: to_numpy(table)[:, ::-1]
+        )
+        with pytest.raises(ValueError, match="scores differ"):
+            verify_coefficients(self.data_path)
+
+    def test_calculator_compiles_stale_table(self, tmp_path: Path):
+        shutil.copy(self.data_path / TABLE_FILENAME, tmp_path)
+        formulas = json.loads((self.data_path / JSON_FILENAME).read_text())
+        formulas["male"]["100m"][2] += 1
+        (tmp_path / JSON_FILENAME).write_text(json.dumps(formulas))
+        iaaf = IAAFCalculator(tmp_path)
+        assert iaaf.get_coeffs(Gender("male"), Event("100m")) == tuple(
+            formulas["male"]["100m"]
+        )
+        assert verify_coefficients(tmp_path) > 0
+
+    def test_source_hash_without_table(self, tmp_path: Path):
+        shutil.copy(self.data_path / JSON_FILENAME, tmp_path)
+        table = CoefficientTable.load(self.data_path / TABLE_FILENAME)
+        assert IAAFCalculator(tmp_path).table.source_hash == table.source_hash
+
+    def test_same_scores_without_table(self, tmp_path: Path):
+        shutil.copy(self.data_path / JSON_FILENAME, tmp_path)
+        from_json = IAAFCalculator(tmp_path)
+        from_table = IAAFCalculator(self.data_path)
+        events = list(Event)
+        seconds = np.linspace(10, 10_000, len(events))
+        for gender in Gender:
+            np.testing.assert_array_equal(
+                from_json.get_iaaf_scores(gender, events, seconds),
+                from_table.get_iaaf_scores(gender, events, seconds),
+            )
+
+    def test_calculator_cached_until_changed(self, tmp_path: Path):
+        shutil.copy(self.data_path / JSON_FILENAME, tmp_path)
+        iaaf = get_calculator(tmp_path)
+        assert get_calculator(tmp_path) is iaaf
+        formulas = json.loads((tmp_path / JSON_FILENAME).read_text())
+        formulas["male"]["100m"][2] += 1
+        (tmp_path / JSON_FILENAME).write_text(json.dumps(formulas, indent=1))
+        changed = get_calculator(tmp_path)
+        assert changed is not iaaf
+        assert changed.get_coeffs(Gender("male"), Event("100m")) == tuple(
+            formulas["male"]["100m"]
+        )
+        assert get_calculator(tmp_path) is changed
+
+    def test_memory_mapped(self):
+        table = CoefficientTable.load(self.data_path / TABLE_FILENAME)
+        array = table.to_numpy()
+        assert array.shape == (len(Gender), len(Event), 3)
+        assert not array.flags.writeable
+        assert table.get(Gender("female"), Event("Decathlon")) is None
+        assert np.isnan(
+            array[
+                list(Gender).index(Gender("female")),
+                list(Event).index(Event("Decathlon")),
+            ]
+        ).all()
+
+    def test_load_invalid_file(self, tmp_path: Path):
+        (tmp_path / TABLE_FILENAME).write_bytes(b"not a table" * 10)
+        with pytest.raises(ValueError):
+            CoefficientTable.load(tmp_path / TABLE_FILENAME)
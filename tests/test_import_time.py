@@ -0,0 +1,66 @@
+import subprocess
+import sys
+
+import pytest
+
+# module: (budget of its cumulative import time in ms, modules it must not load)
+# The budgets are about three times the time measured on a laptop, to catch a
+# heavy import added at module level rather than small variations. Wall-clock
+# times depend on the machine and its load, so they are only checked by the
+# benchmarks (`pytest -m benchmark`); the modules loaded are always checked.
+IMPORT_BUDGETS: dict[str, tuple[int, tuple[str, ...]]] = {
+    "src": (20, ("pydantic", "numpy", "pandas", "streamlit")),
+    "src.cli": (50, ("pydantic", "numpy", "pandas", "streamlit")),
+    "src.time_an_pace": (500, ("numpy", "pandas", "streamlit")),
+    "src.iaaf": (600, ("numpy", "pandas", "streamlit")),
+    "src.persistence": (500, ("numpy", "pandas", "streamlit")),
+    "src.perfs_tracker": (600, ("numpy", "pandas", "streamlit")),
+    "src.store": (600, ("numpy", "pandas", "streamlit")),
+}
+
+
+def import_times(module: str) -> dict[str, int]:
+    """
+    Imports module in a fresh interpreter with `-X importtime`.
+
+    Returns:
+        dict[str, int]: The cumulative import time in microseconds of every
+            module loaded.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize("module", IMPORT_BUDGETS)
+def test_lazy_imports(module: str):
+    _, forbidden = IMPORT_BUDGETS[module]
+    loaded = [name for name in forbidden if name in import_times(module)]
+    assert not loaded, f"{module} imports {loaded}"
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("module", IMPORT_BUDGETS)
+def test_import_budget(module: str):
+    budget_ms, _ = IMPORT_BUDGETS[module]
+    times = import_times(module)
+    assert times[module] / 1000 < budget_ms, f"{module}: {times[module] / 1000} ms"
+
+
+def test_lazy_attributes():
+    import src
+
+    assert src.Time is src.time_an_pace.Time
+    assert "PerfsRaces" in dir(src)
+    with pytest.raises(AttributeError):
+        src.NotAName
@@ -0,0 +1,79 @@
+from datetime import datetime
+
+from conftest import make_race
+
+from src.iaaf import Gender
+from src.leaderboard import ClubRankings
+from src.perfs_tracker import MainPerf, PerfsRaces
+
+
+def make_athlete(name: str, gender: str, *perfs: MainPerf) -> PerfsRaces:
+    athlete = PerfsRaces(athlete=name, gender=Gender(gender))
+    for perf in perfs:
+        athlete.add_perf(perf)
+    return athlete
+
+
+class TestClubRankings:
+    def setup_method(self):
+        self.rankings = ClubRankings()
+        self.alice = make_athlete(
+            "alice",
+            "female",
+            make_race(2500),
+            make_race(2450, date=datetime(2023, 5, 1)),
+        )
+        self.bob = make_athlete("bob", "female", make_race(2400), make_race(5400, 21.1))
+        self.carl = make_athlete("carl", "male", make_race(2100))
+        for athlete in (self.alice, self.bob, self.carl):
+            self.rankings.add_athlete(athlete)
+
+    def test_best_of_each_athlete(self):
+        top = self.rankings.top(10, Gender("female"))
+        assert [(entry.athlete, entry.seconds) for entry in top] == [
+            ("bob", 2400),
+            ("alice", 2450),
+        ]
+        season = self.rankings.top(10, Gender("female"), season=2024)
+        assert [entry.seconds for entry in season] == [2400, 2500]
+        assert self.rankings.top(10, Gender("male"))[0].athlete == "carl"
+
+    def test_rank(self):
+        female = Gender("female")
+        assert self.rankings.rank(10, female, 2300) == 1
+        assert self.rankings.rank(10, female, 2400) == 1
+        assert self.rankings.rank(10, female, 2420) == 2
+        assert self.rankings.rank(10, female, 3000) == 3
+        assert self.rankings.rank(5, female, 3000) == 1
+        assert self.rankings.leaderboard(10, female).rank_of("alice") == 2
+
+    def test_incremental_update(self):
+        self.alice.add_perf(make_race(2350))
+        top = self.rankings.top(10, Gender("female"), k=1)
+        assert (top[0].athlete, top[0].seconds) == ("alice", 2350)
+        assert len(self.rankings.leaderboard(10, Gender("female"))) == 2
+        # a slower race does not change the leaderboard
+        self.bob.add_perf(make_race(2600))
+        assert self.rankings.leaderboard(10, Gender("female")).rank_of("bob") == 2
+
+    def test_score_leaderboard(self):
+        board = self.rankings.score_leaderboard(Gender("female"), 2024)
+        scores = [entry.iaaf_score for entry in board]
+        assert scores == sorted(scores, reverse=True)
+        assert len(board) == 2
+        # the best score of bob is their half marathon
+        assert board.top(1)[0].athlete == "bob"
+        assert board.top(1)[0].distance == 21.1
+
+    def test_update_and_delete(self):
+        female = Gender("female")
+        self.bob.delete_race(datetime(2024, 5, 1), "Race in 2400s", 10)
+        assert [entry.athlete for entry in self.rankings.top(10, female)] == ["alice"]
+        assert self.rankings.score_leaderboard(female).rank_of("bob") == 1
+        self.alice.update_race(
+            datetime(2023, 5, 1),
+            "Race in 2450s",
+            10,
+            make_race(2700, date=datetime(2023, 5, 1)),
+        )
+        assert self.rankings.top(10, female)[0].seconds == 2500
@@ -0,0 +1,91 @@
+import random
+from datetime import datetime
+
+import numpy as np
+import pytest
+from conftest import make_race
+
+from src.pacing import PacingProfile, RaggedSplits, add_pacing_columns
+from src.perfs_tracker import PerfsRaces
+from src.time_an_pace import Time
+
+
+def time_at(splits: list[int], step: float, distance: float) -> float:
+    full = int(distance // step)
+    if full >= len(splits):
+        return float(sum(splits))
+    return sum(splits[:full]) + splits[full] * (distance - full * step) / step
+
+
+class TestPacingProfile:
+    def setup_method(self):
+        rng = random.Random(0)
+        self.races = []
+        for day in range(1, 29):
+            n = rng.choice([0, 1, 4, 10, 21])
+            distance = rng.choice([5, 10, 21.1])
+            splits = [rng.randint(200, 320) for _ in range(n)]
+            self.races.append(
+                make_race(
+                    sum(splits) + 30, distance, datetime(2024, 1, day), splits=splits
+                )
+            )
+        self.profile = PacingProfile.compute(RaggedSplits.from_perfs(self.races))
+
+    def test_matches_race_by_race(self):
+        for r, race in enumerate(self.races):
+            splits = list(race.splits.seconds)
+            if len(splits) < 2:
+                assert np.isnan(self.profile.split_ratio[r])
+                assert self.profile.fastest[r] == -1
+                continue
+            step = race.distance / len(splits)
+            half = time_at(splits, step, race.distance / 2)
+            assert self.profile.split_ratio[r] == pytest.approx(
+                (sum(splits) - half) / half
+            )
+            paces = np.array(splits) / step
+            assert self.profile.pace_cv[r] == pytest.approx(paces.std() / paces.mean())
+            if race.distance > 5:
+                before = time_at(splits, step, 5)
+                fade = ((sum(splits) - before) / (race.distance - 5)) / (before / 5)
+                assert self.profile.fade[r] == pytest.approx(fade - 1)
+            else:
+                assert np.isnan(self.profile.fade[r])
+            offset = self.profile.splits.offsets[r]
+            assert self.profile.fastest[r] - offset == int(np.argmin(splits))
+            assert self.profile.slowest[r] - offset == len(splits) - 1 - int(
+                np.argmax(splits[::-1])
+            )
+
+    def test_table_columns(self):
+        perfs = PerfsRaces()
+        for race in reversed(self.races):
+            perfs.add_perf(race)
+        df = add_pacing_columns(perfs.table(), perfs)
+        # the rows of the table are sorted by date, like self.races
+        assert df["Split ratio"].tolist() == pytest.approx(
+            np.round(self.profile.split_ratio, 3).tolist(), nan_ok=True
+        )
+        first = next(r for r, race in enumerate(self.races) if len(race.splits) > 1)
+        assert df["Fastest split"][first] == self.profile.segment(
+            self.profile.fastest[first]
+        )
+        assert df["Fastest split"][first].endswith(" km")
+
+    def test_base_splits(self):
+        race = make_race(30, date=datetime(2024, 1, 1))
+        race.time = Time(minutes=21, seconds=0)
+        race.add_sub_perf([Time(minutes=5, seconds=i) for i in range(4)], 2.5)
+        races = [
+            race,
+            make_race(1220, date=datetime(2024, 1, 2), splits=[600, 590]),
+        ] + self.races
+        splits = RaggedSplits.from_perfs(races)
+        assert splits.counts.tolist() == [race.splits.n_base for race in races]
+        assert splits.seconds[:4].tolist() == [300, 301, 302, 303]
+        assert splits.end[:6].tolist() == [2.5, 5, 7.5, 10, 5, 10]
+
+    def test_no_races(self):
+        profile = PacingProfile.compute(RaggedSplits.from_perfs([]))
+        assert len(profile) == 0
@@ -1,8 +1,19 @@
+import pickle
+import random
 from datetime import datetime
 from pathlib import Path
 
-from src.iaaf import Event, Gender
-from src.perfs_tracker import MainPerf, PerfsRaces, SubPerf
+import pytest
+
+from src.iaaf import Event, Gender, IAAFCalculator
+from src.perfs_tracker import (
+    ROAD_EVENTS,
+    Delta,
+    DuplicateRaceError,
+    MainPerf,
+    PerfsRaces,
+    SubPerf,
+)
 from src.time_an_pace import Pace, Time
 
 perfs: dict[float, Time] = {
@@ -114,6 +125,29 @@ class TestPerf:
         # check that all 20k splits are in the sub_perfs
         assert (0, 20) in perf.sub_perfs
 
+    def test_sub_perfs_are_views(self):
+        perf = MainPerf(
+            time=perfs[21.1],
+            distance=21.1,
+            date="2021-10-10",
+            location="Paris",
+            name_event="HM in Paris",
+        )
+        perf.add_sub_perf(sub_perfs_21k, 5)
+        assert perf.splits.n_base == len(sub_perfs_21k)
+        assert list(perf.splits.seconds[:4]) == [1320, 1230, 1170, 1080]
+
+        sub_perf = perf.sub_perfs[(5, 15)]
+        assert sub_perf.time == Time(minutes=40, seconds=0)
+        assert sub_perf.distance == 10
+        assert sub_perf.location == perf.location
+        assert sub_perf.iaaf_score is None
+        sub_perf.iaaf_score = 500
+        assert perf.sub_perfs[(5, 15)].iaaf_score == 500
+
+        copy = MainPerf.from_dict(perf.to_dict())
+        assert copy.splits == perf.splits
+
 
 class TestPerfOfAllTime:
     def setup_method(self):
@@ -155,6 +189,80 @@ class TestPerfOfAllTime:
         assert len(self.perfs_of_all_time) == len(self.test_perfs) + 1
         assert self.perfs_of_all_time.perfs[-1] == new_perf
 
+    def test_add_perf_keeps_splits_in_main_perf(self):
+        new_perf = MainPerf(
+            time=perfs[21.1],
+            distance=21.1,
+            date=datetime.now(),
+            location="Paris",
+            name_event="HM in Paris",
+        )
+        new_perf.add_sub_perf(sub_perfs_21k, 5)
+        self.perfs_of_all_time.add_perf(new_perf)
+        assert len(self.perfs_of_all_time) == len(self.test_perfs) + 1
+        assert all(isinstance(p, MainPerf) for p in self.perfs_of_all_time)
+
+    def test_add_duplicate(self):
+        perf = self.test_perfs[-1]
+        duplicate = perf.model_copy(update={"name_event": " 10KM  PB "})
+        with pytest.raises(DuplicateRaceError):
+            self.perfs_of_all_time.add_perf(duplicate)
+        assert len(self.perfs_of_all_time) == len(self.test_perfs)
+
+    def test_get_race(self):
+        perf = self.test_perfs[3]
+        found = self.perfs_of_all_time.get_race(
+            perf.date.date(), perf.name_event.upper(), perf.distance
+        )
+        assert found is perf
+        assert self.perfs_of_all_time.get_race(perf.date, "unknown", 10) is None
+
+    def test_update_race(self):
+        perf = self.test_perfs[-1]
+        faster = perf.model_copy(update={"time": Time(minutes=39, seconds=0)})
+        old = self.perfs_of_all_time.update_race(
+            perf.date, perf.name_event, perf.distance, faster
+        )
+        assert old is perf
+        assert self.perfs_of_all_time.get_personal_best(10) is faster
+        renamed = faster.model_copy(update={"name_event": "10km record"})
+        self.perfs_of_all_time.update_race(perf.date, "10km pb", 10, renamed)
+        assert self.perfs_of_all_time.get_race(perf.date, "10km pb", 10) is None
+        assert self.perfs_of_all_time.get_race(perf.date, "10km record", 10) is renamed
+        with pytest.raises(ValueError):
+            self.perfs_of_all_time.update_race(perf.date, "10km pb", 10, renamed)
+
+    def test_upsert_race(self):
+        perf = self.test_perfs[0]
+        slower = perf.model_copy(update={"time": Time(hours=3, minutes=0, seconds=0)})
+        assert self.perfs_of_all_time.upsert_race(slower) is perf
+        assert self.perfs_of_all_time[0] is slower
+        assert len(self.perfs_of_all_time) == len(self.test_perfs)
+
+    def test_delete_race(self):
+        deleted = self.test_perfs[1]
+        version = self.perfs_of_all_time.version
+        assert (
+            self.perfs_of_all_time.delete_race(
+                deleted.date, deleted.name_event, deleted.distance
+            )
+            is deleted
+        )
+        assert self.perfs_of_all_time.version > version
+        assert len(self.perfs_of_all_time) == len(self.test_perfs) - 1
+        # the following races are still found at their new position
+        for perf in self.test_perfs[2:]:
+            assert (
+                self.perfs_of_all_time.get_race(
+                    perf.date, perf.name_event, perf.distance
+                )
+                is perf
+            )
+        with pytest.raises(ValueError):
+            self.perfs_of_all_time.delete_race(
+                deleted.date, deleted.name_event, deleted.distance
+            )
+
     def test_find_pb_only_one_race(self):
         best_perf_on_21_1 = self.perfs_of_all_time.get_personal_best(21.1)
         assert best_perf_on_21_1 is not None
@@ -288,3 +396,231 @@ class TestPerfOfAllTime:
 
         assert filepath.exists()
         filepath.unlink()
+
+
+class TestIncrementalScoring:
+    def setup_method(self):
+        self.perfs = PerfsRaces(gender=Gender("male"))
+        for day in range(1, 4):
+            self.perfs.add_perf(make_race(day, 40 + day))
+
+    def assert_scores(self, gender: Gender):
+        iaaf = IAAFCalculator()
+        for perf in self.perfs.iter_with_splits():
+            event = ROAD_EVENTS.get(perf.distance)
+            if event is not None:
+                expected = iaaf.get_iaaf_score(gender, event, perf.time)
+                assert perf.iaaf_score == expected
+
+    def test_only_changes_are_scored(self):
+        assert self.perfs.compute_iaaf_scores() == 3
+        self.assert_scores(Gender("male"))
+        assert self.perfs.compute_iaaf_scores() == 0
+
+        self.perfs.add_perf(make_race(4, 30, distance=5))
+        assert self.perfs.compute_iaaf_scores() == 1
+        race = self.perfs[3]
+        assert isinstance(race, MainPerf)
+        race.add_splits([2.5, 5], [900, 900])
+        assert self.perfs.compute_iaaf_scores() == 1
+        assert race.splits.get_score(0) is None  # no 2.5 km event
+        self.assert_scores(Gender("male"))
+
+    def test_gender_change_rescores_all(self):
+        self.perfs.compute_iaaf_scores()
+        self.perfs.gender = Gender("female")
+        assert self.perfs.compute_iaaf_scores() == 3
+        self.assert_scores(Gender("female"))
+
+
+class TestWarmStart:
+    def setup_method(self):
+        self.perfs = PerfsRaces()
+        for day in range(1, 4):
+            self.perfs.add_perf(make_race(day, 40 + day))
+
+    def test_cache(self, tmp_path: Path, capsys):
+        filepath = tmp_path / "perfs.json"
+        self.perfs.save_to_json(filepath)
+        built = PerfsRaces.load_cached(filepath)
+        assert (tmp_path / "perfs.json.cache").exists()
+        capsys.readouterr()
+        cached = PerfsRaces.load_cached(filepath)
+        assert "from" in capsys.readouterr().out
+        assert cached.perfs == built.perfs == self.perfs.perfs
+        assert {d: str(pb) for d, pb in cached.get_all_personal_best().items()} == {
+            d: str(pb) for d, pb in built.get_all_personal_best().items()
+        }
+        assert cached.table().equals(built.table())
+        # the derived data is restored, still consistent with later changes
+        cached.delete_race(datetime(2024, 1, 1), "Race of day 1", 10)
+        assert cached.get_personal_best(10) is cached[0]
+        assert len(cached.table()) == 2
+
+    def test_invalidated_by_changes(self, tmp_path: Path):
+        filepath = tmp_path / "perfs.json"
+        self.perfs.save_to_json(filepath)
+        PerfsRaces.load_cached(filepath)
+        self.perfs.add_perf(make_race(4, 30))
+        self.perfs.save_to_json(filepath)
+        assert len(PerfsRaces.load_cached(filepath)) == 4
+
+    def test_listeners_are_not_pickled(self):
+        self.perfs.subscribe(lambda old, new: None)
+        perfs = pickle.loads(pickle.dumps(self.perfs))
+        assert perfs.perfs == self.perfs.perfs
+        assert not perfs.can_undo
+        perfs.add_perf(make_race(4, 30))
+        assert len(self.perfs) == 3
+
+
+class TestTrustedLoad:
+    def setup_method(self):
+        self.perfs = PerfsRaces()
+        for day in range(1, 4):
+            race = make_race(day, 40 + day)
+            race.iaaf_score = 700 + day
+            race.rank = day
+            self.perfs.add_perf(race)
+
+    def test_same_races_as_validated(self, tmp_path: Path):
+        filepath = tmp_path / "perfs.json"
+        self.perfs.save_to_json(filepath)
+        trusted, validated = PerfsRaces(), PerfsRaces()
+        trusted.load_from_json(filepath)
+        validated.load_from_json(filepath, validate=True)
+        assert trusted.perfs == validated.perfs == self.perfs.perfs
+        assert isinstance(trusted[0], MainPerf)
+        assert trusted[0].splits.seconds == self.perfs[0].splits.seconds
+        assert trusted.table().equals(validated.table())
+
+    def test_modified_file_is_validated(self, tmp_path: Path):
+        filepath = tmp_path / "perfs.json"
+        self.perfs.save_to_json(filepath)
+        filepath.write_text(filepath.read_text().replace("41min0s", "41min75s"))
+        with pytest.raises(ValueError):
+            PerfsRaces().load_from_json(filepath)
+
+
+def make_race(day: int, minutes: int, distance: float = 10) -> MainPerf:
+    perf = MainPerf(
+        time=Time(minutes=minutes, seconds=0),
+        distance=distance,
+        date=datetime(2024, 1, day),
+        name_event=f"Race of day {day}",
+        location="Paris",
+    )
+    if distance == 10:
+        perf.add_sub_perf([Time(minutes=minutes // 2, seconds=0)] * 2, 5)
+    return perf
+
+
+class TestHistory:
+    def setup_method(self):
+        self.perfs = PerfsRaces()
+        self.races = [make_race(day, 40 + day) for day in range(1, 4)]
+        for race in self.races:
+            self.perfs.add_perf(race)
+
+    def test_undo_redo(self):
+        faster = make_race(2, 30)
+        self.perfs.update_race(datetime(2024, 1, 2), "Race of day 2", 10, faster)
+        self.perfs.delete_race(datetime(2024, 1, 1), "Race of day 1", 10)
+        assert list(self.perfs) == [faster, self.races[2]]
+
+        assert self.perfs.undo() == Delta("add", 0, new=self.races[0])
+        assert list(self.perfs) == [self.races[0], faster, self.races[2]]
+        self.perfs.undo()
+        assert list(self.perfs) == self.races
+        assert self.perfs.get_personal_best(10) is self.races[0]
+        assert self.perfs.get_race(datetime(2024, 1, 2), "race of day 2", 10) is (
+            self.races[1]
+        )
+
+        self.perfs.redo()
+        assert self.perfs.get_personal_best(10) is faster
+        # a new change forgets the changes to redo
+        self.perfs.add_perf(make_race(4, 50))
+        assert not self.perfs.can_redo
+        with pytest.raises(ValueError):
+            self.perfs.redo()
+
+    def test_history(self):
+        assert [delta.kind for delta in self.perfs.history] == ["add"] * 3
+        for _ in range(3):
+            self.perfs.undo()
+        assert len(self.perfs) == 0
+        assert not self.perfs.can_undo
+
+    def test_add_perfs(self):
+        self.perfs.table()
+        self.perfs.get_all_personal_best()
+        new = [make_race(5, 35), make_race(6, 50)]
+        races = [make_race(1, 30), new[0], make_race(5, 30), new[1]]
+        # the race of day 1 is recorded, the second one of day 5 is given twice
+        assert self.perfs.add_perfs(races) == 2
+        assert list(self.perfs) == self.races + new
+        assert self.perfs.history[-2:] == [
+            Delta("add", 3, new=new[0]),
+            Delta("add", 4, new=new[1]),
+        ]
+        assert self.perfs.index[self.perfs.key_of(new[1])] == 4
+        assert self.perfs.get_personal_best(10) is new[0]
+        rebuilt = PerfsRaces(perfs=list(self.perfs))
+        assert self.perfs.table().equals(rebuilt.table())
+        self.perfs.undo()
+        assert list(self.perfs) == self.races + new[:1]
+
+    def test_stale_delta(self):
+        with pytest.raises(ValueError):
+            self.perfs.apply(Delta("delete", 0, old=self.races[1]))
+        with pytest.raises(DuplicateRaceError):
+            self.perfs.apply(Delta("add", 0, new=make_race(1, 30)))
+
+    def test_incremental_caches(self):
+        rng = random.Random(0)
+        self.perfs.table()
+        self.perfs.get_all_personal_best()
+        for _ in range(200):
+            action = rng.random()
+            day = rng.randint(1, 28)
+            race = make_race(day, rng.randint(30, 59), rng.choice([5, 10]))
+            date = datetime(2024, 1, day)
+            if action < 0.4:
+                self.perfs.upsert_race(race)
+            elif action < 0.6 and self.perfs.get_race(date, race.name_event, 10):
+                self.perfs.delete_race(date, race.name_event, 10)
+            elif action < 0.7 and self.perfs.can_undo:
+                self.perfs.undo()
+            elif action < 0.8 and self.perfs.can_redo:
+                self.perfs.redo()
+            rebuilt = PerfsRaces(perfs=list(self.perfs))
+            assert self.perfs.get_all_personal_best() == (
+                rebuilt.get_all_personal_best()
+            )
+            assert self.perfs.table().equals(rebuilt.table())
+
+
+class TestTable:
+    def test_typed_columns(self):
+        perfs = PerfsRaces()
+        perfs.add_perf(make_race(20, 41))
+        perfs.add_perf(make_race(3, 30, 7))
+        ranked = make_race(11, 59, 21.1)
+        ranked.rank, ranked.num_participants = 50, 200
+        perfs.add_perf(ranked)
+
+        df = perfs.table()
+        assert df["Date"].dtype.kind == "M"
+        assert df["Date"].is_monotonic_increasing
+        assert df["Time (s)"].tolist() == [1800, 3540, 2460]
+        assert df["Pace (s/km)"].iloc[2] == pytest.approx(246)
+        assert df["Location"].dtype == "category"
+        assert df["Event"].tolist()[1:] == ["HM", "10km"]
+        assert df["Event"].isna().tolist() == [True, False, False]
+        assert str(df["Rank"].dtype) == "Int64"
+        assert df["Rank"].isna().tolist() == [True, False, True]
+        assert df["Ratio"].iloc[1] == pytest.approx(0.75)
+        assert df["sub_perfs"].iloc[2] == [1200, 1200]
+        assert df.sort_values("Time (s)")["Name"].iloc[0] == "Race of day 3"
+        assert perfs.table_order() == [1, 2, 0]
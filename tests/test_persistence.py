@@ -0,0 +1,142 @@
+import json
+import threading
+from pathlib import Path
+
+import pytest
+
+from src.persistence import (
+    BackgroundWriter,
+    atomic_write_json,
+    read_cache,
+    read_snapshot,
+    write_cache,
+    write_snapshot,
+)
+
+
+def test_atomic_write_json(tmp_path: Path):
+    filepath = tmp_path / "perfs.json"
+    atomic_write_json(filepath, [{"time": "40min0s"}])
+    atomic_write_json(filepath, [{"time": "39min0s"}])
+    assert json.loads(filepath.read_text()) == [{"time": "39min0s"}]
+    # no temporary file left behind
+    assert list(tmp_path.iterdir()) == [filepath]
+
+
+class TestSnapshot:
+    def test_round_trip(self, tmp_path: Path):
+        filepath = tmp_path / "perfs.json"
+        write_snapshot(filepath, [{"time": "40min0s"}])
+        assert read_snapshot(filepath) == ([{"time": "40min0s"}], True)
+        # still a JSON document
+        assert json.loads(filepath.read_text())["races"] == [{"time": "40min0s"}]
+
+    def test_modified_snapshot_is_not_verified(self, tmp_path: Path):
+        filepath = tmp_path / "perfs.json"
+        write_snapshot(filepath, [{"time": "40min0s"}])
+        filepath.write_text(filepath.read_text().replace("40min", "39min"))
+        assert read_snapshot(filepath) == ([{"time": "39min0s"}], False)
+
+    def test_plain_list(self, tmp_path: Path):
+        filepath = tmp_path / "perfs.json"
+        atomic_write_json(filepath, [{"time": "40min0s"}])
+        assert read_snapshot(filepath) == ([{"time": "40min0s"}], False)
+
+    def test_invalid_document(self, tmp_path: Path):
+        filepath = tmp_path / "perfs.json"
+        atomic_write_json(filepath, "40min0s")
+        with pytest.raises(ValueError):
+            read_snapshot(filepath)
+
+
+def test_cache(tmp_path: Path):
+    cache_path = tmp_path / "perfs.json.cache"
+    assert read_cache(cache_path, b"v1") is None
+    write_cache(cache_path, b"v1", {"races": [1, 2]})
+    assert read_cache(cache_path, b"v1") == {"races": [1, 2]}
+    assert read_cache(cache_path, b"v2") is None
+    cache_path.write_bytes(b"v1 truncated")
+    assert read_cache(cache_path, b"v1") is None
+
+
+class TestBackgroundWriter:
+    def setup_method(self):
+        self.writers: list[BackgroundWriter] = []
+
+    def teardown_method(self):
+        for writer in self.writers:
+            writer.close()
+
+    def make_writer(self, filepath: Path) -> BackgroundWriter:
+        writer = BackgroundWriter(filepath)
+        self.writers.append(writer)
+        return writer
+
+    def test_flush(self, tmp_path: Path):
+        filepath = tmp_path / "perfs.json"
+        writer = self.make_writer(filepath)
+        seq = writer.submit([{"name_event": "10km"}])
+        assert writer.flush(seq, timeout=5)
+        assert read_snapshot(filepath) == ([{"name_event": "10km"}], True)
+        status = writer.status
+        assert status.durable
+        assert status.last_saved is not None
+
+    def test_burst_keeps_last_snapshot(self, tmp_path: Path):
+        filepath = tmp_path / "perfs.json"
+        writer = self.make_writer(filepath)
+        for i in range(50):
+            writer.submit([{"rank": i}])
+        assert writer.flush(timeout=5)
+        assert read_snapshot(filepath) == ([{"rank": 49}], True)
+        assert writer.status.pending == 0
+
+    def test_error_is_reported(self, tmp_path: Path):
+        # the parent "directory" is a file: the write must fail
+        blocker = tmp_path / "blocker"
+        blocker.write_text("")
+        writer = self.make_writer(blocker / "perfs.json")
+        writer.submit([])
+        assert not writer.flush(timeout=5)
+        status = writer.status
+        assert not status.durable
+        assert status.last_error is not None
+        assert status.pending == 1
+
+    def test_flush_after_failed_write(self, tmp_path: Path):
+        blocker = tmp_path / "blocker"
+        blocker.write_text("")
+        writer = self.make_writer(blocker / "perfs.json")
+        assert not writer.flush(writer.submit([]), timeout=5)
+        # the next snapshot is waited for, and written once the path is usable
+        blocker.unlink()
+        blocker.mkdir()
+        writer.submit([{"rank": 1}])
+        assert writer.flush(timeout=5)
+        assert writer.status.durable
+
+    def test_concurrent_submitters_keep_last_snapshot(self, tmp_path: Path):
+        filepath = tmp_path / "perfs.json"
+        writer = self.make_writer(filepath)
+        submitted: dict[int, int] = {}
+
+        def submit(thread: int) -> None:
+            for i in range(100):
+                rank = thread * 1000 + i
+                submitted[writer.submit([{"rank": rank}])] = rank
+
+        threads = [threading.Thread(target=submit, args=(t,)) for t in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert writer.flush(timeout=5)
+        last = submitted[max(submitted)]
+        assert read_snapshot(filepath) == ([{"rank": last}], True)
+
+    def test_close_writes_pending(self, tmp_path: Path):
+        filepath = tmp_path / "perfs.json"
+        writer = self.make_writer(filepath)
+        writer.submit([{"rank": 1}])
+        writer.close()
+        assert read_snapshot(filepath) == ([{"rank": 1}], True)
@@ -0,0 +1,101 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from src.iaaf import Event, Gender, IAAFCalculator
+from src.perfs_tracker import MainPerf, PerfsRaces
+from src.predictor import RacePredictor, get_predictor
+from src.time_an_pace import Time
+
+
+class TestRacePredictor:
+    def setup_method(self):
+        self.predictor = get_predictor(Gender("male"))
+
+    def test_grid_matches_scoring(self):
+        iaaf = IAAFCalculator()
+        row = self.predictor.event_index([Event("Marathon")])[0]
+        for points in (100, 853, 1200):
+            seconds = round(self.predictor.grid[row, points])
+            time = Time.from_total_seconds(seconds)
+            score = iaaf.get_iaaf_score(Gender("male"), Event("Marathon"), time)
+            assert abs(score - points) <= 1
+
+    def test_predict_same_event(self):
+        seconds = np.array([2400.0, 2700.0])
+        predicted = self.predictor.predict(
+            [Event("10km"), Event("10km")], seconds, [Event("10km")]
+        )
+        np.testing.assert_allclose(predicted[:, 0], seconds, atol=1)
+
+    def test_predict_equivalent_score(self):
+        events = [Event("10km"), Event("HM")]
+        seconds = np.array([2400.0, 5400.0])
+        targets = [Event("5km"), Event("Marathon")]
+        predicted = self.predictor.predict(events, seconds, targets)
+        assert predicted.shape == (2, 2)
+        for i, event in enumerate(events):
+            score = self.predictor.scores([event], seconds[i : i + 1])[0]
+            for j, target in enumerate(targets):
+                target_score = self.predictor.scores([target], predicted[i, j : j + 1])
+                assert target_score[0] == pytest.approx(score, abs=0.5)
+        # a longer race takes longer
+        assert (predicted[:, 0] < predicted[:, 1]).all()
+
+    def test_slow_times_are_not_predicted(self):
+        # past the vertex of the formula, a slower time must not score more
+        seconds = np.array([2400.0, 3000.0, 3600.0])
+        scores = self.predictor.scores([Event("10km")] * 3, seconds)
+        assert scores[0] > scores[1] >= scores[2] == 0
+        predicted = self.predictor.predict(
+            [Event("10km")] * 3, seconds, [Event("Marathon")]
+        )[:, 0]
+        assert predicted[0] < predicted[1]
+        assert np.isnan(predicted[2])
+
+    def test_times_near_the_vertex(self):
+        a, b, _ = self.predictor.coeffs[self.predictor.event_index([Event("10km")])[0]]
+        vertex = -b / (2 * a)
+        seconds = np.array([vertex - 1, vertex, vertex + 1])
+        scores = self.predictor.scores([Event("10km")] * 3, seconds)
+        assert (scores < 1).all()
+        predicted = self.predictor.predict(
+            [Event("10km")] * 3, seconds, [Event("5km"), Event("Marathon")]
+        )
+        assert np.isnan(predicted).all()
+
+    def test_unknown_event(self):
+        with pytest.raises(ValueError):
+            self.predictor.predict([Event("HJ")], np.array([2.0]))
+
+    def test_riegel(self):
+        predicted = self.predictor.predict_riegel(
+            np.array([10.0]), np.array([2400.0]), np.array([10.0, 21.0975])
+        )
+        assert predicted[0, 0] == 2400
+        assert predicted[0, 1] == pytest.approx(2400 * 2.10975**1.06)
+
+    def test_predict_personal_bests(self):
+        perfs = PerfsRaces(gender=Gender("male"))
+        for i, (distance, time) in enumerate(
+            [
+                (10, Time(minutes=40, seconds=0)),
+                (10, Time(minutes=38, seconds=0)),
+                (21.1, Time(hours=1, minutes=30, seconds=0)),
+                (6, Time(minutes=25, seconds=0)),
+            ]
+        ):
+            perfs.add_perf(
+                MainPerf(
+                    time=time,
+                    distance=distance,
+                    date=datetime(2024, 1, 1 + i),
+                    name_event="race",
+                    location="Paris",
+                )
+            )
+        predictions = RacePredictor(Gender("male")).predict_personal_bests(perfs)
+        assert list(predictions.index) == [10, 21.1]
+        assert predictions.loc[10, "10km"] == pytest.approx(38 * 60, abs=1)
+        assert predictions.loc[10, "Marathon"] > predictions.loc[10, "HM"]
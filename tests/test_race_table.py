@@ -0,0 +1,116 @@
+import random
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from conftest import make_race
+
+from src.facets import FacetIndex
+from src.pacing import add_pacing_columns
+from src.perfs_tracker import Delta, MainPerf, PerfsRaces
+from src.race_table import RaceTable
+
+
+def make_table_race(
+    day: int, distance: float, location: str, n_splits: int = 0, name: str = "Race"
+) -> MainPerf:
+    """A race filling every column of the table, with n_splits splits."""
+    step = distance / n_splits if n_splits else 0
+    return make_race(
+        int(distance * 300) + day,
+        distance,
+        datetime(2024, 1 + day // 28, 1 + day % 28),
+        f"{name} {day}",
+        location,
+        [int(step * 290) + i for i in range(n_splits)],
+        rank=day if day % 2 else None,
+        num_participants=100,
+    )
+
+
+class TestRaceTable:
+    def setup_method(self):
+        self.perfs = PerfsRaces()
+        for day, distance, location, n in [
+            (10, 10, "Paris", 4),
+            (3, 21.1, "Lyon", 0),
+            (20, 5, "Paris", 5),
+            (10, 12, "Nantes", 3),
+        ]:
+            self.perfs.add_perf(make_table_race(day, distance, location, n))
+        self.table = RaceTable(self.perfs)
+
+    def assert_rebuilt(self):
+        expected = add_pacing_columns(self.perfs.table(), self.perfs)
+        pd.testing.assert_frame_equal(self.table.df, expected)
+        facets = FacetIndex.from_table(expected)
+        assert self.table.facets.bitsets == facets.bitsets
+        for facet in facets.bitsets:
+            assert self.table.facets.options(facet) == facets.options(facet)
+        assert self.table.facets.rows() == facets.rows()
+
+    def test_initial(self):
+        self.assert_rebuilt()
+
+    def test_add(self):
+        # before, between and after the rows, on the day of other races, and in
+        # a new location
+        for day, location in [(1, "Paris"), (10, "Brest"), (15, "Lyon"), (40, "Nice")]:
+            race = make_table_race(day, 10, location, 2, name="New")
+            self.table.apply(Delta("add", len(self.perfs), new=race))
+            self.assert_rebuilt()
+        race = make_table_race(10, 42.195, "Paris", name="First")
+        self.table.apply(Delta("add", 0, new=race))
+        self.assert_rebuilt()
+
+    def test_update_and_delete(self):
+        moved = make_table_race(25, 10, "Lyon", 6, name="Moved")
+        self.table.apply(Delta("update", 0, old=self.perfs[0], new=moved))
+        self.assert_rebuilt()
+        # the last race in Nantes
+        self.table.apply(Delta("delete", 3, old=self.perfs[3]))
+        self.assert_rebuilt()
+        assert "Nantes" not in self.table.facets.options("location")
+        while len(self.perfs):
+            self.table.apply(Delta("delete", 0, old=self.perfs[0]))
+            self.assert_rebuilt()
+
+    def test_update_and_delete_only_race(self):
+        perfs = PerfsRaces()
+        perfs.add_perf(make_table_race(1, 10, "Paris", 2))
+        table = RaceTable(perfs)
+        table.apply(Delta("update", 0, old=perfs[0], new=make_table_race(2, 5, "Lyon")))
+        pd.testing.assert_frame_equal(table.df, RaceTable(perfs).df)
+        assert table.facets.rows() == [0]
+        table.apply(Delta("delete", 0, old=perfs[0]))
+        pd.testing.assert_frame_equal(table.df, RaceTable(perfs).df)
+        assert table.facets.rows() == []
+
+    def test_random_deltas(self):
+        rng = random.Random(0)
+        for i in range(40):
+            n = len(self.perfs)
+            kind = rng.choice(["add", "add", "update", "delete"]) if n else "add"
+            new = make_table_race(
+                rng.randint(0, 60),
+                rng.choice([5, 10, 12]),
+                rng.choice(["Paris", "Lyon", "Brest"]),
+                rng.choice([0, 2, 5]),
+                name=f"Random {i}",
+            )
+            if kind == "add":
+                delta = Delta("add", rng.randint(0, n), new=new)
+            else:
+                position = rng.randrange(n)
+                old = self.perfs[position]
+                if kind == "delete":
+                    delta = Delta("delete", position, old=old)
+                else:
+                    delta = Delta("update", position, old=old, new=new)
+            self.table.apply(delta)
+        self.assert_rebuilt()
+
+    def test_invalid_delta(self):
+        with pytest.raises(ValueError):
+            self.table.apply(Delta("delete", 0, old=make_table_race(1, 10, "Paris")))
+        self.assert_rebuilt()
@@ -0,0 +1,115 @@
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from conftest import make_race
+
+from src.replication import LOG_FILENAME, Changeset, Replica, read_changesets
+
+
+def races(replica: Replica) -> list[dict]:
+    with replica.store.read() as perfs:
+        return sorted(perfs.to_records(), key=lambda record: record["name_event"])
+
+
+class TestReplica:
+    def setup_method(self):
+        self.replicas: list[Replica] = []
+
+    def teardown_method(self):
+        for replica in self.replicas:
+            replica.store.writer.close()
+
+    def make_replica(self, directory: Path) -> Replica:
+        replica = Replica(directory)
+        self.replicas.append(replica)
+        return replica
+
+    def test_two_nodes_converge(self, tmp_path: Path):
+        a = self.make_replica(tmp_path / "a")
+        b = self.make_replica(tmp_path / "b")
+        a.store.add_perf(make_race(2500, name="10km"))
+        a.store.add_perf(make_race(1200, 5, name="5km"))
+        assert b.pull(a.directory) == 2
+        assert races(b) == races(a)
+
+        b.store.update_race(
+            datetime(2024, 5, 1), "10km", 10, make_race(2400, name="10km")
+        )
+        b.store.delete_race(datetime(2024, 5, 1), "5km", 5)
+        assert a.pull(b.directory) == 2
+        assert races(a) == races(b)
+        assert [race["time"] for race in races(a)] == [
+            str(make_race(2400, name="10km").time)
+        ]
+
+        # nothing new, and the pulled changes are not logged again
+        assert a.pull(b.directory) == 0
+        assert b.pull(a.directory) == 0
+        assert [c.node for c, _ in read_changesets(a.log_path)] == [a.node] * 2
+
+    def test_restart_and_idempotence(self, tmp_path: Path):
+        a = self.make_replica(tmp_path / "a")
+        b = self.make_replica(tmp_path / "b")
+        a.store.add_perf(make_race(2500, name="10km"))
+        b.pull(a.directory)
+        a.store.add_perf(make_race(2600, name="Other 10km"))
+        for replica in (a, b):
+            assert replica.store.writer.flush(timeout=5)
+
+        # b restarts from its directory: same node, only the new change pulled
+        restarted = self.make_replica(tmp_path / "b")
+        assert restarted.node == b.node
+        assert restarted.pull(a.directory) == 1
+        assert races(restarted) == races(a)
+
+        # replaying every changeset changes nothing
+        for changeset, _ in read_changesets(a.log_path):
+            assert not restarted.apply(changeset)
+        assert races(restarted) == races(a)
+
+    def test_partial_line_and_gap(self, tmp_path: Path):
+        a = self.make_replica(tmp_path / "a")
+        b = self.make_replica(tmp_path / "b")
+        a.store.add_perf(make_race(2500, name="10km"))
+        with open(a.log_path, "a") as file:
+            file.write('{"node": "')
+        assert b.pull(a.directory) == 1
+        assert b.peers[a.node]["seq"] == 1
+
+        # a changeset missing from the log is not skipped silently
+        other = Changeset(a.node, 3, "delete", ("2024-05-01", "10km", 10.0))
+        (a.directory / LOG_FILENAME).write_text(
+            (a.directory / LOG_FILENAME).read_text().rsplit("\n", 1)[0]
+            + "\n"
+            + other.to_json()
+            + "\n"
+        )
+        with pytest.raises(ValueError):
+            b.pull(a.directory)
+        with pytest.raises(ValueError):
+            a.pull(a.directory)
+
+    def test_compact(self, tmp_path: Path):
+        a = self.make_replica(tmp_path / "a")
+        b = self.make_replica(tmp_path / "b")
+        for seconds in (2500, 2600, 2700):
+            a.store.add_perf(make_race(seconds, name=f"10km in {seconds}s"))
+        b.pull(a.directory)
+        a.store.add_perf(make_race(2800, name="Not pulled"))
+        # the changesets b has not applied yet are kept
+        assert a.compact([b.directory]) == 3
+        assert [c.seq for c, _ in read_changesets(a.log_path)] == [4]
+        assert a.compact([b.directory]) == 0
+
+        a.store.add_perf(make_race(2900, name="After compaction"))
+        assert b.pull(a.directory) == 2
+        assert races(b) == races(a)
+        assert a.store.writer.flush(timeout=5)
+        restarted = self.make_replica(tmp_path / "a")
+        assert restarted.seq == 5
+
+        # a new node needs the dropped changesets
+        c = self.make_replica(tmp_path / "c")
+        with pytest.raises(ValueError):
+            c.pull(a.directory)
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from src.iaaf import Event, Gender
+from src.scoring import EventType, ScoringEngine, get_event_type, parse_performance
+from src.time_an_pace import Time
+
+
+@pytest.mark.parametrize(
+    "event, performance, expected",
+    [
+        ("100m", "9.58", 9.58),
+        ("800m", "1:45.20", 105.2),
+        ("Marathon", "2:01:09", 7269),
+        ("HM", "1h25min0s", 5100),
+        ("LJ", "8.95", 8.95),
+        ("SP", "23,37 m", 23.37),
+        ("Decathlon", "9126", 9126),
+    ],
+)
+def test_parse_performance(event: str, performance: str, expected: float):
+    assert parse_performance(Event(event), performance) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize(
+    "event, performance",
+    [("800m", "1:60"), ("100m", "0"), ("LJ", "8m95"), ("Decathlon", "9126m")],
+)
+def test_parse_invalid_performance(event: str, performance: str):
+    with pytest.raises(ValueError):
+        parse_performance(Event(event), performance)
+
+
+def test_get_event_type():
+    assert get_event_type(Event("HJ")) is EventType.distance
+    assert get_event_type(Event("Heptathlon")) is EventType.points
+    assert get_event_type(Event("3000mSC")) is EventType.time
+
+
+class TestScoringEngine:
+    def setup_method(self):
+        self.engine = ScoringEngine()
+
+    def test_score_meet(self):
+        scores = self.engine.score(
+            Gender("male"),
+            [Event("100m"), Event("HJ"), Event("Decathlon"), "LJ", "HM"],
+            [9.58, 2.45, 9126, 8.95, 3600],
+        )
+        assert scores.tolist() == [1356, 1314, 1302, 1346, 1186]
+
+    def test_same_scores_as_iaaf_calculator(self):
+        events = [Event("100m"), Event("HM"), Event("Marathon")]
+        seconds = np.array([10, 3600, 9000])
+        np.testing.assert_array_equal(
+            self.engine.score(Gender("male"), events, seconds),
+            self.engine.iaaf.get_iaaf_scores(Gender("male"), events, seconds),
+        )
+
+    def test_unknown_or_invalid(self):
+        scores = self.engine.score(
+            ["male", "female", "other", "male"],
+            ["Heptathlon", "HM", "HM", "LJ"],
+            [6000, 3600, 3600, -1],
+        )
+        assert np.isnan(scores[[0, 2, 3]]).all()
+        assert scores[1] == 1345
+
+    def test_beyond_the_vertex(self):
+        # too slow or too short: the formula would increase again
+        scores = self.engine.score("male", ["100m", "LJ"], [1000, 0.01])
+        assert scores.tolist() == [0, 0]
+
+    def test_slow_times_agree_with_iaaf_calculator(self):
+        # past the vertex of the male 10km formula (about 52:29)
+        seconds = np.array([3600.0, 5400.0])
+        expected = self.engine.score("male", ["10km", "10km"], seconds).tolist()
+        assert expected == [0, 0]
+        iaaf = self.engine.iaaf
+        assert (
+            iaaf.get_iaaf_scores(Gender("male"), [Event("10km")] * 2, seconds).tolist()
+            == expected
+        )
+        assert [
+            iaaf.get_iaaf_score(
+                Gender("male"), Event("10km"), Time.from_total_seconds(s)
+            )
+            for s in (3600, 5400)
+        ] == expected
+
+    def test_score_results(self):
+        scores = self.engine.score_results(
+            "female",
+            ["LJ", "Heptathlon", "HM", "LJ"],
+            ["7.52m", "7291", "1:05:16", "x"],
+        )
+        assert scores[:3].tolist() == [1333, 1331, 1229]
+        assert np.isnan(scores[3])
+
+    def test_score_one(self):
+        assert self.engine.score_one(Gender("male"), Event("SP"), 23.37) == 1323
+        with pytest.raises(ValueError):
+            self.engine.score_one(Gender("female"), Event("Decathlon"), 8000)
@@ -0,0 +1,120 @@
+import random
+
+import numpy as np
+import pytest
+from conftest import make_race
+
+from src.pacing import RaggedSplits
+from src.perfs_tracker import PerfsRaces
+from src.similarity import (
+    AthleteSimilarity,
+    RaceSimilarity,
+    VectorIndex,
+    pacing_profiles,
+)
+
+
+class TestVectorIndex:
+    def setup_method(self):
+        rng = np.random.default_rng(0)
+        centers = rng.normal(size=(50, 10))
+        self.vectors = centers[rng.integers(0, 50, 5000)] + rng.normal(
+            scale=0.1, size=(5000, 10)
+        )
+        self.queries = centers[:20] + rng.normal(scale=0.1, size=(20, 10))
+
+    def test_exact_matches_brute_force(self):
+        index = VectorIndex(self.vectors)
+        for query in self.queries:
+            rows, distances = index.query(query, k=10)
+            brute = np.linalg.norm(self.vectors - query, axis=1)
+            assert rows.tolist() == np.argsort(brute, kind="stable")[:10].tolist()
+            assert distances == pytest.approx(brute[rows])
+
+    def test_exclude(self):
+        index = VectorIndex(self.vectors)
+        rows, distances = index.query(self.vectors[3], k=1, exclude=3)
+        assert rows[0] != 3 and distances[0] > 0
+
+    def test_approximate_recall(self):
+        exact = VectorIndex(self.vectors)
+        approximate = VectorIndex(self.vectors, approximate=True)
+        found = 0
+        for query in self.queries:
+            expected = set(exact.query(query, k=10)[0].tolist())
+            found += len(expected & set(approximate.query(query, k=10)[0].tolist()))
+        assert found / (10 * len(self.queries)) >= 0.9
+
+    def test_rejects_nan(self):
+        with pytest.raises(ValueError):
+            VectorIndex(np.array([[1.0, np.nan]]))
+
+
+class TestRaceSimilarity:
+    def setup_method(self):
+        rng = random.Random(0)
+        self.perfs = PerfsRaces()
+        for day in range(300):
+            n = rng.choice([0, 1, 5, 10])
+            # even, fading or negative split races
+            trend = rng.choice([-4, 0, 4])
+            splits = [240 + trend * i + rng.randint(-3, 3) for i in range(n)]
+            self.perfs.add_perf(
+                make_race(
+                    sum(splits) + 30,
+                    rng.choice([5, 10]),
+                    name=f"Race {day}",
+                    splits=splits,
+                )
+            )
+
+    def test_profiles(self):
+        races = [make_race(3030, splits=[300] * 10), make_race(330, splits=[300])]
+        profiles = pacing_profiles(RaggedSplits.from_perfs(races))
+        assert profiles[0] == pytest.approx(np.ones(10))
+        assert np.isnan(profiles[1]).all()
+
+    def test_similar_races_share_the_trend(self):
+        similarity = RaceSimilarity.of(self.perfs)
+        assert similarity is RaceSimilarity.of(self.perfs)
+        splits = [240 + 4 * i for i in range(10)]
+        fading = make_race(sum(splits) + 30, splits=splits)
+        similar = similarity.similar(fading, k=5)
+        assert len(similar) == 5
+        assert [d for _, d in similar] == sorted(d for _, d in similar)
+        for race, _ in similar:
+            seconds = list(race.splits.seconds)
+            assert seconds[-1] > seconds[0]
+
+    def test_race_is_not_its_own_neighbour(self):
+        similarity = RaceSimilarity.of(self.perfs)
+        race = similarity.races[0]
+        assert all(other is not race for other, _ in similarity.similar(race))
+        assert similarity.similar(make_race(330, splits=[300])) == []
+
+
+class TestAthleteSimilarity:
+    def setup_method(self):
+        self.athletes = {}
+        for name, (factor, distances) in {
+            "fast": (1.0, [5, 10, 21.1]),
+            "fast_road": (1.02, [10, 21.1, 42.195]),
+            "slow": (1.4, [5, 10, 21.1]),
+            "sprinter": (1.0, [5]),
+        }.items():
+            perfs = PerfsRaces()
+            for day, distance in enumerate(distances, 1):
+                seconds = int(factor * 180 * distance**1.06)
+                perfs.add_perf(
+                    make_race(
+                        seconds, distance, name=f"Race {day}", splits=[seconds - 30]
+                    )
+                )
+            self.athletes[name] = perfs
+
+    def test_similar(self):
+        similarity = AthleteSimilarity(self.athletes)
+        similar = similarity.similar("fast")
+        # sprinter shares a single distance with fast
+        assert [name for name, _ in similar] == ["fast_road", "slow"]
+        assert similar[0][1] == pytest.approx(np.log(1.02), rel=0.05)
@@ -0,0 +1,193 @@
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from src.perfs_tracker import Delta, DuplicateRaceError, MainPerf, PerfsRaces
+from src.persistence import read_snapshot
+from src.store import PerfStore, RWLock, VersionConflictError
+from src.time_an_pace import Time
+
+
+def make_perf(minutes: int) -> MainPerf:
+    return MainPerf(
+        time=Time(minutes=minutes, seconds=0),
+        distance=10,
+        date=datetime(2024, 1, 1),
+        name_event=f"10km in {minutes}min",
+        location="Paris",
+    )
+
+
+class TestPerfStore:
+    def setup_method(self):
+        self.stores: list[PerfStore] = []
+
+    def teardown_method(self):
+        for store in self.stores:
+            store.writer.close()
+
+    def make_store(self, filepath: Path) -> PerfStore:
+        store = PerfStore(filepath)
+        self.stores.append(store)
+        return store
+
+    def test_add_and_persist(self, tmp_path: Path):
+        filepath = tmp_path / "perfs.json"
+        store = self.make_store(filepath)
+        assert store.version == 0
+        assert store.add_perf(make_perf(40)) == 1
+        assert store.writer.flush(timeout=5)
+        assert len(read_snapshot(filepath)[0]) == 1
+
+        # a new process loads the saved races
+        other = self.make_store(filepath)
+        with other.read() as perfs:
+            assert len(perfs) == 1
+
+    def test_snapshot_taken_at_write(self, tmp_path: Path):
+        filepath = tmp_path / "perfs.json"
+        store = self.make_store(filepath)
+        perf = make_perf(40)
+        store.add_perf(perf)
+        # a race changed in place after the write is not in its snapshot
+        perf.iaaf_score = 1000
+        assert store.writer.flush(timeout=5)
+        assert "iaaf_score" not in read_snapshot(filepath)[0][0]
+
+    def test_changes_since(self, tmp_path: Path):
+        store = self.make_store(tmp_path / "perfs.json")
+        session_version = store.version
+        perf_a, perf_b = make_perf(40), make_perf(41)
+        store.add_perf(perf_a)
+        store.add_perf(perf_b)
+        version, deltas = store.changes_since(session_version)
+        assert version == 2
+        assert deltas == [Delta("add", 0, new=perf_a), Delta("add", 1, new=perf_b)]
+        assert store.changes_since(version) == (2, [])
+        with pytest.raises(ValueError):
+            store.changes_since(3)
+
+    def test_version_conflict(self, tmp_path: Path):
+        store = self.make_store(tmp_path / "perfs.json")
+        session_version = store.version
+        store.add_perf(make_perf(40), expected_version=session_version)
+        with pytest.raises(VersionConflictError):
+            store.add_perf(make_perf(41), expected_version=session_version)
+        assert store.version == 1
+
+    def test_duplicate(self, tmp_path: Path):
+        store = self.make_store(tmp_path / "perfs.json")
+        store.add_perf(make_perf(40))
+        with pytest.raises(DuplicateRaceError):
+            store.add_perf(make_perf(40))
+        assert store.version == 1
+        assert store.changes_since(0)[1] == [Delta("add", 0, new=make_perf(40))]
+
+    def test_subscribe(self, tmp_path: Path):
+        store = self.make_store(tmp_path / "perfs.json")
+        received: list[tuple[int, Delta]] = []
+        unsubscribe = store.subscribe(lambda v, d: received.append((v, d)))
+        perf = make_perf(40)
+        store.add_perf(perf)
+        unsubscribe()
+        store.add_perf(make_perf(41))
+        assert received == [(1, Delta("add", 0, new=perf))]
+
+    def test_batch(self, tmp_path: Path):
+        filepath = tmp_path / "perfs.json"
+        store = self.make_store(filepath)
+        store.add_perf(make_perf(40))
+        received: list[tuple[int, Delta]] = []
+        store.subscribe(lambda v, d: received.append((v, d)))
+        perfs = [make_perf(minutes) for minutes in (40, 41, 42)]
+        version, added = store.batch(lambda races: races.add_perfs(perfs))
+        assert (version, added) == (3, 2)
+        expected = [Delta("add", 1, new=perfs[1]), Delta("add", 2, new=perfs[2])]
+        assert store.changes_since(1) == (3, expected)
+        assert received == list(zip([2, 3], expected))
+        assert store.writer.flush(timeout=5)
+        assert store.writer.status.submitted == 2
+        assert len(read_snapshot(filepath)[0]) == 3
+        with pytest.raises(VersionConflictError):
+            store.batch(lambda races: races.add_perfs(perfs), expected_version=1)
+
+    def test_batch_error(self, tmp_path: Path):
+        store = self.make_store(tmp_path / "perfs.json")
+
+        def change(perfs: PerfsRaces) -> None:
+            perfs.add_perf(make_perf(40))
+            perfs.add_perf(make_perf(40))
+
+        # the race added before the error is logged like the others
+        with pytest.raises(DuplicateRaceError):
+            store.batch(change)
+        assert store.changes_since(0) == (1, [Delta("add", 0, new=make_perf(40))])
+
+    def test_edit_and_undo(self, tmp_path: Path):
+        filepath = tmp_path / "perfs.json"
+        store = self.make_store(filepath)
+        session = PerfsRaces()
+        perf_a, perf_b = make_perf(40), make_perf(41)
+        store.add_perf(perf_a)
+        store.add_perf(perf_b)
+        fixed = perf_a.model_copy(update={"location": "Lyon"})
+        store.update_race(perf_a.date, perf_a.name_event, 10, fixed)
+        store.delete_race(perf_b.date, perf_b.name_event, 10)
+        store.undo()
+        version = store.undo()
+        with store.read() as perfs:
+            assert list(perfs) == [perf_a, perf_b]
+        assert store.can_redo
+        assert store.writer.flush(timeout=5)
+        assert len(read_snapshot(filepath)[0]) == 2
+
+        # a session replays the log, undos included
+        for delta in store.changes_since(0)[1]:
+            session.apply(delta, record=False)
+        assert list(session) == [perf_a, perf_b]
+        assert not session.can_undo
+        with pytest.raises(VersionConflictError):
+            store.redo(expected_version=version - 1)
+
+    def test_concurrent_writers(self, tmp_path: Path):
+        store = self.make_store(tmp_path / "perfs.json")
+
+        def add_many(offset: int) -> None:
+            for i in range(10):
+                store.add_perf(make_perf(20 + offset + i))
+
+        threads = [threading.Thread(target=add_many, args=(10 * i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert store.version == 40
+        with store.read() as perfs:
+            assert len(perfs) == 40
+
+
+def test_rwlock_readers_share():
+    lock = RWLock()
+    with lock.read():
+        with lock.read():
+            pass
+    with lock.write():
+        pass
+
+
+def test_version_under_read_with_waiting_writer(tmp_path: Path):
+    store = PerfStore(tmp_path / "perfs.json")
+    try:
+        with store.read():
+            writer = threading.Thread(target=store.add_perf, args=(make_perf(40),))
+            writer.start()
+            # wait for the writer to queue on the lock
+            while not store._lock._waiting_writers:
+                pass
+            assert store.version == 0
+        writer.join(timeout=5)
+        assert store.version == 1
+    finally:
+        store.writer.close()
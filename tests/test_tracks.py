@@ -0,0 +1,106 @@
+import math
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.perfs_tracker import MainPerf
+from src.time_an_pace import Time
+from src.tracks import (
+    EARTH_RADIUS_KM,
+    haversine,
+    iter_trackpoints,
+    read_track,
+    read_tracks,
+)
+
+START = datetime(2024, 4, 7, 8, 0, tzinfo=timezone.utc)
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def write_gpx(path: Path, distance_km: float, pace_s_per_km: float) -> Path:
+    """Track along the equator, one point every 50 m at constant pace."""
+    n = int(distance_km / 0.05)
+    points = []
+    for i in range(n + 1):
+        lon = i * 0.05 / KM_PER_DEGREE
+        time = START + timedelta(seconds=i * 0.05 * pace_s_per_km)
+        points.append(
+            f'<trkpt lat="0" lon="{lon}"><ele>10</ele>'
+            f"<time>{time.isoformat()}</time></trkpt>"
+        )
+    path.write_text(
+        '<?xml version="1.0"?>'
+        '<gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1">'
+        f"<trk><trkseg>{''.join(points)}</trkseg></trk></gpx>"
+    )
+    return path
+
+
+def test_haversine():
+    assert haversine(0, 0, 0, 1) == pytest.approx(KM_PER_DEGREE)
+    assert haversine(48.85, 2.35, 48.85, 2.35) == 0
+
+
+def test_iter_trackpoints_tcx(tmp_path: Path):
+    path = tmp_path / "run.tcx"
+    path.write_text(
+        '<?xml version="1.0"?>'
+        '<TrainingCenterDatabase xmlns="http://www.garmin.com/'
+        'xmlschemas/TrainingCenterDatabase/v2"><Activities><Activity><Lap><Track>'
+        "<Trackpoint><Time>2024-04-07T08:00:00Z</Time><Position>"
+        "<LatitudeDegrees>43.6</LatitudeDegrees>"
+        "<LongitudeDegrees>3.87</LongitudeDegrees></Position></Trackpoint>"
+        "<Trackpoint><Time>2024-04-07T08:00:05Z</Time></Trackpoint>"
+        "<Trackpoint><Time>2024-04-07T08:00:10Z</Time><Position>"
+        "<LatitudeDegrees>43.61</LatitudeDegrees>"
+        "<LongitudeDegrees>3.87</LongitudeDegrees></Position></Trackpoint>"
+        "</Track></Lap></Activity></Activities></TrainingCenterDatabase>"
+    )
+    points = list(iter_trackpoints(path))
+    assert [p[:2] for p in points] == [(43.6, 3.87), (43.61, 3.87)]
+    assert points[1][2] - points[0][2] == timedelta(seconds=10)
+
+
+class TestReadTrack:
+    def test_equal_splits(self, tmp_path: Path):
+        path = write_gpx(tmp_path / "10k.gpx", 10.5, 240)
+        splits = read_track(path, split_distance=1)
+        assert len(splits.seconds) == 11
+        np.testing.assert_allclose(splits.seconds[:10], 240, atol=0.01)
+        assert splits.end[-1] == pytest.approx(10.5)
+        assert splits.seconds[-1] == pytest.approx(120, abs=0.01)
+        assert splits.rounded_seconds().sum() == round(splits.total_seconds)
+
+    def test_boundaries(self, tmp_path: Path):
+        path = write_gpx(tmp_path / "10k.gpx", 10, 300)
+        splits = read_track(path, boundaries=[2.5, 7.5])
+        np.testing.assert_allclose(splits.end, [2.5, 7.5, 10])
+        np.testing.assert_allclose(splits.seconds, [750, 1500, 750], atol=0.01)
+
+    def test_apply_to_perf(self, tmp_path: Path):
+        path = write_gpx(tmp_path / "10k.gpx", 10.05, 240)
+        perf = MainPerf(
+            time=Time(minutes=40, seconds=15),
+            distance=10,
+            date=START,
+            name_event="10km",
+            location="Quito",
+        )
+        read_track(path, split_distance=5).apply_to(perf)
+        assert list(perf.splits.seconds) == [1200, 1200]
+
+        perf = MainPerf(**perf.model_dump())
+        read_track(path, boundaries=[3, 6]).apply_to(perf)
+        assert list(perf.splits.end) == pytest.approx([3, 6, 10])
+        assert list(perf.splits.seconds) == [720, 720, 972]
+
+    def test_read_tracks_in_parallel(self, tmp_path: Path):
+        paths = [
+            write_gpx(tmp_path / f"{pace}.gpx", 3, pace) for pace in (240, 300, 360)
+        ]
+        results = read_tracks(paths, split_distance=1, max_workers=2)
+        assert [r.path for r in results] == paths
+        for result, pace in zip(results, (240, 300, 360)):
+            np.testing.assert_allclose(result.seconds, pace, atol=0.01)